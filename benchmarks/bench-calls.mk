@@ -0,0 +1,75 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := calls
+
+include $(THIS_PATH)/common.mk
+
+define python_code
+@gnumake.export
+def bench_identity(arg):
+	return arg
+
+@gnumake.export(cache=True)
+def bench_cached(arg):
+	return arg
+
+@gnumake.export(cache=gnumake.FunctionCache(track_variables=True))
+def bench_cached_var(arg):
+	return gnumake.var['BENCH_VAR'] + arg
+endef
+
+$(python-exec $(python_code))
+
+make-function = $(strip x)
+python-eval-ok = $(python-eval 1)
+python-eval-error = $(python-eval a b)
+exported-function = $(bench_identity x)
+cached-function = $(bench_cached x)
+cached-var-function = $(bench_cached_var x)
+BENCH_VAR := y
+
+$(call bench,make function baseline,make-function)
+$(call bench,python-eval,python-eval-ok)
+$(call bench,python-eval error,python-eval-error)
+$(call bench,exported function,exported-function)
+$(call bench,cached function,cached-function)
+$(call bench,cached function (tracking variables),cached-var-function)
+
+$(python-exec gnumake.call_stats.enable())
+$(call bench,exported function (call stats),exported-function)
+$(python-exec gnumake.call_stats.disable())
+
+$(python-exec gnumake.tracer.enable())
+$(call bench,exported function (tracer),exported-function)
+$(python-exec gnumake.tracer.disable(); gnumake.tracer.clear())
+
+python-exec-ok = $(python-exec x = 1)
+
+$(call bench,python-exec (fd capture),python-exec-ok)
+.PYTHON_CAPTURE := memory
+$(call bench,python-exec (memory capture),python-exec-ok)
+undefine .PYTHON_CAPTURE
+
+BENCH_SCRIPT := $(shell mktemp --suffix=.py)
+$(shell echo 'x = 1' > $(BENCH_SCRIPT))
+python-file-ok = $(python-file $(BENCH_SCRIPT))
+
+$(call bench,python-file (fd capture),python-file-ok)
+.PYTHON_CAPTURE := memory
+$(call bench,python-file (memory capture),python-file-ok)
+undefine .PYTHON_CAPTURE
+$(shell rm -f $(BENCH_SCRIPT))
+
+# Calls back into make from Python
+BENCH_VAR := value
+gnumake-expand = $(python-exec gnumake.expand('$$(BENCH_VAR)'))
+gnumake-evaluate = $(python-exec gnumake.evaluate('BENCH_EVAL := 1'))
+gnumake-expand-100 = $(python-exec for _ in range(100): gnumake.expand('$$(BENCH_VAR)'))
+gnumake-evaluate-100 = $(python-exec for _ in range(100): gnumake.evaluate('BENCH_EVAL := 1'))
+
+.PYTHON_CAPTURE := memory
+$(call bench,gnumake.expand,gnumake-expand)
+$(call bench,gnumake.evaluate,gnumake-evaluate)
+$(call bench,100 x gnumake.expand,gnumake-expand-100)
+$(call bench,100 x gnumake.evaluate,gnumake-evaluate-100)
+undefine .PYTHON_CAPTURE
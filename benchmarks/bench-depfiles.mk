@@ -0,0 +1,46 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := depfiles
+BENCH_ITERATIONS := 3
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+DEP_DIR := $(shell mktemp -d)
+
+# 10000 dependency files as written by gcc -MMD -MP, each naming 30 of 500
+# headers
+define make_files
+import random
+random.seed(1)
+headers = ['include/module%d/header%d.h' % (i % 20, i) for i in range(500)]
+for i in range(10000):
+	deps = random.sample(headers, 30)
+	with open('$(DEP_DIR)/obj%d.d' % i, 'w') as f:
+		f.write('obj%d.o: src/obj%d.c' % (i, i))
+		for h in deps:
+			f.write(' \\\n  ' + h)
+		f.write('\n')
+		for h in deps:
+			f.write('\n%s:\n' % h)
+endef
+$(python-exec $(make_files))
+
+DEP_FILES := $(DEP_DIR)/*.d
+
+# Each run is a separate make process, so these include make's startup
+run-make = $(shell $(MAKE) -s --no-print-directory \
+	-f $(THIS_PATH)/scripts/load-deps.mk LOADER=$(1) \
+	.PYTHON_CACHE_DIR=$(DEP_DIR)/cache 'DEP_FILES=$(DEP_FILES)')
+include-deps = $(call run-make,include)
+py-load-deps-cold = $(shell rm -rf $(DEP_DIR)/cache)$(call run-make,python)
+py-load-deps-warm = $(call run-make,python)
+
+$(call bench,-include (10000 files),include-deps)
+$(call bench,py-load-deps with no cache (10000 files),py-load-deps-cold)
+$(call bench,py-load-deps with cache (10000 files),py-load-deps-warm)
+
+$(shell rm -rf $(DEP_DIR))
+
+endif	# .PYTHON_LOADED
@@ -0,0 +1,44 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := deps
+BENCH_ITERATIONS := 5
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+DEPS_DIR := $(shell mktemp -d)
+
+# 100 sources, each including 10 of 100 headers, which include each other
+define make_tree
+import os, random
+random.seed(1)
+os.makedirs('$(DEPS_DIR)/inc')
+for i in range(100):
+	with open('$(DEPS_DIR)/inc/h%d.h' % i, 'w') as f:
+		f.write('#pragma once\n')
+		for j in random.sample(range(100), 3):
+			f.write('#include "h%d.h"\n' % j)
+		f.write('int f%d(void);\n' % i * 50)
+for i in range(100):
+	with open('$(DEPS_DIR)/s%d.c' % i, 'w') as f:
+		for j in random.sample(range(100), 10):
+			f.write('#include <h%d.h>\n' % j)
+		f.write('int g%d(void) { return 0; }\n' % i * 200)
+endef
+$(python-exec $(make_tree))
+
+DEPS_SOURCES := $(wildcard $(DEPS_DIR)/*.c)
+
+gcc-deps = $(shell gcc -MM -I$(DEPS_DIR)/inc $(DEPS_SOURCES))
+py-deps-uncached = $(python-exec gnumake.depscan.scanner.invalidate(); \
+	gnumake.fs.invalidate())$(py-deps $(DEPS_SOURCES),$(DEPS_DIR)/inc,%.o)
+py-deps-cached = $(py-deps $(DEPS_SOURCES),$(DEPS_DIR)/inc,%.o)
+
+$(call bench,gcc -MM (100 sources),gcc-deps)
+$(call bench,py-deps uncached (100 sources),py-deps-uncached)
+$(call bench,py-deps cached (100 sources),py-deps-cached)
+
+$(shell rm -rf $(DEPS_DIR))
+
+endif	# .PYTHON_LOADED
@@ -0,0 +1,32 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := fs
+BENCH_ITERATIONS := 100
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+BENCH_DIR := $(shell mktemp -d)
+BENCH_FILES := $(addprefix $(BENCH_DIR)/,$(python-eval \
+	' '.join('f%d.c' % i for i in range(1000))))
+BENCH_FOUND := $(python-eval \
+	[open(f, 'w').close() for f in '$(BENCH_FILES)'.split()[::2]] and '')
+
+# Which of 1000 paths exist, half of them missing
+wildcard-files = $(wildcard $(BENCH_FILES))
+shell-test-files = $(shell for f in $(BENCH_FILES); do \
+	test -f $$f && echo $$f; done)
+py-isfile-files = $(py-isfile $(BENCH_FILES))
+py-mtime-files = $(py-mtime $(BENCH_FILES))
+py-newer-files = $(py-newer $(BENCH_DIR)/f0.c,$(BENCH_FILES))
+
+$(call bench,wildcard (1000 paths),wildcard-files)
+$(call bench,shell test -f (1000 paths),shell-test-files)
+$(call bench,py-isfile (1000 paths),py-isfile-files)
+$(call bench,py-mtime (1000 paths),py-mtime-files)
+$(call bench,py-newer (1000 paths),py-newer-files)
+
+$(shell rm -rf $(BENCH_DIR))
+
+endif	# .PYTHON_LOADED
@@ -0,0 +1,25 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := hash
+BENCH_ITERATIONS := 20
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+HASH_DIR := $(shell mktemp -d)
+HASH_FILES := $(addprefix $(HASH_DIR)/,$(python-eval \
+	' '.join('f%d' % i for i in range(200))))
+$(shell for f in $(HASH_FILES); do head -c 65536 /dev/urandom > $$f; done)
+
+sha256sum-files = $(shell sha256sum $(HASH_FILES))
+py-hash-files = $(py-hash sha256,$(HASH_FILES))
+py-hash-uncached = $(python-exec gnumake.hashing.index.clear())$(py-hash-files)
+
+$(call bench,sha256sum (200 x 64 KiB),sha256sum-files)
+$(call bench,py-hash uncached (200 x 64 KiB),py-hash-uncached)
+$(call bench,py-hash unchanged (200 x 64 KiB),py-hash-files)
+
+$(shell rm -rf $(HASH_DIR))
+
+endif	# .PYTHON_LOADED
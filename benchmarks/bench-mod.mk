@@ -0,0 +1,36 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := python-mod
+BENCH_ITERATIONS := 1000
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+MOD_DIR := $(shell mktemp -d)
+
+# A helper module exporting 20 functions, of the kind that each included
+# makefile fragment names with $(python-mod ...)
+define make_module
+import os
+os.mkdir('$(MOD_DIR)/bench_helpers')
+open('$(MOD_DIR)/bench_helpers/__init__.py', 'w').close()
+with open('$(MOD_DIR)/bench_helpers/__main__.py', 'w') as f:
+	f.write('import gnumake\n')
+	for i in range(20):
+		f.write('@gnumake.export\ndef bench_helper_%d(arg):\n'
+				'    return arg.upper()\n' % i)
+sys.path.insert(0, '$(MOD_DIR)')
+endef
+$(python-exec $(make_module))
+
+.PYTHON_CAPTURE := memory
+python-mod = $(python-mod bench_helpers)
+
+$(call bench,python-mod (20 exports),python-mod)
+.PYTHON_MOD_ONCE := 1
+$(call bench,python-mod (20 exports; .PYTHON_MOD_ONCE),python-mod)
+
+$(shell rm -rf $(MOD_DIR))
+
+endif	# .PYTHON_LOADED
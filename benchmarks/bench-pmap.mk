@@ -0,0 +1,35 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := pmap
+BENCH_ITERATIONS := 20
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+# Hashing releases the GIL, like most I/O-heavy work
+define python_code
+import hashlib
+bench_data = b'x' * (1 << 20)
+
+@gnumake.export
+def bench_hash(word):
+	h = hashlib.sha256(bench_data)
+	h.update(word.encode())
+	return h.hexdigest()[:8]
+endef
+
+$(python-exec $(python_code))
+
+pmap-words := $(python-eval ' '.join(str(i) for i in range(64)))
+
+foreach-hash = $(foreach w,$(pmap-words),$(bench_hash $(w)))
+pmap-hash = $(py-pmap bench_hash,$(pmap-words))
+pmap-hash-4 = $(python-eval ' '.join(gnumake.pmap(bench_hash, \
+												  '$(pmap-words)', workers=4)))
+
+$(call bench,foreach (64 x 1 MiB sha256),foreach-hash)
+$(call bench,py-pmap with make's -j (64 x 1 MiB sha256),pmap-hash)
+$(call bench,pmap with 4 workers (64 x 1 MiB sha256),pmap-hash-4)
+
+endif	# .PYTHON_LOADED
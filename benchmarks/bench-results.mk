@@ -0,0 +1,59 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := results
+BENCH_ITERATIONS ?= 50
+
+include $(THIS_PATH)/common.mk
+
+# Moving large values across the make/Python boundary
+
+define python_code
+big_value = 'src/file.c ' * (10 * 1024 * 1024 // 11)
+
+@gnumake.export
+def bench_big_result(arg):
+	return big_value
+endef
+
+$(python-exec $(python_code))
+BIG_VALUE := $(python-eval big_value)
+
+big-result = $(bench_big_result x)
+big-expand = $(python-exec gnumake.expand('$$(BIG_VALUE)'))
+big-evaluate = $(python-exec gnumake.evaluate('BIG_VALUE_COPY := ' + big_value))
+
+.PYTHON_CAPTURE := memory
+$(call bench,10 MB function result,big-result)
+$(call bench,10 MB expand,big-expand)
+$(call bench,10 MB evaluate,big-evaluate)
+
+# How the cost grows with the size of the value, from 1 byte to 10 MB
+define scaling_code
+sized_values = { str(n) : 'x' * n for n in (1, 1000, 100000, 1000000,
+											 10000000) }
+
+@gnumake.export
+def bench_sized_result(size):
+	return sized_values[size]
+endef
+$(python-exec $(scaling_code))
+
+#   $(1)   -- Size in bytes
+#   $(2)   -- Label for the size
+#   $(3)   -- Number of iterations
+define bench-size
+SIZED_VALUE_$(1) := $$(python-eval sized_values['$(1)'])
+sized-result-$(1) = $$(bench_sized_result $(1))
+sized-eval-$(1) = $$(python-eval sized_values['$(1)'])
+sized-expand-$(1) = $$(python-exec gnumake.expand('$$$$(SIZED_VALUE_$(1))'))
+$$(call set-iterations,$(3))
+$$(call bench,function result ($(2)),sized-result-$(1))
+$$(call bench,python-eval result ($(2)),sized-eval-$(1))
+$$(call bench,expand ($(2)),sized-expand-$(1))
+endef
+
+$(eval $(call bench-size,1,1 B,10000))
+$(eval $(call bench-size,1000,1 kB,10000))
+$(eval $(call bench-size,100000,100 kB,1000))
+$(eval $(call bench-size,1000000,1 MB,100))
+$(eval $(call bench-size,10000000,10 MB,10))
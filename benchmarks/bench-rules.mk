@@ -0,0 +1,38 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := rules
+BENCH_ITERATIONS := 3
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+# 60000 rules, each with a target-specific variable and a recipe, like the
+# object files of a large generated build. Each iteration makes new targets,
+# so that make doesn't warn about overriding their recipes.
+define make_rules
+import itertools
+from gnumake.rules import Rule, RuleSet
+bench_runs = itertools.count()
+def bench_rules():
+	obj = 'obj%d' % next(bench_runs)
+	return [ Rule('%s/mod%d/file%d.o' % (obj, i % 100, i),
+				  ['src/mod%d/file%d.c' % (i % 100, i), 'include/config.h'],
+				  order_only='%s/mod%d' % (obj, i % 100),
+				  variables={'CFLAGS': ('+=', '-DFILE=%d' % i)},
+				  recipe='$$(CC) $$(CFLAGS) -c -o $$@ $$<')
+			 for i in range(60000) ]
+endef
+$(python-exec $(make_rules))
+
+each-evaluate = $(python-exec for r in bench_rules(): gnumake.evaluate(str(r)))
+one-evaluate = $(python-exec RuleSet(bench_rules()).evaluate())
+build-only = $(python-exec bench_rules())
+format-only = $(python-exec gnumake.rules.to_text(bench_rules()))
+
+$(call bench,evaluate each rule (60000 rules),each-evaluate)
+$(call bench,evaluate all rules at once (60000 rules),one-evaluate)
+$(call bench,create rules only (60000 rules),build-only)
+$(call bench,create and format rules (60000 rules),format-only)
+
+endif	# .PYTHON_LOADED
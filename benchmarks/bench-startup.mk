@@ -0,0 +1,46 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := startup
+BENCH_ITERATIONS := 20
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+# Each run is a separate make process, so these include make's own startup
+STARTUP_MAKE := $(MAKE) -s --no-print-directory \
+	-f $(abspath $(THIS_PATH))/scripts/startup.mk
+STARTUP_PLUGIN := PLUGIN=$(py-gnumake-plugin)
+
+startup-none = $(shell $(STARTUP_MAKE))
+startup-plugin = $(shell $(STARTUP_MAKE) $(STARTUP_PLUGIN))
+startup-load-python = $(shell $(STARTUP_MAKE) LOAD_PYTHON=1)
+
+$(call bench,make without Python,startup-none)
+$(call bench,make loading the plugin,startup-plugin)
+$(call bench,make including load-python.mk,startup-load-python)
+
+# The time the plugin itself reports for starting the interpreter and
+# importing gnumake
+INIT_SECONDS := $(foreach _,$(wordlist 1,$(BENCH_ITERATIONS),$(bench-words)),\
+	$(shell $(STARTUP_MAKE) $(STARTUP_PLUGIN) PRINT_INIT=1))
+$(call bench-value,interpreter init (.PYTHON_INIT_SECONDS),\
+	sum(map(float$(comma) '$(INIT_SECONDS)'.split())) \
+	* 1e6 / $(words $(INIT_SECONDS)))
+
+# Recursive make, where every level loads the plugin
+#   $(1)   -- Depth
+define bench-depth
+startup-depth-$(1) = $$(shell $$(STARTUP_MAKE) DEPTH=$(1))
+startup-depth-$(1)-plugin = $$(shell $$(STARTUP_MAKE) DEPTH=$(1) \
+										$$(STARTUP_PLUGIN))
+$$(call bench,recursive make at depth $(1),startup-depth-$(1))
+$$(call bench,recursive make at depth $(1) (with Python),startup-depth-$(1)-plugin)
+endef
+$(foreach depth,1 4 16,$(eval $(call bench-depth,$(depth))))
+
+$(call bench-value,cost of Python per level of recursion,\
+	(bench_results['recursive make at depth 16 (with Python)'] \
+	 - bench_results['recursive make at depth 16']) / 17)
+
+endif	# .PYTHON_LOADED
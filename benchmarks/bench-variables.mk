@@ -0,0 +1,50 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := variables
+BENCH_ITERATIONS ?= 1000
+
+include $(THIS_PATH)/common.mk
+
+# 200 configuration variables, like a component build might read
+$(foreach i,$(python-eval ' '.join(map(str, range(200)))),\
+	$(eval CONFIG_$(i) := value-$(i)))
+$(python-exec config_names = ['CONFIG_%d' % i for i in range(200)])
+
+get-200 = $(python-exec [gnumake.var.get(n) for n in config_names])
+get-many-200 = $(python-exec gnumake.var.get_many(config_names))
+snapshot-200 = $(python-exec gnumake.var.snapshot(config_names))
+
+.PYTHON_CAPTURE := memory
+$(call bench,200 x Variables.get,get-200)
+$(call bench,Variables.get_many (200),get-many-200)
+$(call bench,Variables.snapshot (200),snapshot-200)
+
+set-200 = $(python-exec for n in config_names: gnumake.var[n] = 'x')
+update-200 = $(python-exec gnumake.var.update(dict.fromkeys(config_names, 'x')))
+
+$(call bench,200 x Variables.set,set-200)
+$(call bench,Variables.update (200),update-200)
+
+SIMPLE_CONFIG := value
+get-same-200 = $(python-exec for _ in range(200): gnumake.var['SIMPLE_CONFIG'])
+cached-get-same-200 = $(python-exec gnumake.var.enable_cache(); [gnumake.var['SIMPLE_CONFIG'] for _ in range(200)])
+
+$(call bench,200 x Variables.get (same variable),get-same-200)
+$(call bench,200 x Variables.get (same variable; cached),cached-get-same-200)
+$(python-exec gnumake.var.disable_cache())
+
+# 100000 paths, like the sources of a large build
+SOURCES := $(python-eval ' '.join('src/module%d/file%d.c' % divmod(i, 100) for i in range(100000)))
+split-sources = $(python-exec for w in gnumake.var['SOURCES'].split(): pass)
+words-sources = $(python-exec for w in gnumake.var.words('SOURCES'): pass)
+split-first = $(python-exec gnumake.var['SOURCES'].split()[0])
+words-first = $(python-exec next(gnumake.var.words('SOURCES')))
+split-count = $(python-exec len(gnumake.var['SOURCES'].split()))
+word-count = $(python-exec gnumake.var.word_count('SOURCES'))
+
+$(call bench,Variables.get().split() (100000 words),split-sources)
+$(call bench,Variables.words (100000 words),words-sources)
+$(call bench,first word with Variables.get().split() (100000 words),split-first)
+$(call bench,first word with Variables.words (100000 words),words-first)
+$(call bench,len(Variables.get().split()) (100000 words),split-count)
+$(call bench,Variables.word_count (100000 words),word-count)
@@ -0,0 +1,51 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+BENCH_NAME := wordlist
+
+include $(THIS_PATH)/common.mk
+
+ifdef .PYTHON_LOADED
+
+# Benchmark each operation on a list of words, and the make built-in closest
+# to it. Half of the words are filtered out by literal words, and all of them
+# are tested against 1000 patterns, some of which match. $(sort ...) is the
+# only built-in way to remove duplicates, though it doesn't keep the order.
+#   $(1)   -- Number of words
+define bench-size
+WL_WORDS := $$(python-eval ' '.join('dir%d/file%d.o' % (i % 50, i) \
+										for i in range($(1))))
+WL_HALF := $$(python-eval ' '.join('dir%d/file%d.o' % (i % 50, i) \
+									   for i in range(0, $(1), 2)))
+WL_PATTERNS := $$(python-eval ' '.join('dir%d/%%.o' % i \
+										   for i in range(0, 2000, 2)))
+WL_DUPLICATES := $$(WL_WORDS) $$(WL_WORDS)
+
+make-filter-out-literal = $$(filter-out $$(WL_HALF),$$(WL_WORDS))
+py-filter-out-literal = $$(py-filter-out $$(WL_HALF),$$(WL_WORDS))
+make-filter-patterns = $$(filter $$(WL_PATTERNS),$$(WL_WORDS))
+py-filter-patterns = $$(py-filter $$(WL_PATTERNS),$$(WL_WORDS))
+make-sort = $$(sort $$(WL_DUPLICATES))
+py-uniq = $$(py-uniq $$(WL_DUPLICATES))
+py-intersect = $$(py-intersect $$(WL_WORDS),$$(WL_HALF))
+make-patsubst = $$(patsubst %.o,%.c,$$(WL_WORDS))
+py-patsubst = $$(py-patsubst %.o,%.c,$$(WL_WORDS))
+
+$$(call bench,filter-out 1/2 literal ($(1) words),make-filter-out-literal)
+$$(call bench,py-filter-out 1/2 literal ($(1) words),py-filter-out-literal)
+$$(call bench,filter 1000 patterns ($(1) words),make-filter-patterns)
+$$(call bench,py-filter 1000 patterns ($(1) words),py-filter-patterns)
+$$(call bench,sort ($(1) words x 2),make-sort)
+$$(call bench,py-uniq ($(1) words x 2),py-uniq)
+$$(call bench,py-intersect ($(1) words),py-intersect)
+$$(call bench,patsubst ($(1) words),make-patsubst)
+$$(call bench,py-patsubst ($(1) words),py-patsubst)
+endef
+
+$(call set-iterations,100)
+$(eval $(call bench-size,1000))
+$(call set-iterations,10)
+$(eval $(call bench-size,10000))
+$(call set-iterations,2)
+$(eval $(call bench-size,100000))
+
+endif	# .PYTHON_LOADED
@@ -0,0 +1,72 @@
+include $(THIS_PATH)/../load-python.mk
+
+comma := ,
+
+# Number of times each benchmarked expression is expanded
+BENCH_ITERATIONS ?= 100000
+
+ifdef .PYTHON_LOADED
+
+# Results are also written to $(BENCH_OUTPUT), if it is set, as one JSON
+# object per line. See scripts/compare.py.
+define bench_code
+import time
+
+# Each result so far, by label, so that later results can be worked out from
+# earlier ones
+bench_results = {}
+
+def bench_record(us, iterations):
+	bench_results[gnumake.var['_bench_label']] = us
+	output = gnumake.expand('$$(strip $$(BENCH_OUTPUT))')
+	if output:
+		import json
+		record = { 'benchmark' : gnumake.var['BENCH_NAME'],
+				   'label' : gnumake.var['_bench_label'],
+				   'us_per_call' : round(us, 3),
+				   'iterations' : iterations }
+		with open(output, 'a') as f:
+			f.write(json.dumps(record) + '\n')
+	return '%.3f' % us
+
+def bench_report(start):
+	iterations = int(gnumake.var['BENCH_ITERATIONS'])
+	return bench_record((time.perf_counter() - start) * 1e6 / iterations,
+						iterations)
+endef
+$(python-exec $(bench_code))
+
+bench-words := $(python-eval ' '.join(['x'] * $(BENCH_ITERATIONS)))
+
+# Expand a variable once per iteration and report the average cost.
+#   $(1)   -- Label for the result
+#   $(2)   -- Name of a recursively expanded variable holding the expression
+#             to benchmark
+#   Return -- Nothing
+define bench
+$(eval _bench_start := $(python-eval time.perf_counter()))$(if \
+	$(foreach _,$(bench-words),$($(2))),)$(eval \
+	_bench_label := $(1))$(info $(strip \
+	$(BENCH_NAME): $(1): $(python-eval bench_report($(_bench_start)))) us/call)
+endef
+
+# Report a result measured some other way, such as by a sub-make
+#   $(1)   -- Label for the result
+#   $(2)   -- Python expression for the time, in microseconds
+#   Return -- Nothing
+define bench-value
+$(eval _bench_label := $(1))$(info $(strip \
+	$(BENCH_NAME): $(1): $(python-eval bench_record($(2), 1))) us)
+endef
+
+# Change the number of iterations, for expressions too slow to repeat as
+# often as the rest
+#   $(1)   -- Number of iterations
+define set-iterations
+$(eval BENCH_ITERATIONS := $(1))$(eval \
+	bench-words := $(python-eval ' '.join(['x'] * $(1))))
+endef
+
+run_benchmarks:
+
+endif	# .PYTHON_LOADED
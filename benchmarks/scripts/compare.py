@@ -0,0 +1,93 @@
+"""
+Compare benchmark results with a baseline
+
+Usage: compare.py <results> <baseline> [<threshold>]
+
+Both files hold one JSON object per line, as written by the benchmarks when
+BENCH_OUTPUT is set. A result is a regression if it takes more than threshold
+times as long as in the baseline (1.25 by default). The last line of the
+report is the number of regressions.
+
+This may be run with $(python-file ...), which raises ValueError if the
+arguments are wrong, or as a script, in which case it exits with status 1 if
+there are any regressions.
+"""
+
+import sys
+
+
+def load(path):
+    """Read results, returning the time of each by (benchmark, label)"""
+    import json
+
+    results = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                key = (record['benchmark'], record['label'])
+                results[key] = record['us_per_call']
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    Returns:
+        tuple: (lines of the report, number of regressions)
+    """
+    lines = []
+    regressions = 0
+    for key in sorted(results.keys() & baseline.keys()):
+        new = results[key]
+        old = baseline[key]
+        ratio = new / old if old else float('inf') if new else 1.0
+        if ratio > threshold:
+            status = 'REGRESSION'
+            regressions += 1
+        elif ratio < 1 / threshold:
+            status = 'improved'
+        else:
+            status = ''
+        lines.append('{}: {}: {:.3f} -> {:.3f} us ({:+.1f}%) {}'.format(
+                        key[0], key[1], old, new, (ratio - 1) * 100,
+                        status).rstrip())
+
+    for key in sorted(results.keys() - baseline.keys()):
+        lines.append('{}: {}: new'.format(*key))
+    for key in sorted(baseline.keys() - results.keys()):
+        lines.append('{}: {}: missing'.format(*key))
+    return lines, regressions
+
+def main(argv):
+    """
+    Print the report for the arguments in argv.
+
+    Returns:
+        int: The number of regressions
+
+    Raises:
+        ValueError: If the arguments are wrong
+    """
+    if len(argv) not in (3, 4):
+        raise ValueError(__doc__.strip().splitlines()[2])
+    threshold = float(argv[3]) if len(argv) > 3 else 1.25
+    lines, regressions = compare(load(argv[1]), load(argv[2]), threshold)
+    for line in lines:
+        print(line)
+    print('Regressions: {}'.format(regressions))
+    return regressions
+
+if __name__ == '__main__':
+    try:
+        regressions = main(sys.argv)
+    except ValueError as e:
+        sys.exit(e)
+    sys.exit(1 if regressions else 0)
+else:
+    # $(python-file ...) runs scripts in the makefile's shared namespace,
+    # which shouldn't be left holding this one's functions
+    try:
+        main(sys.argv)
+    finally:
+        del load, compare, main
@@ -0,0 +1,12 @@
+# Run by bench-depfiles.mk as a separate make process, loading the
+# dependency files in DEP_FILES with -include or $(py-load-deps ...)
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+ifeq ($(LOADER),include)
+-include $(DEP_FILES)
+else
+$(py-load-deps $(DEP_FILES))
+endif
+
+all:
+	@:
@@ -0,0 +1,29 @@
+# Run by bench-startup.mk as a separate make process. Loads the plugin
+# directly if PLUGIN is set, or through load-python.mk if LOAD_PYTHON is set,
+# and then runs itself recursively, DEPTH levels deep.
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+
+ifdef PLUGIN
+.PYTHONPATH := $(abspath $(dir $(PLUGIN))..)
+load $(PLUGIN)
+endif
+
+ifdef LOAD_PYTHON
+include $(dir $(THIS_MAKEFILE))../../load-python.mk
+endif
+
+ifdef PRINT_INIT
+$(info $(.PYTHON_INIT_SECONDS))
+endif
+
+DEPTH ?= 0
+COUNT := 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20 21 22 23 24 25 \
+		 26 27 28 29 30 31 32
+
+all:
+ifneq ($(DEPTH),0)
+	@$(MAKE) -s --no-print-directory -f $(THIS_MAKEFILE) \
+		DEPTH=$(words $(wordlist 2,$(DEPTH),$(COUNT)))
+else
+	@:
+endif
@@ -0,0 +1,320 @@
+"""
+Loading dependency files
+
+Builds that generate dependency files with the compiler's -MMD -MP options
+usually load them with ``-include $(OBJS:.o=.d)``, which makes make open and
+parse every one of them on every run. With thousands of them, this can take
+a good part of the time make spends reading the makefiles.
+
+``$(py-load-deps <files>)`` loads them instead. Each word is either a
+dependency file or a wildcard pattern matching them, and like -include,
+missing files are ignored. The files are parsed in Python, and the rules from
+all of them are added with a single evaluate.
+
+The rules parsed from each file are remembered under the file's status, so
+only new or changed files are read. If .PYTHON_CACHE_DIR is set, they are also
+saved there, in one file for all of them, so later runs of make only read
+that file and the dependency files that have changed. File status comes from
+:py:mod:`gnumake.fs`.
+
+Unlike -include, make doesn't try to remake the files, which is rarely wanted
+for dependency files anyway.
+"""
+
+import os
+import marshal
+import gnumake
+import gnumake.fs
+
+
+def _split_words(line):
+    """
+    Split a line of a rule into words, undoing the escaping of spaces, # and
+    $ that gcc uses.
+    """
+    if '\\' not in line and '$' not in line:
+        return line.split()
+
+    words = []
+    word = []
+    i = 0
+    n = len(line)
+    while i < n:
+        c = line[i]
+        if c == '\\' and i + 1 < n and line[i+1] in ' \t#:':
+            word.append(line[i+1])
+            i += 2
+            continue
+        elif c == '$' and i + 1 < n and line[i+1] == '$':
+            word.append('$')
+            i += 2
+            continue
+        elif c in ' \t':
+            if word:
+                words.append(''.join(word))
+                word = []
+        else:
+            word.append(c)
+        i += 1
+
+    if word:
+        words.append(''.join(word))
+    return words
+
+def _find_colon(line):
+    """Return the index of the colon separating targets from prerequisites"""
+    start = 0
+    while True:
+        i = line.find(':', start)
+        if i == -1:
+            return -1
+        elif i > 0 and line[i-1] == '\\':
+            start = i + 1   # Escaped
+        elif (i == 1 and line[0].isalpha() and line[2:3] in ('/', '\\')):
+            start = i + 1   # A Windows drive letter
+        else:
+            return i
+
+def parse(text):
+    """
+    Parse the rules in a dependency file written by gcc or a compatible
+    compiler.
+
+    Args:
+        text (string):  The contents of the file
+
+    Returns:
+        list: A (targets, prerequisites) tuple of tuples for each rule, in
+        order
+
+    Raises:
+        ValueError: If there is a line that isn't a rule
+    """
+    rules = []
+    for line in text.replace('\\\r\n', ' ').replace('\\\n', ' ').splitlines():
+        if not line or line.isspace() or line.lstrip().startswith('#'):
+            continue
+
+        colon = _find_colon(line)
+        if colon == -1:
+            raise ValueError("Not a rule: {!r}".format(line))
+        targets = _split_words(line[:colon])
+        prereqs = _split_words(line[colon+1:])
+        if not targets:
+            raise ValueError("Rule has no targets: {!r}".format(line))
+        rules.append((tuple(targets), tuple(prereqs)))
+    return rules
+
+def _format(rules):
+    """
+    Turn parsed rules back into makefile text, as a tuple of the rules with
+    prerequisites, and the targets of rules without them, each separated by
+    newlines.
+    """
+    escape = gnumake.escape_path
+    lines = []
+    empty = []
+    for targets, prereqs in rules:
+        targets = ' '.join(map(escape, targets))
+        if prereqs:
+            lines.append('{}: {}'.format(targets,
+                                         ' '.join(map(escape, prereqs))))
+        else:
+            empty.append(targets)
+    return '\n'.join(lines), '\n'.join(empty)
+
+def _read(path):
+    """Read a dependency file, returning its rules as from _format()"""
+    with open(path, encoding='utf-8', errors='surrogateescape') as f:
+        text = f.read()
+    try:
+        return _format(parse(text))
+    except ValueError as e:
+        raise ValueError('{}: {}'.format(path, e)) from None
+
+class DepFileCache:
+    """
+    The rules parsed from dependency files, kept up to date with the files.
+    The module functions all use the instance available as
+    ``gnumake.depfiles.cache``.
+
+    Attributes:
+        files_parsed (int): Number of files that have been read and parsed
+    """
+
+    FILE_NAME = 'gnumake-depfiles-{}.marshal'
+
+    # Incremented if the format of the saved rules changes
+    VERSION = 1
+
+    def __init__(self):
+        # The status of each file, by path, with the text of its rules as
+        # returned by _format(). Keeping text, rather than separate names,
+        # makes both saving and using the rules much faster.
+        self._entries = {}
+        self._loaded = False
+        self._changed = False
+        self.files_parsed = 0
+
+    def _path(self):
+        """
+        The file the rules are saved in, or None. Each directory that make is
+        run from gets its own, since the same relative dependency files may
+        be different files.
+        """
+        directory = gnumake.expand('$(strip $(.PYTHON_CACHE_DIR))')
+        if not directory:
+            return None
+
+        import hashlib
+        tag = hashlib.sha256(os.getcwd().encode(errors='surrogateescape'))
+        return os.path.join(os.path.abspath(directory),
+                            self.FILE_NAME.format(tag.hexdigest()[:16]))
+
+    def _load(self):
+        """Read the saved rules, if there are any"""
+        self._loaded = True
+        path = self._path()
+        if path is None:
+            return
+
+        try:
+            with open(path, 'rb') as f:
+                version, entries = marshal.load(f)
+        except (OSError, ValueError, EOFError, TypeError):
+            return
+        if version == self.VERSION and isinstance(entries, dict):
+            entries.update(self._entries)
+            self._entries = entries
+
+    def save(self):
+        """
+        Save the rules, if they have changed. Saving replaces the file
+        atomically, so concurrent makes can't corrupt it, although one may
+        overwrite the rules saved by another.
+        """
+        if not self._changed:
+            return
+        self._changed = False
+
+        path = self._path()
+        if path is None:
+            return
+
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                marshal.dump((self.VERSION, self._entries), f)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def text(self, paths):
+        """
+        Return the rules in dependency files as makefile text, reading only
+        the files that have changed since they were last read. Files that
+        don't exist are ignored.
+
+        The rules without prerequisites that gcc -MP adds for each header are
+        usually repeated in many files, so they are combined into one rule at
+        the end, naming each target once.
+
+        Args:
+            paths (list):   The dependency files
+
+        Returns:
+            string: The rules
+        """
+        if not self._loaded:
+            self._load()
+
+        entries = self._entries
+        found = []
+        changed = {}
+        for path in paths:
+            st = gnumake.fs.stat_or_none(path)
+            if st is None:
+                if entries.pop(path, None) is not None:
+                    self._changed = True
+                continue
+
+            stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            entry = entries.get(path)
+            if entry is None or entry[0] != stamp:
+                changed[path] = stamp
+            found.append(path)
+
+        if changed:
+            parsed = gnumake.pmap(_read, list(changed))
+            for (path, stamp), (text, empty) in zip(changed.items(), parsed):
+                entries[path] = (stamp, text, empty)
+            self.files_parsed += len(changed)
+            self._changed = True
+        self.save()
+
+        texts = []
+        empty = {}
+        for path in found:
+            entry = entries[path]
+            if entry[1]:
+                texts.append(entry[1])
+            if entry[2]:
+                empty.update(dict.fromkeys(entry[2].split('\n')))
+        if empty:
+            texts.append(' '.join(empty) + ':')
+        return '\n'.join(texts)
+
+    def clear(self):
+        """Forget all rules, including saved ones"""
+        self._entries.clear()
+        self._loaded = True
+        self._changed = True
+        self.save()
+
+# The process-wide cache
+cache = DepFileCache()
+
+def _expand_patterns(words):
+    """Expand the wildcard patterns in a list of words, in order"""
+    paths = []
+    for word in words:
+        if '*' in word or '?' in word or '[' in word:
+            import glob
+            paths.extend(sorted(glob.glob(word)))
+        else:
+            paths.append(word)
+    return paths
+
+def rules(paths):
+    """
+    Return the rules in dependency files, as described for
+    :py:meth:`DepFileCache.text`.
+
+    Args:
+        paths (list):   The dependency files
+
+    Returns:
+        list: The rules, as returned by :py:func:`parse`
+    """
+    return parse(cache.text(paths))
+
+def load(paths):
+    """
+    Add the rules in dependency files to the makefile, with a single
+    evaluate. Files that don't exist are ignored.
+
+    Args:
+        paths (list):   The dependency files
+    """
+    text = cache.text(paths)
+    if text:
+        gnumake.evaluate(text)
+
+@gnumake.export(name='py-load-deps')
+def py_load_deps(patterns):
+    """Implements $(py-load-deps ...)"""
+    load(_expand_patterns(gnumake._split_words(patterns)))
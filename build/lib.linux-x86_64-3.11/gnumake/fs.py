@@ -0,0 +1,279 @@
+"""
+Fast filesystem queries for makefiles
+
+This module keeps a process-wide cache of directory listings and file status,
+so that asking about the same paths many times, as makefiles tend to do, only
+goes to the filesystem once. Each directory is read with a single call to
+os.scandir() the first time anything in it is looked up. Its entries then
+answer existence and type queries for every file in it, and stat results are
+fetched and cached only when something like a modification time is needed.
+
+Like make's own directory cache, this assumes that files do not change behind
+its back. If the build writes a file that has already been looked up, for
+example with $(file ...) or $(shell ...) while the makefile is being parsed,
+call :py:func:`invalidate` (or use $(py-fs-invalidate ...)) before looking at
+it again.
+
+The following functions are exported to make. Each accepts a list of words,
+and answers for all of them in one call:
+
+``$(py-isfile <paths>)``
+    The paths that are regular files (or links to them)
+
+``$(py-isdir <paths>)``
+    The paths that are directories (or links to them)
+
+``$(py-mtime <paths>)``
+    The modification time of each path, in seconds, or 0 if it is missing
+
+``$(py-newer <targets>,<paths>)``
+    The paths that are newer than the oldest target, or that don't exist.
+    If a target doesn't exist, all of the paths.
+
+``$(py-fs-invalidate <paths>)``
+    Forget what is known about the paths. With no paths, forget everything.
+"""
+
+import os
+from stat import S_ISDIR, S_ISREG
+import gnumake
+
+
+class StatCache:
+    """
+    A cache of directory listings and file status. The module functions all
+    use the instance available as ``gnumake.fs.cache``.
+
+    Attributes:
+        hits (int):     Number of lookups answered from the cache
+        misses (int):   Number of lookups that had to read a directory
+        generation (int): Incremented whenever anything is invalidated, so
+                        that results derived from the cache can tell when
+                        they may be out of date
+    """
+
+    def __init__(self):
+        # Maps each directory to a dict of its entries by name, or to None if
+        # it doesn't exist or isn't a directory.
+        self._dirs = {}
+        # Status of paths in directories that can't be listed, by path
+        self._unlisted = {}
+        # Entries by path exactly as given, to skip normalizing it again
+        self._paths = {}
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def _entry(self, path):
+        """
+        Return the os.DirEntry for a path, None if it doesn't exist, or an
+        os.stat_result if it is in a directory that can't be listed.
+        """
+        try:
+            entry = self._paths[path]
+            self.hits += 1
+            return entry
+        except KeyError:
+            pass
+
+        entry = self._lookup(path)
+        self._paths[path] = entry
+        return entry
+
+    def _lookup(self, path):
+        want_dir = path.endswith(os.sep)
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        if not name:
+            # The root directory has no entry in a parent to find
+            return self._stat_unlisted(path)
+
+        try:
+            entries = self._dirs[directory]
+            self.hits += 1
+        except KeyError:
+            entries = self._scan(directory)
+
+        if entries is False:
+            return self._stat_unlisted(path)
+        elif entries is None:
+            return None
+
+        entry = entries.get(name)
+        if want_dir and entry is not None and not _is_dir(entry):
+            # "file/" doesn't exist
+            return None
+        return entry
+
+    def _scan(self, directory):
+        """Read a directory into the cache"""
+        self.misses += 1
+        try:
+            with os.scandir(directory) as it:
+                entries = { entry.name : entry for entry in it }
+        except (FileNotFoundError, NotADirectoryError):
+            entries = None
+        except OSError:
+            # Probably a directory we may search but not read. Fall back to
+            # looking at each file individually.
+            entries = False
+
+        self._dirs[directory] = entries
+        return entries
+
+    def _stat_unlisted(self, path):
+        try:
+            return self._unlisted[path]
+        except KeyError:
+            pass
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        self._unlisted[path] = st
+        return st
+
+    def stat(self, path):
+        """
+        As os.stat(), following symbolic links.
+
+        Raises:
+            FileNotFoundError: If the path doesn't exist
+        """
+        st = self.stat_or_none(path)
+        if st is None:
+            raise FileNotFoundError(2, 'No such file or directory', path)
+        return st
+
+    def stat_or_none(self, path):
+        """As stat(), but returns None if the path doesn't exist"""
+        entry = self._entry(path)
+        if entry is None or isinstance(entry, os.stat_result):
+            return entry
+
+        try:
+            return entry.stat()
+        except OSError:
+            return None     # A broken link
+
+    def exists(self, path):
+        """As os.path.exists()"""
+        return self.stat_or_none(path) is not None
+
+    def isfile(self, path):
+        """As os.path.isfile()"""
+        entry = self._entry(path)
+        if entry is None:
+            return False
+        elif isinstance(entry, os.stat_result):
+            return S_ISREG(entry.st_mode)
+
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
+
+    def isdir(self, path):
+        """As os.path.isdir()"""
+        entry = self._entry(path)
+        if entry is None:
+            return False
+        elif isinstance(entry, os.stat_result):
+            return S_ISDIR(entry.st_mode)
+
+        return _is_dir(entry)
+
+    def getmtime(self, path):
+        """As os.path.getmtime()"""
+        return self.stat(path).st_mtime
+
+    def invalidate(self, path=None):
+        """
+        Forget what is known about a path, or about all paths if path is
+        None. This includes the listing of the directory containing it, and
+        its own listing if it is a directory.
+        """
+        self.generation += 1
+        if path is None:
+            self._dirs.clear()
+            self._unlisted.clear()
+            self._paths.clear()
+            return
+
+        path = os.path.abspath(path)
+        self._dirs.pop(path, None)
+        self._dirs.pop(os.path.dirname(path), None)
+        self._unlisted.pop(path, None)
+        # Any number of spellings may refer to the path
+        self._paths.clear()
+
+def _is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+# The process-wide cache
+cache = StatCache()
+
+stat = cache.stat
+stat_or_none = cache.stat_or_none
+exists = cache.exists
+isfile = cache.isfile
+isdir = cache.isdir
+getmtime = cache.getmtime
+invalidate = cache.invalidate
+
+
+@gnumake.export(name='py-isfile')
+def py_isfile(paths):
+    """Implements $(py-isfile ...)"""
+    return ' '.join(path for path in gnumake._split_words(paths)
+                    if isfile(path))
+
+@gnumake.export(name='py-isdir')
+def py_isdir(paths):
+    """Implements $(py-isdir ...)"""
+    return ' '.join(path for path in gnumake._split_words(paths)
+                    if isdir(path))
+
+@gnumake.export(name='py-mtime')
+def py_mtime(paths):
+    """Implements $(py-mtime ...)"""
+    return ' '.join(repr(_mtime_or_zero(path))
+                    for path in gnumake._split_words(paths))
+
+@gnumake.export(name='py-newer')
+def py_newer(targets, paths):
+    """Implements $(py-newer ...)"""
+    target_times = [ _mtime_ns(target)
+                     for target in gnumake._split_words(targets) ]
+    paths = gnumake._split_words(paths)
+    if not target_times or None in target_times:
+        return ' '.join(paths)
+
+    oldest = min(target_times)
+    newer = []
+    for path in paths:
+        mtime = _mtime_ns(path)
+        if mtime is None or mtime > oldest:
+            newer.append(path)
+    return ' '.join(newer)
+
+@gnumake.export(name='py-fs-invalidate')
+def py_fs_invalidate(paths=''):
+    """Implements $(py-fs-invalidate ...)"""
+    paths = gnumake._split_words(paths)
+    if not paths:
+        invalidate()
+    for path in paths:
+        invalidate(path)
+
+def _mtime_or_zero(path):
+    st = cache.stat_or_none(path)
+    return 0 if st is None else st.st_mtime
+
+def _mtime_ns(path):
+    st = cache.stat_or_none(path)
+    return None if st is None else st.st_mtime_ns
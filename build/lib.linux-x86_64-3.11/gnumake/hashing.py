@@ -0,0 +1,147 @@
+"""
+Content hashes of files
+
+Comparing modification times makes rebuilds happen after a file is touched,
+or checked out again by git, even if its contents didn't change. Stamp rules
+can avoid that by comparing a hash of the contents instead, using
+``$(py-hash <algorithm>,<paths>)``, which returns the hex digest of each file
+in order. The algorithm is any name accepted by hashlib.new(), such as sha256.
+
+Hashing a file is much slower than looking at its status, so each digest is
+remembered under the file's device, inode, size and modification time, and
+the file is only read again if one of those changes. Digests are kept in
+memory, and also in the :py:class:`gnumake.PersistentCache` if
+.PYTHON_CACHE_DIR is set, so that later runs of make don't read unchanged
+files at all.
+
+Large files are hashed through mmap, and many files are hashed in parallel by
+:py:func:`gnumake.pmap`. File status comes from :py:mod:`gnumake.fs`, so a file
+written after it has been looked up must be invalidated there first.
+"""
+
+import os
+import time
+import gnumake
+import gnumake.fs
+
+
+# Files at least this big are hashed through mmap rather than read into memory
+MMAP_THRESHOLD = 1024 * 1024
+
+# A file modified this recently might be modified again without its mtime
+# changing, if the filesystem's timestamps are coarse. Its digest is not
+# stored persistently, since it might later be wrong.
+RACY_SECONDS = 2
+
+def _hash_file(path, algorithm):
+    """Read a file and return its hex digest"""
+    import hashlib
+    h = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            import mmap
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        else:
+            h.update(f.read())
+    return h.hexdigest()
+
+class DigestIndex:
+    """
+    Digests of files, keyed by their status. The module functions all use
+    the instance available as ``gnumake.hashing.index``.
+
+    Attributes:
+        hits (int):     Number of digests found without reading the file
+        misses (int):   Number of files that had to be hashed
+    """
+
+    def __init__(self):
+        self._digests = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(algorithm, st):
+        return (algorithm, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _persistent_key(key):
+        import hashlib
+        return hashlib.sha256(repr(('digest',) + key).encode()).digest()
+
+    def digests(self, paths, algorithm='sha256', workers=None):
+        """
+        Return the hex digest of the contents of each file.
+
+        Args:
+            paths (list):       The files to hash
+            algorithm (string): A hash algorithm supported by hashlib.new()
+            workers (int):      Number of threads used to hash files. See
+                                :py:func:`gnumake.pmap`.
+
+        Returns:
+            list: The digest of each file, in order
+
+        Raises:
+            FileNotFoundError: If any of the files doesn't exist
+            ValueError: If the algorithm isn't supported
+        """
+        # Fail early, rather than once per file in the workers. (hashlib is
+        # slow to import, so it is only imported when needed.)
+        import hashlib
+        hashlib.new(algorithm)
+
+        persistent = gnumake.persistent_cache
+        results = []
+        missing = {}
+        for path in paths:
+            st = gnumake.fs.stat(path)
+            key = self._key(algorithm, st)
+            digest = self._digests.get(key)
+            if digest is None and key not in missing:
+                digest = persistent.get(self._persistent_key(key))
+                if digest is not None:
+                    self._digests[key] = digest
+            if digest is None:
+                missing.setdefault(key, path)
+            else:
+                self.hits += 1
+            results.append(key)
+
+        if missing:
+            self.misses += len(missing)
+            started = time.time_ns()
+            hashed = gnumake.pmap(lambda path: _hash_file(path, algorithm),
+                                  list(missing.values()), workers=workers)
+            racy = started - RACY_SECONDS * 1000000000
+            for key, digest in zip(missing, hashed):
+                self._digests[key] = digest
+                if key[4] < racy:
+                    persistent.put('digest', self._persistent_key(key),
+                                   digest)
+
+        return [ self._digests[key] for key in results ]
+
+    def digest(self, path, algorithm='sha256'):
+        """As digests(), for a single file"""
+        return self.digests([path], algorithm)[0]
+
+    def clear(self):
+        """Forget every digest, including those stored persistently"""
+        self._digests.clear()
+        gnumake.persistent_cache.clear('digest')
+
+# The process-wide index
+index = DigestIndex()
+
+file_digest = index.digest
+file_digests = index.digests
+
+
+@gnumake.export(name='py-hash')
+def py_hash(algorithm, paths):
+    """Implements $(py-hash ...)"""
+    return ' '.join(file_digests(gnumake._split_words(paths),
+                                 algorithm.strip()))
@@ -0,0 +1,440 @@
+"""
+Sharing make's job slots
+
+When make runs with -j, it shares out job slots through its jobserver: a pipe
+(or, from make 4.4, a named fifo) holding one byte, called a token, for each
+slot beyond the first. A process that wants to run another job reads a token,
+and writes it back when the job is done. Each process also has a slot of its
+own, which needs no token.
+
+Work done in parallel from Python should take part in this, or a makefile
+that hashes files or runs compilers from Python under ``make -j64`` will run
+far more jobs at once than it was told to. :py:class:`Executor` runs calls in
+threads, one in make's own job slot, and one more for each token it can get.
+:py:func:`gnumake.pmap` uses it whenever there is a jobserver, and takes
+tokens for its process pools too.
+
+Make passes the jobserver to sub-makes in MAKEFLAGS, as
+``--jobserver-auth=<read fd>,<write fd>`` or ``--jobserver-auth=fifo:<path>``.
+Sub-makes only get the file descriptors if make knows they are sub-makes,
+which is when their recipe uses $(MAKE) or starts with ``+``. The top-level
+make only starts its jobserver once it has read the makefiles, so there is no
+jobserver while they are being parsed, only while recipes are expanded.
+
+Every token is written back when it is released, including when the call
+holding it raises an exception. Any still held when make exits are written
+back by an atexit handler, which runs when the plugin shuts Python down.
+"""
+
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+import gnumake
+
+
+def parse_auth(makeflags):
+    """
+    Find the jobserver in the value of MAKEFLAGS.
+
+    Args:
+        makeflags (string): The flags
+
+    Returns:
+        tuple: ``('fds', read_fd, write_fd)`` or ``('fifo', path)``, or None
+        if there is no jobserver, or it is one we can't use
+    """
+    auth = None
+    for word in makeflags.split():
+        if word == '--':
+            break
+        for option in ('--jobserver-auth=', '--jobserver-fds='):
+            if word.startswith(option):
+                auth = word[len(option):]
+
+    if not auth:
+        return None
+    elif auth.startswith('fifo:'):
+        return ('fifo', auth[5:])
+
+    read_fd, sep, write_fd = auth.partition(',')
+    if not sep or not read_fd.isdigit() or not write_fd.isdigit():
+        # Such as a Windows semaphore
+        return None
+    read_fd = int(read_fd)
+    write_fd = int(write_fd)
+    if read_fd < 0 or write_fd < 0:
+        # Make says that there is no jobserver this way
+        return None
+    return ('fds', read_fd, write_fd)
+
+def _is_fifo(fd):
+    """Return True if fd is open, and is a pipe or fifo"""
+    import stat
+    try:
+        return stat.S_ISFIFO(os.fstat(fd).st_mode)
+    except OSError:
+        return False
+
+# Every jobserver that has been opened, so that their tokens can be returned
+# at exit
+_servers = []
+
+class JobServer:
+    """
+    A connection to make's jobserver. Usually, the one returned by
+    :py:func:`client` should be used.
+
+    Tokens may be acquired and released from any thread.
+
+    Args:
+        read_fd (int):  File descriptor to read tokens from
+        write_fd (int): File descriptor to write them back to
+        close_fds (bool): Close both file descriptors in :py:meth:`close`
+
+    Attributes:
+        held (int):     Number of tokens held
+        acquired (int): Number of tokens acquired in total
+    """
+
+    def __init__(self, read_fd, write_fd, close_fds=False):
+        self._read_fd = read_fd
+        self._write_fd = write_fd
+        self._close_fds = close_fds
+        self._own_read_fd = None
+        self._tokens = []
+        self._lock = threading.Lock()
+        self.acquired = 0
+
+        # The read end of make's pipe may be blocking, and other processes
+        # read from it too, so a token seen by select() may be gone by the
+        # time we read it. Opening the pipe again through /proc gives a file
+        # of our own, which can be made non-blocking without affecting make.
+        if os.get_blocking(read_fd):
+            try:
+                self._own_read_fd = os.open('/proc/self/fd/{}'.format(read_fd),
+                                            os.O_RDONLY | os.O_NONBLOCK |
+                                            os.O_CLOEXEC)
+            except OSError:
+                pass
+
+        _servers.append(self)
+
+    @classmethod
+    def from_auth(cls, auth):
+        """
+        Connect to a jobserver.
+
+        Args:
+            auth (tuple):   As returned by :py:func:`parse_auth`
+
+        Returns:
+            JobServer: The connection, or None if the jobserver can't be
+            used, such as when make didn't pass on its file descriptors
+        """
+        if auth is None:
+            return None
+        elif auth[0] == 'fifo':
+            try:
+                fd = os.open(auth[1], os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+            except OSError:
+                return None
+            return cls(fd, fd, close_fds=True)
+
+        read_fd, write_fd = auth[1:]
+        if not _is_fifo(read_fd) or not _is_fifo(write_fd):
+            return None
+        return cls(read_fd, write_fd)
+
+    @property
+    def held(self):
+        return len(self._tokens)
+
+    def _fd(self):
+        if self._own_read_fd is not None:
+            return self._own_read_fd
+        return self._read_fd
+
+    def _read_token(self):
+        """Read a token if one is available, without blocking"""
+        import select
+
+        fd = self._fd()
+        if fd == self._read_fd and os.get_blocking(fd):
+            if not select.select([fd], [], [], 0)[0]:
+                return None
+
+        try:
+            token = os.read(fd, 1)
+        except (BlockingIOError, InterruptedError):
+            return None
+        if not token:
+            raise OSError("The jobserver has gone away")
+        return token
+
+    def acquire(self, block=True, timeout=None):
+        """
+        Acquire a token.
+
+        Args:
+            block (bool):   Wait for a token if none is available
+            timeout (float): The longest time to wait, in seconds, or None to
+                            wait as long as it takes
+
+        Returns:
+            bool: True if a token was acquired
+        """
+        import select
+
+        deadline = None
+        if block and timeout is not None:
+            deadline = time.monotonic() + timeout
+        while True:
+            token = self._read_token()
+            if token is not None:
+                with self._lock:
+                    self._tokens.append(token)
+                    self.acquired += 1
+                return True
+            elif not block:
+                return False
+
+            wait = None
+            if deadline is not None:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    return False
+            select.select([self._fd()], [], [], wait)
+
+    def release(self):
+        """
+        Return a token to the jobserver.
+
+        Raises:
+            RuntimeError: If no token is held
+        """
+        with self._lock:
+            if not self._tokens:
+                raise RuntimeError("No job token is held")
+            token = self._tokens.pop()
+        try:
+            os.write(self._write_fd, token)
+        except OSError:
+            # Try again at exit
+            with self._lock:
+                self._tokens.append(token)
+            raise
+
+    def release_all(self):
+        """Return every token held. Errors are ignored."""
+        while self._tokens:
+            try:
+                self.release()
+            except (OSError, RuntimeError):
+                break
+
+    def token(self):
+        """
+        Context manager that holds a token for the duration of its body,
+        waiting for one if necessary.
+
+        Example::
+
+            with gnumake.jobserver.client().token():
+                subprocess.run(compile_command)
+        """
+        return _Token(self)
+
+    def close(self):
+        """Return every token held, and close the connection"""
+        self.release_all()
+        if self._own_read_fd is not None:
+            os.close(self._own_read_fd)
+            self._own_read_fd = None
+        if self._close_fds:
+            os.close(self._read_fd)
+            if self._write_fd != self._read_fd:
+                os.close(self._write_fd)
+            self._close_fds = False
+        if self in _servers:
+            _servers.remove(self)
+
+class _Token:
+    """Implements JobServer.token()"""
+
+    def __init__(self, server):
+        self._server = server
+
+    def __enter__(self):
+        self._server.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.release()
+        return False
+
+def _release_all_tokens():
+    """Return the tokens of every jobserver at exit"""
+    for server in list(_servers):
+        server.release_all()
+
+import atexit
+atexit.register(_release_all_tokens)
+
+_client = None
+
+# Default argument meaning "the jobserver returned by client()"
+_DEFAULT = object()
+
+def client():
+    """
+    Return the connection to make's jobserver, opening it if necessary.
+
+    The jobserver is looked for in the MAKEFLAGS make variable, and then in
+    the MAKEFLAGS environment variable. Until one is found, it is looked for
+    again on each call, since the top-level make only starts its jobserver
+    after reading the makefiles.
+
+    Returns:
+        JobServer: The connection, or None if there is no jobserver
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    makeflags = ''
+    if gnumake._api_thread == threading.get_ident():
+        makeflags = gnumake.expand('$(MAKEFLAGS)')
+    auth = parse_auth(makeflags)
+    if auth is None:
+        auth = parse_auth(os.environ.get('MAKEFLAGS', ''))
+
+    _client = JobServer.from_auth(auth)
+    return _client
+
+class Executor(concurrent.futures.Executor):
+    """
+    Runs calls in threads, like concurrent.futures.ThreadPoolExecutor, with
+    no more threads than make's jobserver allows.
+
+    One thread runs in the job slot of the make process calling it, and each
+    other thread only starts once it has acquired a token. A thread returns
+    its token as soon as there is nothing left for it to do, even if the call
+    it ran raised an exception, so tokens aren't held while the executor is
+    idle.
+
+    The calls must not use the make API.
+
+    Args:
+        max_workers (int):  The largest number of threads. By default, this
+                            is the number of make job slots (see
+                            :py:func:`gnumake.parallel.job_slots`).
+        jobserver (JobServer): The jobserver to take tokens from. By default,
+                            this is the one returned by :py:func:`client`.
+                            If None, or there is no jobserver, threads are
+                            started up to max_workers without tokens.
+
+    Example::
+
+        with gnumake.jobserver.Executor() as pool:
+            results = list(pool.map(compile_file, sources))
+    """
+
+    def __init__(self, max_workers=None, jobserver=_DEFAULT):
+        if jobserver is _DEFAULT:
+            jobserver = client()
+        if max_workers is None:
+            import gnumake.parallel
+            max_workers = gnumake.parallel.job_slots()
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+
+        self._max_workers = max_workers
+        self._jobserver = jobserver
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._free_slot = True
+        self._threads = set()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future = concurrent.futures.Future()
+            self._queue.append((future, fn, args, kwargs))
+        self._start_workers()
+        return future
+
+    def _start_workers(self):
+        """Start a thread for each queued call, as far as tokens allow"""
+        with self._lock:
+            # Every thread is busy until the queue is empty, so any calls
+            # still queued are waiting for a thread
+            while self._queue and self._workers < self._max_workers:
+                if self._jobserver is None:
+                    slot = None
+                elif self._free_slot:
+                    self._free_slot = False
+                    slot = 'free'
+                elif self._jobserver.acquire(block=False):
+                    slot = 'token'
+                else:
+                    break
+
+                self._workers += 1
+                thread = threading.Thread(target=self._work, args=(slot,),
+                                          name='gnumake-job')
+                self._threads.add(thread)
+                thread.start()
+
+    def _work(self, slot):
+        try:
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        break
+                    future, fn, args, kwargs = self._queue.popleft()
+
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+                    del future, fn, args, kwargs
+
+                # More tokens may have become free since this thread started
+                self._start_workers()
+        finally:
+            with self._lock:
+                self._workers -= 1
+                self._threads.discard(threading.current_thread())
+                if slot == 'free':
+                    self._free_slot = True
+                elif slot == 'token':
+                    try:
+                        self._jobserver.release()
+                    except OSError:
+                        # The token is returned at exit instead
+                        pass
+                # Any call submitted after the queue was found to be empty
+                # needs another thread
+                restart = bool(self._queue)
+            if restart:
+                self._start_workers()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
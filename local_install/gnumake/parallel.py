@@ -0,0 +1,286 @@
+"""
+Running functions in parallel
+
+Exported functions are called by make one at a time. When a makefile needs to
+do the same slow piece of work for many words while it is being parsed, such
+as hashing files or reading headers, :py:func:`pmap` spreads the calls over a
+pool of workers instead. By default, the pool has as many workers as make has
+job slots (the -j option). When make's jobserver is available, only as many
+of them run at once as make can spare job slots for (see
+:py:mod:`gnumake.jobserver`).
+
+The make API is single threaded, so the function must not use it: it should
+only compute a result from its argument. :py:func:`gnumake.expand`,
+:py:func:`gnumake.evaluate` and :py:class:`gnumake.Variables` raise
+RuntimeError if they are used from a worker.
+
+From a makefile, ``$(py-pmap <function>,<words>)`` calls an exported function
+once for each word, and returns the results in order, separated by spaces.
+Caching, call statistics and tracing do not apply to these calls.
+"""
+
+import os
+import gnumake
+
+
+# Short options of make that take an argument. Any letters after them in the
+# same word are the argument, not more options.
+_OPTIONS_WITH_ARGS = frozenset('CEfIlOoW')
+
+def _jobs_from_args(args):
+    """
+    Find the number of jobs given by -j/--jobs options in a list of make
+    arguments.
+
+    Args:
+        args (list):    The arguments, which may include other options and
+                        variable assignments
+
+    Returns:
+        int: The number of jobs, 0 if unlimited, or None if not given
+    """
+    jobs = None
+    args = list(args)
+    for i, arg in enumerate(args):
+        value = None
+        if arg == '--':
+            break
+        elif arg == '--jobs' or arg.startswith('--jobs='):
+            value = arg[7:]
+        elif arg.startswith('-') and not arg.startswith('--'):
+            for j, c in enumerate(arg[1:], 1):
+                if c == 'j':
+                    value = arg[j+1:]
+                    break
+                elif c in _OPTIONS_WITH_ARGS:
+                    break
+        else:
+            continue
+
+        if value is None:
+            continue
+        elif not value and i + 1 < len(args) and args[i+1].isdigit():
+            value = args[i+1]
+        jobs = int(value) if value.isdigit() else 0
+    return jobs
+
+_job_slots = None
+
+def job_slots():
+    """
+    The number of jobs that make was told it may run at once with the -j
+    option. This is looked for in make's command line, and then in the
+    MAKEFLAGS environment variable, which is how sub-makes see it. (The
+    MAKEFLAGS make variable doesn't include it until make starts running
+    recipes.)
+
+    Returns:
+        int: The number of jobs. If -j was given without a number, this is
+        the number of CPUs. If it wasn't given at all, this is 1.
+    """
+    global _job_slots
+
+    if _job_slots is not None:
+        return _job_slots
+
+    try:
+        with open('/proc/self/cmdline', 'rb') as f:
+            cmdline = f.read().decode(errors='replace').split('\0')
+    except OSError:
+        cmdline = []
+    jobs = _jobs_from_args(cmdline[1:])
+    if jobs is None:
+        jobs = _jobs_from_args(os.environ.get('MAKEFLAGS', '').split())
+
+    if jobs is None:
+        jobs = 1
+    elif jobs == 0:
+        jobs = os.cpu_count() or 1
+    _job_slots = jobs
+    return jobs
+
+# Thread pools are created when first needed, and reused
+_thread_pools = {}
+
+def _get_thread_pool(workers):
+    try:
+        return _thread_pools[workers]
+    except KeyError:
+        pass
+
+    import concurrent.futures
+    pool = concurrent.futures.ThreadPoolExecutor(
+                            workers, thread_name_prefix='gnumake-pmap')
+    _thread_pools[workers] = pool
+    return pool
+
+# The function being run by a process pool. Worker processes are forked while
+# this is set, so they inherit it. This way, the function doesn't need to be
+# picklable, which functions defined in a makefile never are.
+_process_func = None
+
+def _init_worker_process():
+    """Prevent worker processes from using the make API"""
+    gnumake._api_thread = None
+
+def _map_chunk(func, chunk):
+    """
+    Call func for each item of a chunk, carrying on after an exception.
+
+    Returns:
+        tuple: The list of results, with None in place of any that raised,
+        and the first exception raised, or None
+    """
+    results = []
+    error = None
+    for item in chunk:
+        try:
+            results.append(func(item))
+        except Exception as e:
+            if error is None:
+                error = e
+            results.append(None)
+    return results, error
+
+def _map_chunk_in_process(chunk):
+    return _map_chunk(_process_func, chunk)
+
+def _process_map(func, chunks, workers):
+    """Run func over each chunk in a new pool of forked processes"""
+    global _process_func
+
+    import concurrent.futures
+    import multiprocessing
+
+    _process_func = func
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_init_worker_process) as pool:
+            futures = [ pool.submit(_map_chunk_in_process, chunk)
+                        for chunk in chunks ]
+            return _collect(futures)
+    finally:
+        _process_func = None
+
+def _collect(futures):
+    """Join the results of each chunk, raising the first exception in order"""
+    results = []
+    error = None
+    for future in futures:
+        chunk_results, chunk_error = future.result()
+        if error is None:
+            error = chunk_error
+        results.extend(chunk_results)
+    if error is not None:
+        raise error
+    return results
+
+def _jobserver_client():
+    """Return gnumake.jobserver.client(), importing it when first needed"""
+    import gnumake.jobserver
+    return gnumake.jobserver.client()
+
+def _serial_map(func, words):
+    """Call func for each word in this thread, as pmap() would"""
+    results, error = _map_chunk(func, words)
+    if error is not None:
+        raise error
+    return results
+
+def _chunks(words, workers):
+    """
+    Split words into a few chunks per worker, so uneven calls still balance
+    out without paying for a task per word
+    """
+    chunk_size = max(1, len(words) // (workers * 4))
+    return [ words[i:i+chunk_size] for i in range(0, len(words), chunk_size) ]
+
+def pmap(func, words, workers=None, processes=False):
+    """
+    Call a function for each item of a list in a pool of workers, like the
+    builtin map(), and return the results in order.
+
+    The function runs outside of make's main thread, so it must not use the
+    make API.
+
+    Args:
+        func (callable):    Function to call with each word
+        words (str|iterable): The items to pass to func. A string is split
+                            into words.
+        workers (int):      Number of workers. By default, this is the number
+                            of make job slots (see :py:func:`job_slots`),
+                            and when make's jobserver is available, workers
+                            other than the first only run while they hold a
+                            token. A process pool holds its tokens until all
+                            the calls are done, so it has as many processes
+                            as there were tokens free when it started.
+        processes (bool):   Use a pool of processes instead of threads. This
+                            helps functions that spend their time running
+                            Python code, rather than waiting on I/O or in code
+                            that releases the GIL. The processes are forked
+                            for each call, and the results must be picklable.
+
+    Returns:
+        list: The result of each call
+
+    Raises:
+        Exception: The first exception raised by func, in order of the
+        words, once every other call has run.
+
+    Example::
+
+        digests = gnumake.pmap(hash_file, gnumake.expand('$(SOURCES)'))
+    """
+    if isinstance(words, str):
+        words = gnumake._split_words(words)
+    else:
+        words = list(words)
+
+    jobserver = None
+    if workers is None:
+        workers = job_slots()
+        if workers > 1 and len(words) > 1:
+            jobserver = _jobserver_client()
+    if workers <= 1 or len(words) <= 1:
+        return _serial_map(func, words)
+
+    if processes:
+        if jobserver is None:
+            return _process_map(func, _chunks(words, workers), workers)
+
+        # Every process needs a job slot for as long as the pool exists, so
+        # the pool is only as large as the tokens available now
+        tokens = 0
+        try:
+            while tokens < workers - 1 and jobserver.acquire(block=False):
+                tokens += 1
+            if not tokens:
+                return _serial_map(func, words)
+            return _process_map(func, _chunks(words, tokens + 1), tokens + 1)
+        finally:
+            for _ in range(tokens):
+                jobserver.release()
+
+    chunks = _chunks(words, workers)
+    if jobserver is not None:
+        with gnumake.jobserver.Executor(workers, jobserver) as pool:
+            return _collect([ pool.submit(_map_chunk, func, chunk)
+                              for chunk in chunks ])
+
+    pool = _get_thread_pool(workers)
+    return _collect([ pool.submit(_map_chunk, func, chunk)
+                      for chunk in chunks ])
+
+@gnumake.export(name='py-pmap')
+def py_pmap(name, words):
+    """Implements $(py-pmap ...)"""
+    name = name.strip()
+    try:
+        func = gnumake._exported_functions[name]
+    except KeyError:
+        raise ValueError("{} is not an exported function".format(name)) \
+                from None
+
+    to_string = gnumake.object_to_string
+    return ' '.join(to_string(result) for result in pmap(func, words))
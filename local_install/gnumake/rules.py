@@ -0,0 +1,293 @@
+"""
+Generating rules from Python
+
+Rules could be generated by formatting makefile text and passing it to
+:py:func:`gnumake.evaluate`, but getting the escaping right is fiddly, and
+each call to make has a cost of its own. This module describes rules as
+objects instead. They are collected in a :py:class:`RuleSet`, and turned into
+makefile text all at once, to be evaluated with a single call to make.
+
+File names are escaped so that they are taken literally, including spaces,
+``#``, ``:`` and ``$``. Variable values and recipe lines are not escaped,
+except where needed to keep them intact, so that they can refer to make
+variables and automatic variables like ``$@``, as in a makefile.
+
+Example::
+
+    from gnumake.rules import Rule, PatternRule, RuleSet
+
+    rules = RuleSet()
+    rules.add(PatternRule('build/%.o', 'src/%.c', order_only='build',
+                          recipe='$(CC) $(CFLAGS) -c -o $@ $<'))
+    for name, defines in configs.items():
+        rules.add(Rule('build/{}.o'.format(name),
+                       variables={'CFLAGS': ('+=', defines)}))
+    rules.evaluate()
+"""
+
+import gnumake
+
+
+# Assignment operators allowed for target-specific variables
+_ASSIGNMENTS = frozenset(('=', ':=', '::=', '+=', '?=', '!='))
+
+def _names(names):
+    """A tuple of file names, from a string of words or an iterable"""
+    if isinstance(names, str):
+        return tuple(names.split())
+    return tuple(names)
+
+# Characters that escape_path() changes, other than spaces, which are checked
+# separately since they also separate the names
+_SPECIAL_CHARS = frozenset('\t$#:')
+_TARGET_SPECIAL_CHARS = _SPECIAL_CHARS | {'%'}
+
+def _join(names, escape, special):
+    """
+    Escape names and join them with spaces. Usually none of them need
+    escaping, which can be checked once for all of them.
+    """
+    joined = ' '.join(names)
+    if (special.isdisjoint(joined)
+            and joined.count(' ') == len(names) - 1):
+        return joined
+    return ' '.join(map(escape, names))
+
+def _escape_target(target):
+    """Escape an explicit target, including %, which would make a pattern"""
+    return gnumake.escape_path(target).replace('%', '\\%')
+
+# Variable names that have been checked
+_legal_names = set()
+
+def _variable_line(name, value):
+    """Format a target-specific variable assignment, without the targets"""
+    if isinstance(value, tuple):
+        operator, value = value
+        if operator not in _ASSIGNMENTS:
+            raise ValueError("Unknown assignment operator: " + operator)
+    else:
+        operator = '='
+
+    if name not in _legal_names:
+        if not gnumake.is_legal_name(name):
+            raise ValueError("Illegal name: " + name)
+        _legal_names.add(name)
+
+    if not isinstance(value, str):
+        value = gnumake.object_to_string(value)
+    if '\n' in value:
+        raise ValueError("Target-specific variables can't contain newlines")
+    if '#' in value:
+        value = value.replace('#', '\\#')
+    if value.endswith('\\'):
+        value += '$()'
+    return '{} {} {}'.format(name, operator, value)
+
+# Recipes as text, by their lines. Generated rules usually share a few
+# recipes.
+_recipes = {}
+_RECIPES_MAX = 1024
+
+def _recipe_text(recipe):
+    """The lines of a recipe, each starting with a tab and ending in newline"""
+    try:
+        return _recipes[recipe]
+    except KeyError:
+        pass
+
+    if len(_recipes) >= _RECIPES_MAX:
+        _recipes.clear()
+    text = _recipes[recipe] = ''.join('\t{}\n'.format(part)
+                                      for line in recipe
+                                      for part in line.split('\n'))
+    return text
+
+class Rule:
+    """
+    An explicit rule.
+
+    Args:
+        targets (string|iterable): The targets. A string is split into words.
+        prerequisites (string|iterable): The normal prerequisites
+        order_only (string|iterable): The order-only prerequisites
+        variables (dict):   Target-specific variables. Each value is either a
+                            string, which is assigned with ``=``, or an
+                            (operator, string) tuple, where the operator is
+                            any of make's assignment operators, such as
+                            ``+=`` or ``:=``. As with
+                            :py:meth:`gnumake.Variables.set`, $ is not
+                            escaped.
+        recipe (string|iterable): The lines of the recipe. A string may hold
+                            several lines, separated by newlines. Lines are
+                            not escaped.
+        double_colon (bool): If True, this is a double-colon rule
+
+    Attributes:
+        targets (tuple)
+        prerequisites (tuple)
+        order_only (tuple)
+        variables (dict)
+        recipe (tuple)
+        double_colon (bool)
+
+    Raises:
+        ValueError: If there are no targets
+    """
+
+    __slots__ = ('targets', 'prerequisites', 'order_only', 'variables',
+                 'recipe', 'double_colon')
+
+    def __init__(self, targets, prerequisites=(), order_only=(),
+                 variables=None, recipe=(), double_colon=False):
+        self.targets = _names(targets)
+        if not self.targets:
+            raise ValueError("A rule must have at least one target")
+        self.prerequisites = _names(prerequisites)
+        self.order_only = _names(order_only)
+        self.variables = variables
+        if isinstance(recipe, str):
+            recipe = recipe.split('\n')
+        self.recipe = tuple(recipe)
+        self.double_colon = double_colon
+
+    # How the targets are escaped, and the characters that need it
+    _escape_target = staticmethod(_escape_target)
+    _target_chars = _TARGET_SPECIAL_CHARS
+
+    def _format(self, lines):
+        """Append the text of the rule, ending in newline, to a list"""
+        escape = gnumake.escape_path
+        targets = _join(self.targets, self._escape_target, self._target_chars)
+
+        if self.variables:
+            for name, value in self.variables.items():
+                lines.append('{}: {}\n'.format(targets,
+                                               _variable_line(name, value)))
+
+        text = targets + ('::' if self.double_colon else ':')
+        if self.prerequisites:
+            text += ' ' + _join(self.prerequisites, escape, _SPECIAL_CHARS)
+        if self.order_only:
+            text += ' | ' + _join(self.order_only, escape, _SPECIAL_CHARS)
+        lines.append(text + '\n')
+
+        if self.recipe:
+            lines.append(_recipe_text(self.recipe))
+
+    def __str__(self):
+        lines = []
+        self._format(lines)
+        return ''.join(lines)[:-1]
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(type(self).__name__,
+                                       self.targets, self.prerequisites)
+
+class PatternRule(Rule):
+    """
+    A pattern rule, such as ``%.o: %.c``. The arguments are as for
+    :py:class:`Rule`, except that the targets, and possibly the
+    prerequisites, contain a % that is not escaped.
+
+    Raises:
+        ValueError: If a target doesn't contain a %
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for target in self.targets:
+            if '%' not in target:
+                raise ValueError("Pattern rule target has no %: " + target)
+
+    _escape_target = staticmethod(gnumake.escape_path)
+    _target_chars = _SPECIAL_CHARS
+
+def to_text(rules):
+    """
+    Turn rules into makefile text.
+
+    Args:
+        rules (iterable):   :py:class:`Rule` and :py:class:`PatternRule`
+                            objects
+
+    Returns:
+        string: The text, with the rules in order
+    """
+    lines = []
+    for rule in rules:
+        rule._format(lines)
+    return ''.join(lines)
+
+def evaluate(rules):
+    """
+    Add rules to the makefile, with a single call to
+    :py:func:`gnumake.evaluate`.
+
+    Args:
+        rules (iterable):   :py:class:`Rule` and :py:class:`PatternRule`
+                            objects
+    """
+    text = to_text(rules)
+    if text:
+        gnumake.evaluate(text)
+
+class RuleSet:
+    """
+    A collection of rules, to be added to the makefile together.
+
+    Args:
+        rules (iterable):   Rules to start with
+    """
+
+    __slots__ = ('rules',)
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    def add(self, rule):
+        """
+        Add a rule to the set.
+
+        Args:
+            rule (Rule):    The rule
+
+        Returns:
+            Rule: The rule
+        """
+        self.rules.append(rule)
+        return rule
+
+    def rule(self, *args, **kwargs):
+        """
+        Create a :py:class:`Rule` and add it to the set. The arguments are as
+        for :py:class:`Rule`.
+        """
+        return self.add(Rule(*args, **kwargs))
+
+    def pattern_rule(self, *args, **kwargs):
+        """
+        Create a :py:class:`PatternRule` and add it to the set. The arguments
+        are as for :py:class:`Rule`.
+        """
+        return self.add(PatternRule(*args, **kwargs))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __str__(self):
+        return to_text(self.rules)
+
+    def evaluate(self):
+        """
+        Add all of the rules to the makefile, with a single call to
+        :py:func:`gnumake.evaluate`, and empty the set.
+        """
+        rules = self.rules
+        self.rules = []
+        evaluate(rules)
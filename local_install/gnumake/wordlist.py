@@ -0,0 +1,312 @@
+"""
+Operations on long lists of words
+
+Make's $(filter ...) and $(filter-out ...) compare each word with each
+pattern, so filtering a long list through many patterns takes time
+proportional to the product of their lengths. The functions here index the
+patterns first, so that each word is looked up in constant time: literal
+words go in a set, and patterns containing ``%`` are grouped by the lengths of
+their prefix and suffix, so that each group is one set lookup per word.
+Make has no way to remove duplicates from a list without sorting it, and
+doing it with a recursive function is very slow.
+
+Make already uses a hash table when filtering by literal words alone, and
+$(patsubst ...) is linear, so the built-in functions are as fast or faster
+for those. The Python versions are mostly useful from Python code.
+
+The following functions are exported to make:
+
+``$(py-filter <patterns>,<words>)``
+    As $(filter ...): the words that match any of the patterns
+
+``$(py-filter-out <patterns>,<words>)``
+    As $(filter-out ...): the words that don't match any of the patterns
+
+``$(py-intersect <words>,<words>)``
+    The words of the first list that are also in the second, in order, with
+    duplicates removed
+
+``$(py-uniq <words>)``
+    The words, in order, with duplicates removed
+
+``$(py-patsubst <pattern>,<replacement>,<words>)``
+    As $(patsubst ...)
+
+Patterns follow make's rules: the first ``%`` matches any number of
+characters, and a ``%`` preceded by a backslash is literal.
+"""
+
+import gnumake
+
+
+def split_pattern(pattern):
+    """
+    Split a make pattern at its first unescaped %, removing the backslashes
+    that escape earlier ones.
+
+    Args:
+        pattern (string):   The pattern
+
+    Returns:
+        tuple: (prefix, suffix), or (pattern, None) if there is no % in it
+    """
+    if '\\' not in pattern:
+        prefix, percent, suffix = pattern.partition('%')
+        return (prefix, suffix) if percent else (pattern, None)
+
+    # Backslashes only quote the % that follows them, or each other before a
+    # %. Other backslashes are left alone.
+    prefix = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '\\':
+            j = i
+            while j < n and pattern[j] == '\\':
+                j += 1
+            if j < n and pattern[j] == '%':
+                prefix.append('\\' * ((j - i) // 2))
+                if (j - i) % 2 == 0:
+                    return ''.join(prefix), pattern[j+1:]
+                prefix.append('%')
+                i = j + 1
+            else:
+                prefix.append(pattern[i:j])
+                i = j
+        elif c == '%':
+            return ''.join(prefix), pattern[i+1:]
+        else:
+            prefix.append(c)
+            i += 1
+    return ''.join(prefix), None
+
+class PatternSet:
+    """
+    A list of make patterns, compiled so that matching a word against all of
+    them takes constant time.
+
+    Args:
+        patterns (iterable): The patterns. A string is split into words.
+    """
+
+    __slots__ = ('_literals', '_groups')
+
+    def __init__(self, patterns):
+        if isinstance(patterns, str):
+            patterns = gnumake._split_words(patterns)
+
+        self._literals = set()
+        groups = {}
+        for pattern in patterns:
+            prefix, suffix = split_pattern(pattern)
+            if suffix is None:
+                self._literals.add(prefix)
+            else:
+                groups.setdefault((len(prefix), len(suffix)),
+                                  set()).add((prefix, suffix))
+
+        # Each group is (prefix length, suffix length, {(prefix, suffix)}),
+        # sorted so that the shortest patterns, which can match the most
+        # words, are tried first.
+        self._groups = tuple(sorted((lp, ls, pairs)
+                                    for (lp, ls), pairs in groups.items()))
+
+    def match(self, word):
+        """Return True if the word matches any of the patterns"""
+        if word in self._literals:
+            return True
+
+        n = len(word)
+        for lp, ls, pairs in self._groups:
+            if lp + ls > n:
+                continue
+            if (word[:lp], word[n-ls:]) in pairs:
+                return True
+        return False
+
+    def _single_group(self):
+        """
+        Return (literals, prefix length, suffix length, pairs) if all of the
+        patterns with a % have the same lengths of prefix and suffix, which
+        is the usual case and can be tested more quickly.
+        """
+        if len(self._groups) != 1:
+            return None
+        lp, ls, pairs = self._groups[0]
+        return self._literals, lp, ls, pairs
+
+    def filter(self, words):
+        """Return the words that match any of the patterns, in order"""
+        literals = self._literals
+        if not self._groups:
+            return [ word for word in words if word in literals ]
+
+        single = self._single_group()
+        if single is not None:
+            literals, lp, ls, pairs = single
+            return [ word for word in words
+                     if word in literals
+                        or (len(word) >= lp + ls
+                            and (word[:lp], word[len(word)-ls:]) in pairs) ]
+
+        match = self.match
+        return [ word for word in words if match(word) ]
+
+    def filter_out(self, words):
+        """Return the words that don't match any of the patterns, in order"""
+        literals = self._literals
+        if not self._groups:
+            return [ word for word in words if word not in literals ]
+
+        single = self._single_group()
+        if single is not None:
+            literals, lp, ls, pairs = single
+            return [ word for word in words
+                     if not (word in literals
+                             or (len(word) >= lp + ls
+                                 and (word[:lp], word[len(word)-ls:])
+                                        in pairs)) ]
+
+        match = self.match
+        return [ word for word in words if not match(word) ]
+
+# Compiled patterns, by the text they came from. Makefiles often use the same
+# patterns many times.
+_compiled = {}
+_COMPILED_MAX = 64
+
+def _compile(patterns):
+    try:
+        return _compiled[patterns]
+    except KeyError:
+        pass
+
+    if len(_compiled) >= _COMPILED_MAX:
+        _compiled.clear()
+    compiled = _compiled[patterns] = PatternSet(patterns)
+    return compiled
+
+def _words(words):
+    if isinstance(words, str):
+        return gnumake._split_words(words)
+    return words
+
+def filter_words(patterns, words):
+    """
+    As $(filter ...).
+
+    Args:
+        patterns (string|iterable): The patterns
+        words (string|iterable):    The words to filter. Strings are split
+                                    into words.
+
+    Returns:
+        list: The words that match any of the patterns, in order
+    """
+    if isinstance(patterns, str):
+        return _compile(patterns).filter(_words(words))
+    return PatternSet(patterns).filter(_words(words))
+
+def filter_out(patterns, words):
+    """
+    As $(filter-out ...). The arguments are as for :py:func:`filter_words`.
+
+    Returns:
+        list: The words that don't match any of the patterns, in order
+    """
+    if isinstance(patterns, str):
+        return _compile(patterns).filter_out(_words(words))
+    return PatternSet(patterns).filter_out(_words(words))
+
+def intersect(words, other):
+    """
+    Return the words that are in both lists.
+
+    Args:
+        words (string|iterable):    The first list
+        other (string|iterable):    The second list
+
+    Returns:
+        list: The words of the first list that are also in the second, in
+        order, without duplicates
+    """
+    other = set(_words(other))
+    return [ word for word in dict.fromkeys(_words(words)) if word in other ]
+
+def uniq(words):
+    """
+    Remove duplicate words, keeping the first of each.
+
+    Args:
+        words (string|iterable):    The words
+
+    Returns:
+        list: The words, in order, without duplicates
+    """
+    return list(dict.fromkeys(_words(words)))
+
+def patsubst(pattern, replacement, words):
+    """
+    As $(patsubst ...).
+
+    Args:
+        pattern (string):       The pattern
+        replacement (string):   The replacement, in which the first % is
+                                replaced by the text that the % in pattern
+                                matched
+        words (string|iterable): The words
+
+    Returns:
+        list: The words, with those that match replaced
+    """
+    words = _words(words)
+    prefix, suffix = split_pattern(pattern)
+    if suffix is None:
+        # As in make, the replacement is used as it is
+        return [ replacement if word == prefix else word for word in words ]
+
+    rprefix, rsuffix = split_pattern(replacement)
+    keep_stem = rsuffix is not None
+
+    lp = len(prefix)
+    ls = len(suffix)
+    result = []
+    append = result.append
+    for word in words:
+        n = len(word)
+        if (n >= lp + ls and word.startswith(prefix)
+                and word.endswith(suffix)):
+            if keep_stem:
+                append(rprefix + word[lp:n-ls] + rsuffix)
+            else:
+                append(rprefix)
+        else:
+            append(word)
+    return result
+
+
+@gnumake.export(name='py-filter')
+def py_filter(patterns, words):
+    """Implements $(py-filter ...)"""
+    return ' '.join(filter_words(patterns, words))
+
+@gnumake.export(name='py-filter-out')
+def py_filter_out(patterns, words):
+    """Implements $(py-filter-out ...)"""
+    return ' '.join(filter_out(patterns, words))
+
+@gnumake.export(name='py-intersect')
+def py_intersect(words, other):
+    """Implements $(py-intersect ...)"""
+    return ' '.join(intersect(words, other))
+
+@gnumake.export(name='py-uniq')
+def py_uniq(words):
+    """Implements $(py-uniq ...)"""
+    return ' '.join(uniq(words))
+
+@gnumake.export(name='py-patsubst')
+def py_patsubst(pattern, replacement, words):
+    """Implements $(py-patsubst ...)"""
+    return ' '.join(patsubst(pattern.strip(), replacement.strip(), words))
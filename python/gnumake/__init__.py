@@ -8,15 +8,19 @@ You can import this module into a regular Python interpreter, but most
 functions will raise an ImportError if you try to call them.
 """
 
+# Only cheap modules are imported here, because this module is imported every
+# time make starts. Heavier modules (inspect, traceback, ctypes,
+# importlib.util, tempfile) are imported where they are first needed.
 import sys
-import tempfile
 import os
-import inspect
-import traceback
-import ctypes
-import runpy
-import string
-import importlib
+import time
+import types
+import collections
+import contextlib
+import marshal
+import struct
+import io
+import _thread
 
 import gnumake
 import gnumake._api as _api
@@ -24,7 +28,7 @@ import gnumake._api as _api
 # Make info pages say that () are actually legal, but we won't allow them
 # because in practice the parsing is too problematic. It also says that $
 # is legal, but that clearly doesn't work.
-ILLEGAL_VAR_CHARS = frozenset(string.whitespace + ':#=$()')
+ILLEGAL_VAR_CHARS = frozenset(' \t\n\r\x0b\x0c:#=$()')
 
 # Python code in a Makefile shares globals, but it shouldn't share _my_
 # globals.
@@ -67,7 +71,7 @@ def object_to_string(obj):
         return bytes(obj).decode()
     else:
         try:
-            return bytes(memoryview(obj)).encode()
+            return bytes(memoryview(obj)).decode()
         except TypeError:
             try:
                 return str(obj)
@@ -98,15 +102,136 @@ def fully_escape_string(s):
     s = s.replace('$', '$$')
     return s
 
+# Characters that need escaping in the targets and prerequisites of a rule
+_PATH_SPECIAL_CHARS = frozenset(' \t$#:')
+
+def escape_path(path):
+    """
+    Escape a file name such that it can appear as a target or prerequisite
+    of a rule. Spaces, tabs, #, : and $ are escaped.
+    """
+    if _PATH_SPECIAL_CHARS.isdisjoint(path):
+        return path
+    return (path.replace('$', '$$').replace('#', '\\#').replace(':', '\\:')
+                .replace(' ', '\\ ').replace('\t', '\\\t'))
+
+# Make only splits words on the C locale's isspace() characters. str.split()
+# also splits on these, which make keeps inside words.
+_PYTHON_ONLY_SPACES = ('[\x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029'
+                       '\u202f\u205f\u3000]')
+_PYTHON_ONLY_ASCII_SPACES = '\x1c\x1d\x1e\x1f'
+_word_patterns = None
+
+# str.isascii() is much faster than searching for _PYTHON_ONLY_SPACES, but is
+# new in Python 3.7
+_isascii = getattr(str, 'isascii', lambda s: False)
+
+def _split_words(s):
+    """Split a string into words as make would"""
+    global _word_patterns
+
+    if _isascii(s) and not any(c in s for c in _PYTHON_ONLY_ASCII_SPACES):
+        return s.split()
+
+    if _word_patterns is None:
+        import re
+        _word_patterns = (re.compile(_PYTHON_ONLY_SPACES),
+                          re.compile('[ \t\n\r\x0b\x0c]+'))
+
+    python_only_spaces, make_spaces = _word_patterns
+    if not python_only_spaces.search(s):
+        return s.split()
+    return [ word for word in make_spaces.split(s) if word ]
+
 
 # Holds all of the function implementations
 _callback_registry = {}
 
+# Each exported function (before any caching) by its make name
+_exported_functions = {}
+
+# Make is single threaded, so its API may only be used from the thread that
+# loaded us. This is set to None in worker processes, where it can't be used
+# at all.
+_api_thread = _thread.get_ident()
+
+def _check_api_thread():
+    """Raise an exception if the make API can't be used from here"""
+    if _thread.get_ident() != _api_thread:
+        raise RuntimeError("The make API can only be used from make's main "
+                           "thread")
+
+# True if we have set .PYTHON_LAST_ERROR and not yet cleared it. Tracking this
+# on our side means a successful call doesn't have to touch the makefile at
+# all unless the previous one failed.
+_last_error_set = False
+
+def _report_error(e):
+    """
+    Record an uncaught exception in .PYTHON_LAST_ERROR, printing the traceback
+    if requested.
+
+    Args:
+        e (Exception):  The exception to report
+    """
+    global _last_error_set
+
+    if _expand('$(.PYTHON_PRINT_TRACEBACK)'):
+        import traceback
+        traceback.print_exception(type(e), e, e.__traceback__)
+
+    err = fully_escape_string("{}: {}".format(type(e).__name__, e))
+    _evaluate_now('define .PYTHON_LAST_ERROR\n{}\nendef'.format(err))
+    _last_error_set = True
+
+def _clear_error():
+    """Undefine .PYTHON_LAST_ERROR if we were the last to set it."""
+    global _last_error_set
+
+    if _last_error_set:
+        _last_error_set = False
+        _evaluate_now('undefine .PYTHON_LAST_ERROR')
+
+def _dispatch(name, func, args):
+    """
+    Call an exported function on behalf of make, handling errors in the
+    way the makefile expects.
+
+    This is called directly by the native trampoline in the extension module,
+    and by _real_callback otherwise.
+
+    Args:
+        name (string):      The name make called the function by
+        func (callable):    The exported function
+        args (tuple):       The arguments, as strings
+
+    Returns:
+        string: The result of the function, or None if an error occurred.
+    """
+    try:
+        if tracer.enabled:
+            val = tracer.call(func, args, name)
+        elif call_stats.enabled:
+            val = call_stats.call(func, args, name)
+        else:
+            val = object_to_string(func(*args))
+    except Exception as e:
+        _report_error(e)
+        return None
+    finally:
+        # Make is free to change variables once we return
+        if variables._cache is not None and not variables._cache_across_calls:
+            variables.invalidate()
+
+    _clear_error()
+    return val
+
 def _real_callback(name, argc, argv):
     """
-    This is the real code that interfaces between gnumake and Python.
-    It converts the arguments from ctypes into a more Pythonic format, and
-    it converts the return value into a string usable by gnumake.
+    This is the ctypes interface between gnumake and Python, used only when
+    the native trampoline is unavailable. It converts the arguments from
+    ctypes into a more Pythonic format, and it converts the return value into
+    a string usable by gnumake.
 
     Args:
         name (bytes):   name of the function being called
@@ -116,35 +241,36 @@ def _real_callback(name, argc, argv):
     Returns:
         ctypes.c_void_p: A string allocated by gmk_alloc
     """
-
-    ret = None
+    import ctypes
 
     try:
-        if name in _callback_registry:
-            args = [ argv[i].decode() for i in range(argc) ]
-            val = _callback_registry[name](*args)
-
-        # Don't return, or we never get to the 'else'
-        val = object_to_string(val).encode()
-        ret = _api.gmk_alloc(len(val) + 1)
-        # So the C API guarantees that a bytes object has a null just after the
-        # end, so we could memmove len(val)+1...how terrible of an idea is it
-        # to actually do this?
-        ctypes.memmove(ret, val, len(val))
-        ctypes.memset(ret + len(val), 0, 1)
+        args = tuple(argv[i].decode() for i in range(argc))
     except Exception as e:
-        if expand('$(.PYTHON_PRINT_TRACEBACK)'):
-            traceback.print_exc()
-
-        err = fully_escape_string("{}: {}".format(type(e).__name__, e))
-        evaluate('define .PYTHON_LAST_ERROR\n{}\nendef'.format(err))
-    else:
-        evaluate('undefine .PYTHON_LAST_ERROR')
-
+        _report_error(e)
+        return None
+
+    name, func = _callback_registry.get(name, (name.decode(), None))
+    val = _dispatch(name, func, args)
+    if val is None:
+        return None
+
+    val = val.encode()
+    ret = _api.gmk_alloc(len(val) + 1)
+    # So the C API guarantees that a bytes object has a null just after the
+    # end, so we could memmove len(val)+1...how terrible of an idea is it
+    # to actually do this?
+    ctypes.memmove(ret, val, len(val))
+    ctypes.memset(ret + len(val), 0, 1)
     return ret
 
-_real_callback = _api.gmk_func_ptr(_real_callback)
+if _api.native_detected:
+    _api.native.set_dispatcher(_dispatch, _report_error)
+else:
+    _real_callback = _api.gmk_func_ptr(_real_callback)
+
 
+# inspect.CO_VARARGS, without importing inspect
+_CO_VARARGS = 0x04
 
 def guess_function_parameters(func):
     """
@@ -163,6 +289,19 @@ def guess_function_parameters(func):
     min_args = 0
     max_args = 0
 
+    # Plain functions can be read straight from the code object, which
+    # avoids importing inspect at startup.
+    if (type(func) is types.FunctionType and
+            not hasattr(func, '__wrapped__') and
+            not hasattr(func, '__signature__')):
+        code = func.__code__
+        max_args = code.co_argcount
+        min_args = max_args - len(func.__defaults__ or ())
+        if code.co_flags & _CO_VARARGS:
+            max_args = -1
+        return min_args, max_args
+
+    import inspect
     sig = inspect.signature(func)
     for param in sig.parameters.values():
         if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
@@ -177,7 +316,7 @@ def guess_function_parameters(func):
 
 
 def export(func=None, *, name=None, expand=True, min_args=-1,
-                                                 max_args=-1):
+                                                 max_args=-1, cache=None):
     """
     Decorator to expose a function to Python.
 
@@ -207,6 +346,13 @@ def export(func=None, *, name=None, expand=True, min_args=-1,
                             function. A value of 0 means any number of
                             arguments. A value of -1 (default) means that the
                             number of parameters will be guessed.
+        cache:              If given, memoize the results of the function.
+                            This may be True for a FunctionCache with default
+                            settings, an int giving the maximum number of
+                            results to keep, or a FunctionCache. Only use
+                            this for functions whose result depends only on
+                            their arguments (and the variables and files that
+                            the FunctionCache is told about).
 
     Examples:
 
@@ -230,6 +376,12 @@ def export(func=None, *, name=None, expand=True, min_args=-1,
         $(repeat-loop condition,loop). Both arguments are repeatedly expanded
         each time through the loop.
 
+        >>> @gnumake.export(cache=gnumake.FunctionCache(track_variables=True))
+        ... def include_flags(component):
+        ...    # Only recomputed when SRC_ROOT changes
+        ...    root = gnumake.var['SRC_ROOT']
+        ...    return ' '.join('-I' + d for d in find_includes(root, component))
+
 
     May also be used as a function::
 
@@ -250,7 +402,8 @@ def export(func=None, *, name=None, expand=True, min_args=-1,
             export(func,  name=_name,
                           min_args=min_args,
                           max_args=max_args,
-                          expand=expand)
+                          expand=expand,
+                          cache=cache)
             return func
         return inner
     else:
@@ -294,41 +447,1403 @@ def export(func=None, *, name=None, expand=True, min_args=-1,
         if min_args == 0:
             raise ValueError("min_args is zero")
 
-        name = name.encode()
-        if len(name) > 255:
+        if len(name.encode()) > 255:
             raise ValueError("name too long")
 
-        _callback_registry[name] = func
-        _api.gmk_add_function(name, _real_callback, min_args, max_args, expand)
+        # Make calls the cached wrapper, but we still return the original
+        callback = func
+        if cache is None or cache is False:
+            _function_caches.pop(name, None)
+        else:
+            if cache is True:
+                cache = FunctionCache()
+            elif not isinstance(cache, FunctionCache):
+                cache = FunctionCache(maxsize=cache)
+            callback = cache.wrap(func)
+            _function_caches[name] = cache
+
+        _exported_functions[name] = func
+
+        if _api.native_detected:
+            _api.native.add_function(name, callback, min_args, max_args,
+                                     expand)
+        else:
+            _callback_registry[name.encode()] = (name, callback)
+            _api.gmk_add_function(name.encode(), _real_callback, min_args,
+                                  max_args, expand)
 
         return func
 
 
+# Statistics returned by FunctionCache.info()
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+# The FunctionCache of each exported function that has one, keyed by name
+_function_caches = {}
+
+class FunctionCache:
+    """
+    A bounded LRU cache of the results of an exported function, keyed on its
+    arguments. Pass an instance as the cache argument of :py:func:`export`.
+    Each function needs its own instance.
+
+    A result can also depend on make variables and files. With
+    track_variables, every variable the function reads through
+    :py:data:`gnumake.var` is noted, and a cached result is only reused if
+    they all still have the same (expanded) values. Variables read in other
+    ways, such as with :py:func:`expand`, are not tracked. With file_args, the
+    arguments at the given positions are taken to be lists of file names,
+    and the modification time and size of each file become part of the key.
+
+    With persistent, results are also kept in the :py:class:`PersistentCache`
+    under .PYTHON_CACHE_DIR, where later runs of make and concurrent
+    sub-makes will find them. The key then also includes the function's
+    module, name and code, so that changing the function discards its old
+    results. Results are stored as strings, so anything else the function
+    depends on (such as a global variable, or a file that isn't one of its
+    arguments) must be made part of the arguments.
+
+    Exceptions are not cached.
+
+    Args:
+        maxsize (int):          The maximum number of results to keep, or
+                                None for no limit.
+        track_variables (bool): Reuse results only while the variables that
+                                the function read are unchanged.
+        file_args (iterable):   Positions (counting from 0) of arguments that
+                                name files the result depends on.
+        persistent (bool):      Also keep results between runs of make.
+
+    Attributes:
+        hits (int):     Number of calls answered from the cache
+        misses (int):   Number of calls that ran the function
+    """
+
+    def __init__(self, maxsize=128, track_variables=False, file_args=(),
+                       persistent=False):
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("maxsize must be positive or None")
+        self.maxsize = maxsize
+        self.track_variables = track_variables
+        self.file_args = tuple(file_args)
+        self.persistent = persistent
+        self.func = None
+        self._identity = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def wrap(self, func):
+        """
+        Return a callable that calls func through the cache. Used by
+        :py:func:`export`.
+        """
+        if self.func is not None and self.func is not func:
+            raise ValueError("FunctionCache is already used by another "
+                             "function")
+        self.func = func
+
+        if self.persistent:
+            import hashlib
+            h = hashlib.sha256()
+            code = getattr(func, '__code__', None)
+            if code is not None:
+                _hash_code(h, code)
+            self._identity = '{}.{}:{}'.format(
+                                getattr(func, '__module__', None),
+                                getattr(func, '__qualname__', repr(func)),
+                                h.hexdigest())
+
+        def cached(*args):
+            return self.call(args)
+        return cached
+
+    def call(self, args):
+        """
+        Return the result of the function for the given arguments, calling
+        it only if necessary.
+
+        Args:
+            args (tuple):   The arguments, as strings
+
+        Returns:
+            string: The result, converted with object_to_string.
+        """
+        key = args
+        if self.file_args:
+            key = (args, self._file_stamps(args))
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._still_valid(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._entries[key]
+
+        if self.persistent:
+            import hashlib
+            store_key = hashlib.sha256(
+                            repr((self._identity, key)).encode()).digest()
+            entry = persistent_cache.get(store_key)
+            if entry is not None and self._still_valid(entry):
+                self._add(key, entry)
+                self.hits += 1
+                return entry[0]
+
+        self.misses += 1
+        if self.track_variables:
+            with variables._track_reads() as reads:
+                result = object_to_string(self.func(*args))
+            names = sorted(reads)
+            values = variables._bulk_read(names, True)[0]
+        else:
+            result = object_to_string(self.func(*args))
+            names = values = None
+
+        entry = (result, names, values)
+        self._add(key, entry)
+        if self.persistent:
+            persistent_cache.put(self._identity, store_key, entry)
+        return result
+
+    @staticmethod
+    def _still_valid(entry):
+        """Check that the variables a result depends on haven't changed"""
+        result, names, values = entry
+        return not names or variables._bulk_read(names, True)[0] == values
+
+    def _add(self, key, entry):
+        """Add an entry to the in-memory cache, evicting as needed"""
+        self._entries[key] = entry
+        if self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _file_stamps(self, args):
+        """The (mtime, size) of each file named in the file arguments"""
+        stamps = []
+        for i in self.file_args:
+            if i >= len(args):
+                continue
+            for path in args[i].split():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stamps.append(None)
+                else:
+                    stamps.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamps)
+
+    def clear(self):
+        """
+        Forget all cached results and reset the counters. For a persistent
+        cache, this includes the stored results.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        if self._identity is not None:
+            persistent_cache.clear(self._identity)
+
+    def info(self):
+        """
+        Returns:
+            CacheInfo: A named tuple of hits, misses, maxsize and currsize
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+class PersistentCache:
+    """
+    A store for the results of exported functions that lasts between runs of
+    make, and is shared by every make process using the same
+    .PYTHON_CACHE_DIR. It is used by FunctionCache(persistent=True).
+
+    Results are kept in an SQLite database in .PYTHON_CACHE_DIR, which is
+    opened the first time it is needed. SQLite does its own file locking, so
+    any number of concurrent sub-makes can share it. Once the stored results
+    grow past .PYTHON_CACHE_MAX_SIZE bytes (64 MiB by default), the least
+    recently used ones are removed.
+
+    If .PYTHON_CACHE_DIR is not set, or the database can't be used, nothing
+    is stored, and persistent functions are only cached in memory.
+
+    Attributes:
+        path (string):  The database file, or None if it is not open
+        max_size (int): The maximum size of the stored results, in bytes
+        hits (int):     Number of results found in the database
+        misses (int):   Number of lookups that found nothing
+    """
+
+    FILE_NAME = 'gnumake-results.sqlite'
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    # Hits only update the last use time of a result if it is older than
+    # this many seconds. This saves a write on most hits.
+    TOUCH_INTERVAL = 60
+
+    def __init__(self):
+        self.path = None
+        self.max_size = self.DEFAULT_MAX_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._opened = False
+        self._errors = ()
+        self._added = 0
+
+    def _connect(self):
+        """Return the database connection, opening it if necessary"""
+        if self._opened:
+            return self._db
+        self._opened = True
+
+        directory = _expand('$(strip $(.PYTHON_CACHE_DIR))')
+        if not directory:
+            return None
+
+        max_size = _expand('$(strip $(.PYTHON_CACHE_MAX_SIZE))')
+        if max_size:
+            self.max_size = int(max_size)
+
+        try:
+            import sqlite3
+        except ImportError:
+            return None
+        self._errors = (OSError, sqlite3.Error)
+
+        directory = os.path.abspath(directory)
+        path = os.path.join(directory, self.FILE_NAME)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # A long timeout, because under make -j dozens of processes may
+            # be waiting for the write lock.
+            db = sqlite3.connect(path, timeout=60, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('CREATE TABLE IF NOT EXISTS results ('
+                       'key BLOB PRIMARY KEY, '
+                       'function TEXT NOT NULL, '
+                       'value BLOB NOT NULL, '
+                       'size INTEGER NOT NULL, '
+                       'last_used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS results_last_used '
+                       'ON results (last_used)')
+        except self._errors:
+            return None
+
+        self._db = db
+        self.path = path
+        return db
+
+    def get(self, key):
+        """
+        Look up a stored result.
+
+        Args:
+            key (bytes):    The key the result was stored under
+
+        Returns:
+            The stored value, or None if there isn't one
+        """
+        db = self._connect()
+        if db is None:
+            return None
+
+        try:
+            row = db.execute('SELECT value, last_used FROM results '
+                             'WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            if now - row[1] > self.TOUCH_INTERVAL:
+                db.execute('UPDATE results SET last_used = ? WHERE key = ?',
+                           (now, key))
+            value = marshal.loads(row[0])
+        except self._errors + (ValueError, EOFError, TypeError):
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, function, key, value):
+        """
+        Store a result.
+
+        Args:
+            function (string):  Identifies the function the result belongs
+                                to, so that it can be cleared
+            key (bytes):        The key to store the result under
+            value:              The result. It must be serializable with
+                                the marshal module.
+        """
+        db = self._connect()
+        if db is None:
+            return
+
+        data = marshal.dumps(value)
+        try:
+            db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                       (key, function, data, len(data), time.time()))
+        except self._errors:
+            return
+
+        # Checking the total size is comparatively expensive, so only do it
+        # once this process has added a good fraction of the limit.
+        self._added += len(data)
+        if self._added > self.max_size // 16:
+            self._added = 0
+            self.evict()
+
+    def evict(self):
+        """
+        If the stored results are larger than max_size, remove the least
+        recently used ones until they take up three quarters of it.
+        """
+        db = self._connect()
+        if db is None:
+            return
+
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                total, = db.execute('SELECT COALESCE(SUM(size), 0) '
+                                    'FROM results').fetchone()
+                excess = total - self.max_size * 3 // 4
+                if total > self.max_size:
+                    keys = []
+                    for key, size in db.execute('SELECT key, size '
+                                                'FROM results '
+                                                'ORDER BY last_used'):
+                        if excess <= 0:
+                            break
+                        keys.append((key,))
+                        excess -= size
+                    db.executemany('DELETE FROM results WHERE key = ?', keys)
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        except self._errors:
+            pass
+
+    def size(self):
+        """Return the total size of the stored results, in bytes"""
+        db = self._connect()
+        if db is None:
+            return 0
+        try:
+            return db.execute('SELECT COALESCE(SUM(size), 0) '
+                              'FROM results').fetchone()[0]
+        except self._errors:
+            return 0
+
+    def clear(self, function=None):
+        """
+        Remove stored results.
+
+        Args:
+            function (string):  If given, only remove the results of this
+                                function
+        """
+        db = self._connect()
+        if db is None:
+            return
+
+        try:
+            if function is None:
+                db.execute('DELETE FROM results')
+            else:
+                db.execute('DELETE FROM results WHERE function = ?',
+                           (function,))
+        except self._errors:
+            pass
+
+    def close(self):
+        """
+        Close the database. It will be opened again, reading
+        .PYTHON_CACHE_DIR afresh, the next time it is needed.
+        """
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+        self.path = None
+        self._opened = False
+
+# Results of FunctionCache(persistent=True) functions, shared between runs
+persistent_cache = PersistentCache()
+
+def _hash_code(h, code):
+    """
+    Add a code object to a hash. Unlike marshal.dumps(), this gives the same
+    result in every process.
+    """
+    h.update(code.co_code)
+    h.update(repr((code.co_names, code.co_varnames, code.co_argcount,
+                   code.co_kwonlyargcount, code.co_flags)).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(h, const)
+        elif isinstance(const, frozenset):
+            # The iteration order of a set of strings varies between runs
+            h.update(repr(sorted(map(repr, const))).encode())
+        else:
+            h.update(repr(const).encode())
+
+def cache_clear(name=None):
+    """
+    Forget the cached results of an exported function.
+
+    Args:
+        name (string):  The make name of the function, or None to clear the
+                        caches of all functions.
+    """
+    if name is None:
+        for cache in _function_caches.values():
+            cache.clear()
+    else:
+        _get_function_cache(name).clear()
+
+def cache_info(name):
+    """
+    Get the cache statistics of an exported function.
+
+    Args:
+        name (string):  The make name of the function
+
+    Returns:
+        CacheInfo: A named tuple of hits, misses, maxsize and currsize
+    """
+    return _get_function_cache(name).info()
+
+def _get_function_cache(name):
+    try:
+        return _function_caches[name]
+    except KeyError:
+        raise ValueError("{} is not a cached function".format(name)) from None
+
+
+# Makefile text buffered by batch(), waiting to be evaluated
+_batch_pending = []
+_batch_pending_size = 0
+_batch_flush_size = 0
+_batch_depth = 0
+
 def evaluate(s):
     """
     Evaluate a string as Makefile syntax, as if $(eval ...) had been used.
 
+    Inside a :py:func:`batch` block, the string is buffered and evaluated
+    later along with the rest of the batch.
+
+    If the :py:class:`Variables` cache is enabled, it is cleared, since the
+    string may change any variable.
+
     Note:
         GNU make handles errors by exiting the entire program.
+
+        Make is single threaded, so this raises RuntimeError if called from
+        any other thread, such as a :py:func:`pmap` worker.
+    """
+    if variables._cache is not None:
+        variables.invalidate()
+    _evaluate(s)
+
+def _evaluate(s):
+    """As evaluate(), but leaves the variable cache alone"""
+    global _batch_pending_size
+
+    _check_api_thread()
+    if _batch_depth:
+        _batch_pending.append(s)
+        _batch_pending_size += len(s)
+        if _batch_pending_size >= _batch_flush_size:
+            flush_batch()
+    else:
+        _evaluate_now(s)
+
+def _evaluate_now(s):
+    """Evaluate a string immediately, even inside a batch"""
+    _check_api_thread()
+    if tracer.enabled:
+        tracer.evaluate(s)
+    else:
+        _api.eval_string(s)
+
+def flush_batch():
+    """
+    Evaluate everything buffered by the current :py:func:`batch` with a
+    single call to make. This does nothing outside of a batch.
+    """
+    global _batch_pending_size, _batch_depth
+
+    if not _batch_pending:
+        return
+
+    text = '\n'.join(_batch_pending)
+    _batch_pending.clear()
+    _batch_pending_size = 0
+
+    # Python code called by make during the evaluation must not have its own
+    # writes buffered behind a batch that is already being flushed.
+    depth = _batch_depth
+    _batch_depth = 0
+    try:
+        _evaluate_now(text)
+    finally:
+        _batch_depth = depth
+
+@contextlib.contextmanager
+def batch(flush_size=1024*1024):
+    """
+    Context manager that buffers calls to :py:func:`evaluate` and evaluates
+    them all at once, with a single call to make, when the block exits. This
+    is much faster than evaluating many small statements separately, such as
+    when generating lots of rules or variables. Methods of
+    :py:class:`Variables` that change variables are buffered too.
+
+    To keep the results correct, the buffer is flushed before anything is
+    read back from make through :py:func:`expand` (and therefore through
+    :py:class:`Variables`). It is also flushed if the block raises an
+    exception, so statements take effect exactly as they would have without
+    the batch, only later.
+
+    Batches may be nested, in which case only the outermost batch flushes.
+
+    Args:
+        flush_size (int):   Flush automatically once this many characters
+                            are buffered. Only the outermost batch's value is
+                            used.
+
+    Example::
+
+        with gnumake.batch():
+            for obj in objects:
+                gnumake.evaluate('{}: {}'.format(obj, obj[:-2] + '.c'))
+
+    Note:
+        Statements are joined with newlines, so each one must be complete by
+        itself, as it would need to be for separate calls to
+        :py:func:`evaluate`.
     """
-    _api.gmk_eval(s.encode(), None)
+    global _batch_depth, _batch_flush_size
+
+    if not _batch_depth:
+        _batch_flush_size = flush_size
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if not _batch_depth:
+            flush_batch()
 
 def expand(s):
     """
     Expand a string according to Makefile rules
 
+    If the :py:class:`Variables` cache is enabled, it is cleared, since the
+    expansion may change variables (with $(eval ...), for example).
+
     Note:
         GNU make handles errors by exiting the entire program.
+
+        Make is single threaded, so this raises RuntimeError if called from
+        any other thread, such as a :py:func:`pmap` worker.
     """
-    s = _api.gmk_expand(s.encode())
+    if variables._cache is not None:
+        variables.invalidate()
+    return _expand(s)
+
+def _expand(s):
+    """As expand(), but leaves the variable cache alone"""
+    _check_api_thread()
+    expand_string = tracer.expand if tracer.enabled else _api.expand_string
+    if _batch_depth:
+        return _expand_in_batch(expand_string, s)
+    return expand_string(s)
+
+def _expand_words(s):
+    """As _expand(), but returns an iterator over the words of the result"""
+    _check_api_thread()
+    expand_words = tracer.expand_words if tracer.enabled else _api.expand_words
+    if _batch_depth:
+        # The whole string is expanded before the iterator is returned
+        return _expand_in_batch(expand_words, s)
+    return expand_words(s)
+
+def _expand_in_batch(expand_func, s):
+    """Flush the current batch and expand a string outside of it"""
+    global _batch_depth
+
+    if _batch_pending:
+        flush_batch()
+
+    # As in flush_batch(), functions that make calls during the expansion
+    # must not have their writes buffered, or the rest of the expansion
+    # won't see them
+    depth = _batch_depth
+    _batch_depth = 0
+    try:
+        return expand_func(s)
+    finally:
+        _batch_depth = depth
 
-    if not s:
-        return ''
+class CodeCache:
+    """
+    A bounded LRU cache of compiled code objects, keyed by source text and
+    mode. This lets $(python-eval ...) and $(python-exec ...) skip
+    recompilation when the same code is expanded repeatedly, such as in a
+    recursively expanded variable or a pattern rule.
 
-    s = ctypes.cast(s, ctypes.c_char_p)
-    ret = s.value.decode()
-    _api.gmk_free(s)
-    return ret
+    The maximum number of entries is read from the make variable
+    ``.PYTHON_CODE_CACHE_SIZE`` whenever a new entry is added. A size of 0
+    disables caching.
+
+    An instance of this class is available as ``gnumake.code_cache``.
+
+    Attributes:
+        hits (int):         Number of lookups satisfied from the cache
+        misses (int):       Number of lookups that required compilation
+        evictions (int):    Number of entries discarded to stay within size
+    """
+
+    DEFAULT_SIZE = 1024
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size(self):
+        """The maximum number of entries, from .PYTHON_CODE_CACHE_SIZE"""
+        size = _expand('$(strip $(.PYTHON_CODE_CACHE_SIZE))')
+        if not size:
+            return self.DEFAULT_SIZE
+        size = int(size)
+        if size < 0:
+            raise ValueError(".PYTHON_CODE_CACHE_SIZE must not be negative")
+        return size
+
+    def compile(self, source, filename, mode):
+        """
+        Compile source, returning a cached code object if possible.
+
+        Args:
+            source (string):    The Python source code
+            filename (string):  The file name to use in tracebacks
+            mode (string):      'eval' or 'exec', as for compile()
+
+        Returns:
+            code: The compiled code object
+        """
+        key = (source, filename, mode)
+        try:
+            code = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return code
+
+        self.misses += 1
+        code = compile(source, filename, mode)
+
+        size = self.size
+        if size:
+            self._entries[key] = code
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return code
+
+    def clear(self):
+        """Discard all cached code objects and reset the counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Returns the number of cached code objects"""
+        return len(self._entries)
+
+# Compiled code used by $(python-eval ...) and $(python-exec ...)
+code_cache = CodeCache()
+
+class ScriptCache:
+    """
+    Compiled code for scripts run by $(python-file ...).
+
+    Each script is compiled at most once per make process, and only again if
+    it changes. The bytecode is also saved to disk in the same format and
+    location Python uses for imported modules (usually a ``__pycache__``
+    directory next to the script, or under ``.PYTHONPYCACHEPREFIX``), so
+    later make invocations and sub-makes can skip compilation entirely. No
+    bytecode is written if ``.PYTHONDONTWRITEBYTECODE`` is set.
+
+    Bytecode is keyed by the script's path, modification time and size, and
+    by the interpreter's magic number.
+
+    An instance of this class is available as ``gnumake.script_cache``.
+
+    Attributes:
+        hits (int):     Number of times compiled code was reused in-process
+        loads (int):    Number of times bytecode was loaded from disk
+        compiles (int): Number of times a script was compiled from source
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.loads = 0
+        self.compiles = 0
+
+    def compile(self, script):
+        """
+        Return the compiled code for a script, compiling it if necessary.
+
+        Args:
+            script (string):    Path to the script
+
+        Returns:
+            code: The compiled code object
+        """
+        path = os.path.abspath(script)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[1]
+
+        import importlib.util
+        try:
+            bytecode_path = importlib.util.cache_from_source(path)
+        except NotImplementedError:
+            # This implementation doesn't cache bytecode at all
+            bytecode_path = None
+
+        header = self._header(st)
+        code = None
+        if bytecode_path:
+            code = self._load(bytecode_path, header)
+
+        if code is not None:
+            self.loads += 1
+        else:
+            with open(path, 'rb') as fp:
+                code = compile(fp.read(), path, 'exec')
+            self.compiles += 1
+            if bytecode_path and not self._dont_write_bytecode():
+                self._save(bytecode_path, header, code)
+
+        self._entries[path] = (stamp, code)
+        return code
+
+    def clear(self):
+        """
+        Forget all compiled code held in memory and reset the counters. Saved
+        bytecode is not affected.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.loads = 0
+        self.compiles = 0
+
+    @staticmethod
+    def _header(st):
+        """Build a .pyc header for a script with the given stat result"""
+        import importlib.util
+        return importlib.util.MAGIC_NUMBER + struct.pack('<III', 0,
+                                                int(st.st_mtime) & 0xFFFFFFFF,
+                                                st.st_size & 0xFFFFFFFF)
+
+    @staticmethod
+    def _dont_write_bytecode():
+        return (sys.dont_write_bytecode or
+                bool(_expand('$(strip $(.PYTHONDONTWRITEBYTECODE))')))
+
+    @staticmethod
+    def _load(bytecode_path, header):
+        """Load bytecode from disk, or return None if it is missing or stale"""
+        try:
+            with open(bytecode_path, 'rb') as fp:
+                data = fp.read()
+        except OSError:
+            return None
+
+        if data[:len(header)] != header:
+            return None
+
+        try:
+            return marshal.loads(data[len(header):])
+        except (ValueError, EOFError, TypeError):
+            return None
+
+    @staticmethod
+    def _save(bytecode_path, header, code):
+        """
+        Save bytecode to disk. Failure is not an error: we just compile again
+        next time. The file is written under a temporary name and renamed so
+        that concurrent sub-makes never see a partial file.
+        """
+        tmp_path = '{}.{}'.format(bytecode_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(bytecode_path), exist_ok=True)
+            with open(tmp_path, 'wb') as fp:
+                fp.write(header)
+                fp.write(marshal.dumps(code))
+            os.replace(tmp_path, bytecode_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+# Compiled code used by $(python-file ...)
+script_cache = ScriptCache()
+
+class ModuleCache:
+    """
+    Modules run by $(python-mod ...).
+
+    Each module is found and its code loaded at most once per make process,
+    and again only if its source changes. (Bytecode is saved to disk as for
+    an import.)
+
+    By default, every $(python-mod ...) runs the module again, as
+    runpy.run_module() would. If ``.PYTHON_MOD_ONCE`` is set, a module is
+    only run the first time it is named, and again if its source changes.
+    Later calls do nothing and return nothing. Either way, the namespace the
+    module last ran in is kept, and is available from :py:meth:`namespace`.
+
+    An instance of this class is available as ``gnumake.module_cache``.
+
+    Attributes:
+        runs (int):     Number of times a module was run
+        skipped (int):  Number of runs avoided because the module had already
+                        been run, with .PYTHON_MOD_ONCE set
+        loads (int):    Number of times a module's code was loaded
+    """
+
+    def __init__(self):
+        # (spec, stamp, code) for each module, by name
+        self._code = {}
+        # (stamp, namespace) for each module that has been run, by name
+        self._namespaces = {}
+        self.runs = 0
+        self.skipped = 0
+        self.loads = 0
+
+    @staticmethod
+    def _stamp(spec):
+        """The modification time and size of a module's source, or None"""
+        if not spec.has_location:
+            return None
+        try:
+            st = os.stat(spec.origin)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @classmethod
+    def _find(cls, mod):
+        """Find the spec of the module that runpy would run for a name"""
+        import importlib.util
+        spec = importlib.util.find_spec(mod)
+        if spec is None:
+            raise ImportError("No module named {}".format(mod), name=mod)
+
+        # As with runpy, a package runs its __main__ submodule
+        if spec.submodule_search_locations is not None:
+            if mod == '__main__' or mod.endswith('.__main__'):
+                raise ImportError("Cannot use package as __main__ module")
+            return cls._find(mod + '.__main__')
+        return spec
+
+    def code(self, mod):
+        """
+        Return the spec and compiled code of a module, loading the code if
+        it hasn't been loaded before or the source has changed.
+
+        Args:
+            mod (string):   The module name, as given to $(python-mod ...)
+
+        Returns:
+            tuple: (spec, code)
+        """
+        entry = self._code.get(mod)
+        if entry is not None:
+            spec, stamp, code = entry
+            if stamp is not None and self._stamp(spec) == stamp:
+                return spec, code
+
+        spec = self._find(mod)
+        # Taken before loading, so that a change while loading is seen next
+        # time
+        stamp = self._stamp(spec)
+        code = spec.loader.get_code(spec.name)
+        if code is None:
+            raise ImportError("No code object available for {}".format(mod))
+        self.loads += 1
+
+        self._code[mod] = (spec, stamp, code)
+        return spec, code
+
+    def precompile(self, names):
+        """
+        Load the code of modules ahead of time. Modules that can't be found
+        or compiled are skipped. The error is raised when they are run
+        instead.
+
+        Args:
+            names (iterable):   Module names
+        """
+        for mod in names:
+            try:
+                self.code(mod)
+            except (ImportError, SyntaxError, ValueError):
+                pass
+
+    def run(self, mod, once=False):
+        """
+        Run a module in a new namespace, as $(python-mod ...) does.
+
+        Args:
+            mod (string):   The module name
+            once (bool):    If True, do nothing if the module has already
+                            been run and its source hasn't changed
+
+        Returns:
+            dict: The namespace the module ran in, or None if it wasn't run
+        """
+        if once:
+            entry = self._namespaces.get(mod)
+            if entry is not None:
+                stamp, namespace = entry
+                if (stamp is not None
+                        and self._stamp(namespace['__spec__']) == stamp):
+                    self.skipped += 1
+                    return None
+
+        spec, code = self.code(mod)
+        stamp = self._code[mod][1]
+        namespace = dict(_python_globals)
+        namespace.update(__name__ = spec.name,
+                         __file__ = spec.origin if spec.has_location else None,
+                         __cached__ = spec.cached,
+                         __doc__ = None,
+                         __loader__ = spec.loader,
+                         __package__ = spec.parent,
+                         __spec__ = spec)
+
+        self.runs += 1
+        exec(code, namespace)
+        self._namespaces[mod] = (stamp, namespace)
+        return namespace
+
+    def namespace(self, mod):
+        """
+        Return the namespace a module last ran in, or None if it hasn't been
+        run.
+        """
+        entry = self._namespaces.get(mod)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        """Forget all modules and namespaces, and reset the counters"""
+        self._code.clear()
+        self._namespaces.clear()
+        self.runs = 0
+        self.skipped = 0
+        self.loads = 0
+
+# Modules run by $(python-mod ...)
+module_cache = ModuleCache()
+
+
+def _function_name(func):
+    """Name an exported function when make's name for it isn't known"""
+    return getattr(func, '__name__', repr(func))
+
+def _output_path(path):
+    """Resolve a file name given in the makefile, replacing %p with the PID"""
+    return os.path.abspath(path.replace('%p', str(os.getpid())))
+
+
+class FunctionStats:
+    """
+    Call statistics for a single exported function. Times are wall-clock
+    seconds and include any nested calls made back into make.
+
+    Attributes:
+        name (string):          The make name of the function
+        calls (int):            Number of calls
+        errors (int):           Number of calls that raised an exception
+        total_time (float):     Total time spent in the function
+        max_time (float):       Time taken by the slowest call
+        bytes_in (int):         Total size of the arguments, in bytes
+        bytes_out (int):        Total size of the results, in bytes
+    """
+
+    __slots__ = ('name', 'calls', 'errors', 'total_time', 'max_time',
+                 'bytes_in', 'bytes_out')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self):
+        """Return the statistics as a dict suitable for JSON"""
+        return { 'calls' : self.calls,
+                 'errors' : self.errors,
+                 'total_seconds' : self.total_time,
+                 'max_seconds' : self.max_time,
+                 'bytes_in' : self.bytes_in,
+                 'bytes_out' : self.bytes_out,
+               }
+
+
+class CallStats:
+    """
+    Records call statistics for every exported function, including
+    $(python-eval ...) and friends. Collection is off by default, and is
+    turned on when Py-gnumake is loaded if .PYTHON_STATS or .PYTHON_PROFILE
+    is set.
+
+    The results are written when make exits: a JSON summary to .PYTHON_STATS,
+    and, if .PYTHON_PROFILE is set, cProfile data for the time spent inside
+    exported functions, which can be read with the pstats module. In either
+    file name, %p is replaced by the process ID, so that sub-makes don't
+    overwrite each other's results.
+
+    Attributes:
+        enabled (bool):         True if statistics are being collected
+        functions (dict):       FunctionStats for each function that has been
+                                called, keyed by name
+        path (string):          Where the JSON summary is written, or None
+        profile_path (string):  Where the profile is written, or None
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.functions = {}
+        self.path = None
+        self.profile_path = None
+        self._profiler = None
+        self._depth = 0
+        self._atexit_registered = False
+
+    def enable(self, path=None, profile_path=None):
+        """
+        Start collecting statistics.
+
+        Args:
+            path (string):          If given, write a JSON summary here on
+                                    exit.
+            profile_path (string):  If given, profile exported functions with
+                                    cProfile, and write the results here on
+                                    exit.
+        """
+        if path:
+            self.path = _output_path(path)
+        if profile_path:
+            self.profile_path = _output_path(profile_path)
+            if self._profiler is None:
+                import cProfile
+                self._profiler = cProfile.Profile()
+
+        if not self._atexit_registered and (self.path or self.profile_path):
+            import atexit
+            atexit.register(self.write)
+            self._atexit_registered = True
+
+        self.enabled = True
+
+    def disable(self):
+        """Stop collecting statistics. Results collected so far are kept."""
+        self.enabled = False
+
+    def clear(self):
+        """Forget all statistics collected so far"""
+        self.functions.clear()
+        if self._profiler is not None:
+            self._profiler.clear()
+
+    def call(self, func, args, name=None):
+        """
+        Call an exported function, recording its statistics.
+
+        Args:
+            func (callable):    The exported function
+            args (tuple):       The arguments, as strings
+            name (string):      The name make called it by, which statistics
+                                are recorded under. A function may be
+                                exported under several names. By default,
+                                this is its __name__.
+
+        Returns:
+            string: The result of the function, as from object_to_string
+        """
+        if name is None:
+            name = _function_name(func)
+        entry = self.functions.get(name)
+        if entry is None:
+            entry = self.functions[name] = FunctionStats(name)
+
+        entry.calls += 1
+        entry.bytes_in += sum(len(arg.encode()) for arg in args)
+
+        # Only the outermost call is profiled; cProfile already sees the
+        # nested ones.
+        profiler = self._profiler if self._depth == 0 else None
+        self._depth += 1
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            val = object_to_string(func(*args))
+        except BaseException:
+            entry.errors += 1
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            entry.total_time += elapsed
+            if elapsed > entry.max_time:
+                entry.max_time = elapsed
+
+        entry.bytes_out += len(val.encode())
+        return val
+
+    def as_dict(self):
+        """Return all statistics as a dict suitable for JSON"""
+        return { 'pid' : os.getpid(),
+                 'makelevel' : int(os.environ.get('MAKELEVEL') or 0),
+                 'functions' : { name : entry.as_dict() for name, entry
+                                 in sorted(self.functions.items()) },
+               }
+
+    def write(self):
+        """
+        Write the results to path and profile_path. Called automatically when
+        make exits.
+        """
+        if self.path:
+            import json
+            with open(self.path, 'w') as fp:
+                json.dump(self.as_dict(), fp, indent=2)
+                fp.write('\n')
+
+        if self.profile_path and self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+
+# Statistics for exported functions
+call_stats = CallStats()
+
+
+class Tracer:
+    """
+    Records a timeline of the time spent in Python: every call to an exported
+    function, and every evaluate and expand that reaches make. Tracing is off
+    by default, and is turned on when Py-gnumake is loaded if .PYTHON_TRACE is
+    set.
+
+    Each span is tagged with MAKELEVEL and with the last makefile in
+    MAKEFILE_LIST when the outermost span began. Spans are kept in a ring
+    buffer, so a long build keeps only the most recent max_events of them.
+
+    When make exits, the timeline is written to .PYTHON_TRACE in the Chrome
+    trace event format, which can be viewed with chrome://tracing or
+    Perfetto. %p in the file name is replaced by the process ID, so that each
+    sub-make writes its own file. Timestamps come from the monotonic clock, so
+    the files of sub-makes line up with each other.
+
+    Attributes:
+        enabled (bool):     True if spans are being recorded
+        path (string):      Where the trace is written, or None
+        recorded (int):     Number of spans recorded, including any that
+                            have since been dropped from the buffer
+    """
+
+    # How much of the arguments or makefile text to keep with each span
+    DETAIL_SIZE = 200
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.recorded = 0
+        self._events = collections.deque(maxlen=100000)
+        self._depth = 0
+        self._makefile = ''
+        self._atexit_registered = False
+
+    @property
+    def max_events(self):
+        """The maximum number of spans kept"""
+        return self._events.maxlen
+
+    @property
+    def dropped(self):
+        """The number of spans dropped because the buffer was full"""
+        return self.recorded - len(self._events)
+
+    def enable(self, path=None, max_events=None):
+        """
+        Start recording spans.
+
+        Args:
+            path (string):      If given, write the trace here on exit.
+            max_events (int):   If given, the size of the ring buffer.
+        """
+        if max_events is not None:
+            if max_events <= 0:
+                raise ValueError("max_events must be positive")
+            self._events = collections.deque(self._events, maxlen=max_events)
+
+        if path:
+            self.path = _output_path(path)
+            if not self._atexit_registered:
+                import atexit
+                atexit.register(self.write)
+                self._atexit_registered = True
+
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording spans. Spans recorded so far are kept."""
+        self.enabled = False
+
+    def clear(self):
+        """Forget all spans recorded so far"""
+        self._events.clear()
+        self.recorded = 0
+
+    @contextlib.contextmanager
+    def span(self, name, category='python', detail=''):
+        """
+        Context manager that records a span around its body, if tracing is
+        enabled. Use this to mark interesting regions of your own code.
+
+        Args:
+            name (string):      Name of the span
+            category (string):  Category of the span
+            detail (string):    Extra text to show with the span
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if self._depth == 0:
+            self._makefile = _api.expand_string(
+                                        '$(lastword $(MAKEFILE_LIST))')
+        self._depth += 1
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self._depth -= 1
+            self._events.append((name, category, start, end - start,
+                                 self._makefile, detail[:self.DETAIL_SIZE]))
+            self.recorded += 1
+
+    def call(self, func, args, name=None):
+        """Call an exported function as CallStats.call does, recording a span"""
+        if name is None:
+            name = _function_name(func)
+        with self.span(name, 'function', ','.join(args)):
+            if call_stats.enabled:
+                return call_stats.call(func, args, name)
+            return object_to_string(func(*args))
+
+    def evaluate(self, s):
+        """Evaluate s immediately, recording a span"""
+        with self.span('evaluate', 'make', s):
+            _api.eval_string(s)
+
+    def expand(self, s):
+        """Expand s, recording a span"""
+        with self.span('expand', 'make', s):
+            return _api.expand_string(s)
+
+    def expand_words(self, s):
+        """As expand(), but returns an iterator over the words of the result"""
+        with self.span('expand', 'make', s):
+            return _api.expand_words(s)
+
+    def as_dict(self):
+        """Return the trace as a dict in the Chrome trace event format"""
+        pid = os.getpid()
+        level = int(os.environ.get('MAKELEVEL') or 0)
+        events = [{ 'name' : 'process_name',
+                    'ph' : 'M',
+                    'pid' : pid,
+                    'tid' : pid,
+                    'args' : { 'name' : 'make[{}] {}'.format(level, pid) },
+                 }]
+
+        for name, category, start, duration, makefile, detail in self._events:
+            events.append({ 'name' : name,
+                            'cat' : category,
+                            'ph' : 'X',
+                            'ts' : start / 1000,
+                            'dur' : duration / 1000,
+                            'pid' : pid,
+                            'tid' : pid,
+                            'args' : { 'makefile' : makefile,
+                                       'makelevel' : level,
+                                       'detail' : detail },
+                          })
+
+        return { 'traceEvents' : events,
+                 'displayTimeUnit' : 'ms',
+                 'otherData' : { 'dropped_events' : self.dropped },
+               }
+
+    def write(self):
+        """Write the trace to path. Called automatically when make exits."""
+        if self.path:
+            import json
+            with open(self.path, 'w') as fp:
+                json.dump(self.as_dict(), fp)
+                fp.write('\n')
+
+# Timeline of Python activity
+tracer = Tracer()
+
+def _enable_instrumentation():
+    """Turn on call statistics and tracing if the makefile asks for them"""
+    stats_path = _expand('$(strip $(.PYTHON_STATS))')
+    profile_path = _expand('$(strip $(.PYTHON_PROFILE))')
+    if stats_path or profile_path:
+        call_stats.enable(stats_path, profile_path)
+
+    trace_path = _expand('$(strip $(.PYTHON_TRACE))')
+    if trace_path:
+        max_events = _expand('$(strip $(.PYTHON_TRACE_EVENTS))')
+        tracer.enable(trace_path, int(max_events) if max_events else None)
+
+if _api.gmk_detected:
+    _enable_instrumentation()
 
 @export(name='python-eval')
 def python_eval(arg):
@@ -336,7 +1851,93 @@ def python_eval(arg):
     Implements $(python-eval ...)
     Evaluate a Python expression and return the result
     """
-    return eval(arg, _python_globals)
+    return eval(code_cache.compile(arg, '<string>', 'eval'), _python_globals)
+
+class StdoutCapture:
+    """
+    Context manager that captures anything written to stdout while it is
+    active. Used by $(python-exec ...), $(python-file ...) and
+    $(python-mod ...).
+
+    There are two modes:
+
+    - ``'fd'`` (the default) redirects file descriptor 1, so it also captures
+      output written by subprocesses, C extensions, and anything else that
+      writes to the file descriptor directly.
+    - ``'memory'`` replaces ``sys.stdout`` with an in-memory buffer. This is
+      much cheaper, but only captures output written through ``sys.stdout``
+      (e.g. by ``print``).
+
+    If mode is None, it is read from the make variable ``.PYTHON_CAPTURE``.
+
+    Attributes:
+        output (string):    The captured output, with trailing newlines
+                            removed. Available once the block exits.
+    """
+
+    MODES = ('fd', 'memory')
+
+    # Capture files not currently in use. They are reused rather than
+    # created for every call. (More than one is needed for nested calls.)
+    _spare_files = []
+
+    def __init__(self, mode=None):
+        if mode is None:
+            mode = _expand('$(strip $(.PYTHON_CAPTURE))') or 'fd'
+        if mode not in self.MODES:
+            raise ValueError("Capture mode must be one of: {}".format(
+                                                    ', '.join(self.MODES)))
+        self.mode = mode
+        self.output = ''
+
+    def __enter__(self):
+        if self.mode == 'memory':
+            self._stdout_original = sys.stdout
+            self._buffer = io.StringIO()
+            sys.stdout = self._buffer
+        else:
+            self._flush()
+            self._file = self._get_file()
+            self._stdout_original = os.dup(1)
+            os.dup2(self._file.fileno(), 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode == 'memory':
+            sys.stdout = self._stdout_original
+            output = self._buffer.getvalue()
+        else:
+            self._flush()
+            os.dup2(self._stdout_original, 1)
+            os.close(self._stdout_original)
+
+            self._file.seek(0)
+            output = self._file.read().decode()
+            self._file.seek(0)
+            self._file.truncate()
+            self._spare_files.append(self._file)
+
+        self.output = output.rstrip('\n')
+        return False
+
+    @classmethod
+    def _get_file(cls):
+        """Get an unbuffered capture file, preferably one not on disk"""
+        if cls._spare_files:
+            return cls._spare_files.pop()
+        if hasattr(os, 'memfd_create'):
+            fd = os.memfd_create('gnumake-stdout', os.MFD_CLOEXEC)
+            return open(fd, 'w+b', buffering=0)
+        import tempfile
+        return tempfile.TemporaryFile(buffering=0)
+
+    @staticmethod
+    def _flush():
+        if sys.stdout is not None:
+            try:
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
 
 @export(name='python-file')
 def python_file(script, *args):
@@ -351,20 +1952,13 @@ def python_file(script, *args):
     """
 
     argv_original = sys.argv
-    stdout_original = os.dup(1)
     try:
         sys.argv = [script] + list(args)
-        with tempfile.TemporaryFile() as capture:
-            os.dup2(capture.fileno(), 1)
-
-            with open(script) as fp:
-                code = compile(fp.read(), script, 'exec')
-                exec(code, _python_globals, _python_globals)
-
-            capture.seek(0)
-            return capture.read().rstrip(b'\n')
+        with StdoutCapture() as capture:
+            code = script_cache.compile(script)
+            exec(code, _python_globals, _python_globals)
+        return capture.output
     finally:
-        os.dup2(stdout_original, 1)
         sys.argv = argv_original
 
 @export(name='python-mod')
@@ -374,39 +1968,45 @@ def python_mod(mod, *args):
 
     Import a Python module, exposing any 'exported' functions. This does not
     invoke a function by default, as it is intended to provide access to the
-    library instead.
+    library instead. If .PYTHON_MOD_ONCE is set, a module that has already
+    been run isn't run again unless it has changed. See
+    :py:class:`ModuleCache`.
     """
     argv_original   = sys.argv
-    stdout_original = os.dup(1)
     try:
-        with tempfile.TemporaryFile() as capture:
-            os.dup2(capture.fileno(), 1)
-            runpy.run_module(mod, init_globals=_python_globals)
-            capture.seek(0)
-            return capture.read().rstrip(b'\n')
+        once = bool(_expand('$(strip $(.PYTHON_MOD_ONCE))'))
+        with StdoutCapture() as capture:
+            module_cache.run(mod, once)
+        return capture.output
     finally:
-        os.dup2(stdout_original, 1)
         sys.argv = argv_original
 
+# Modules named in .PYTHON_MOD_PRECOMPILE are loaded as soon as we are, so
+# that running them later doesn't have to find and compile them
+if _api.gmk_detected:
+    module_cache.precompile(
+                    _expand('$(strip $(.PYTHON_MOD_PRECOMPILE))').split())
+
 @export(name="python-exec")
 def python_exec(arg):
     """
     Implements $(python-exec ...)
     Run inline Python code
     """
-    stdout_original = os.dup(1)
-    try:
-        with tempfile.TemporaryFile() as capture:
-            os.dup2(capture.fileno(), 1)
+    with StdoutCapture() as capture:
+        code = code_cache.compile(arg, '<python>', 'exec')
+        exec(code, _python_globals, _python_globals)
+    return capture.output
 
-            code = compile(arg, '<python>', 'exec')
-            exec(code, _python_globals, _python_globals)
 
-            capture.seek(0)
-            return capture.read().rstrip(b'\n')
-    finally:
-        os.dup2(stdout_original, 1)
+# Separates the fields in a bulk read of variables. Any occurrence of the
+# first character inside a value is escaped by following it with a second
+# character, so the separator can never appear within a value.
+_BULK_SEP = '\x1e\x1e'
+_BULK_ESC = '\x1e\x1f'
 
+# The result of Variables.snapshot
+VariableInfo = collections.namedtuple('VariableInfo', 'value origin flavor')
 
 class Variables:
     """
@@ -414,8 +2014,90 @@ class Variables:
 
     An instance of this class is available as ``gnumake.variables`` or
     ``gnumake.vars``
+
+    Optionally, the values of simply expanded variables can be cached, so
+    that reading the same variable repeatedly doesn't go back to make each
+    time. See :py:meth:`enable_cache`.
+
+    Attributes:
+        cache_hits (int):   Number of reads answered by the cache
+        cache_misses (int): Number of reads that went to make while the cache
+                            was enabled
     """
 
+    def __init__(self):
+        self._cache = None
+        self._cache_across_calls = False
+        self._reads = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def enable_cache(self, across_calls=False):
+        """
+        Cache the values of simply expanded variables read by :py:meth:`get`.
+
+        The cache is invalidated for a variable whenever it is written through
+        this object, and entirely by any call to :py:func:`evaluate` or
+        :py:func:`expand`, or any read that expands a variable that is not
+        simply expanded, since any of these could change any variable.
+
+        Variables can also be changed by the makefile itself, which Python
+        does not see. So by default, the cache is cleared each time control
+        returns to make, and only helps repeated reads within a single call
+        into Python. With across_calls=True, the cache is kept until it is
+        invalidated, and it is up to you to call :py:meth:`invalidate` after
+        the makefile changes a variable that may be cached.
+
+        Args:
+            across_calls (bool): Keep cached values between calls from make
+        """
+        if self._cache is None:
+            self._cache = {}
+        self._cache_across_calls = across_calls
+
+    def disable_cache(self):
+        """Stop caching variables and discard the cache"""
+        self._cache = None
+        self._cache_across_calls = False
+
+    def invalidate(self, name=None):
+        """
+        Discard the cached value of a variable, or of all variables if name
+        is None.
+        """
+        if self._cache is None:
+            return
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+
+    @contextlib.contextmanager
+    def _track_reads(self):
+        """
+        Context manager that collects the names of variables read in its
+        body into a set. Reads inside nested blocks count for the outer ones
+        too.
+        """
+        outer = self._reads
+        self._reads = reads = set()
+        try:
+            yield reads
+        finally:
+            self._reads = outer
+            if outer is not None:
+                outer |= reads
+
+    def _invalidate_for_write(self, name, value, expanded):
+        """
+        Invalidate the cache before writing a variable. If the value will be
+        expanded, it could change any other variable too.
+        """
+        if expanded and '$' in value:
+            self.invalidate()
+        else:
+            self.invalidate(name)
+
     def get(self, name, default = '', expand_value=True):
         """
         Get a variable name
@@ -440,6 +2122,12 @@ class Variables:
             string: The value of the variable
         """
 
+        if self._reads is not None:
+            self._reads.add(name)
+
+        if self._cache is not None:
+            return self._cached_get(name, default, expand_value)
+
         if not is_legal_name(name):
             raise ValueError("Illegal name")
 
@@ -448,13 +2136,192 @@ class Variables:
         else:
             expand_func = ''
 
-        ret = expand('$({}{})'.format(expand_func, name))
+        ret = _expand('$({}{})'.format(expand_func, name))
 
         if not ret and default:
             if not self.defined(name):
                 ret = default
         return ret
 
+    def _cached_get(self, name, default, expand_value):
+        """Implements get() when the cache is enabled"""
+        try:
+            # Expanding a simple variable makes no difference, so a cached
+            # value is good for expand_value either way.
+            ret = self._cache[name]
+        except KeyError:
+            pass
+        else:
+            self.cache_hits += 1
+            return ret
+
+        self.cache_misses += 1
+        (ret,), (flavor,) = self._bulk_read([name], expand_value, 'flavor')
+        if flavor == 'simple':
+            self._cache[name] = ret
+        elif flavor == 'undefined' and default:
+            ret = default
+        return ret
+
+    def get_many(self, names, default='', expand_value=True):
+        """
+        Get several variables at once. This is equivalent to calling
+        :py:meth:`get` for each name, but much faster for many variables
+        because it needs only one round trip through make.
+
+        Args:
+            names (iterable):   The variable names
+            default (string):   As for :py:meth:`get`
+            expand_value (bool): As for :py:meth:`get`
+
+        Returns:
+            dict: Maps each name to its value
+        """
+        names = list(names)
+        if not default:
+            values, = self._bulk_read(names, expand_value)
+            return dict(zip(names, values))
+
+        values, origins = self._bulk_read(names, expand_value, 'origin')
+        return { name : default if not value and origin == 'undefined'
+                                else value
+                 for name, value, origin in zip(names, values, origins) }
+
+    def words(self, name, expand_value=True):
+        """
+        Iterate over the words of a variable, as make would split them.
+
+        Unlike ``get(name).split()``, the words are decoded one at a time
+        from make's copy of the value, so a long list doesn't have to exist
+        all at once as Python strings, and stopping early skips the rest of
+        it.
+
+        Args:
+            name (string):      The name of the variable, as for :py:meth:`get`
+            expand_value (bool): As for :py:meth:`get`
+
+        Returns:
+            iterator: The words of the value, in order
+        """
+        if self._reads is not None:
+            self._reads.add(name)
+
+        if self._cache is not None and name in self._cache:
+            self.cache_hits += 1
+            return iter(_split_words(self._cache[name]))
+
+        if not is_legal_name(name):
+            raise ValueError("Illegal name")
+
+        if expand_value:
+            # The flavor isn't known, and expanding could change anything
+            self.invalidate()
+        return _expand_words('$({}{})'.format(
+                                    '' if expand_value else 'value ', name))
+
+    def word_count(self, name):
+        """
+        Return the number of words in the expanded value of a variable. The
+        words are counted by make, without passing them to Python.
+
+        Args:
+            name (string):      The name of the variable, as for :py:meth:`get`
+
+        Returns:
+            int: The number of words
+        """
+        if self._reads is not None:
+            self._reads.add(name)
+
+        if not is_legal_name(name):
+            raise ValueError("Illegal name")
+
+        self.invalidate()
+        return int(_expand('$(words $({}))'.format(name)))
+
+    def snapshot(self, names, with_origin=True, with_flavor=True,
+                              expand_value=True):
+        """
+        Get the value, and optionally the origin and flavor, of several
+        variables using one round trip through make.
+
+        Args:
+            names (iterable):   The variable names
+            with_origin (bool): If true (default), include the origin of each
+                                variable. See :py:meth:`origin`.
+            with_flavor (bool): If true (default), include the flavor of each
+                                variable. See :py:meth:`flavor`.
+            expand_value (bool): As for :py:meth:`get`
+
+        Returns:
+            dict: Maps each name to a ``VariableInfo(value, origin, flavor)``
+                  named tuple. Fields that were not requested are None.
+        """
+        names = list(names)
+        funcs = []
+        if with_origin:
+            funcs.append('origin')
+        if with_flavor:
+            funcs.append('flavor')
+
+        fields = self._bulk_read(names, expand_value, *funcs)
+        values = fields[0]
+        none = [None] * len(names)
+        origins = fields[1] if with_origin else none
+        flavors = fields[-1] if with_flavor else none
+
+        return dict(zip(names, map(VariableInfo, values, origins, flavors)))
+
+    def _bulk_read(self, names, expand_value, *funcs):
+        """
+        Read the values of several variables, plus the result of each of the
+        given make functions ('origin' or 'flavor') applied to them, with a
+        single call to expand().
+
+        Returns:
+            list: A list of values, followed by a list of results for each
+                  function in funcs.
+        """
+        if not ILLEGAL_VAR_CHARS.isdisjoint(''.join(names)):
+            raise ValueError("Illegal name")
+
+        if self._reads is not None:
+            self._reads.update(names)
+
+        if not names:
+            return [ [] for _ in range(len(funcs) + 1) ]
+
+        # Expanding anything but a simple variable could change any variable,
+        # so the flavors are needed to know whether to clear the cache
+        count = len(funcs) + 1
+        if self._cache is not None and expand_value and 'flavor' not in funcs:
+            funcs += ('flavor',)
+
+        ref = '$(value {0})' if not expand_value else '$({0})'
+        if len(names) == 1 and not funcs:
+            # Nothing to split, so nothing to escape
+            return [[_expand(ref.format(names[0]))]]
+
+        template = '$(subst \x1e,{},{})'.format(_BULK_ESC, ref)
+        for func in funcs:
+            # These never contain the separator, so need no escaping.
+            template += _BULK_SEP + '$(' + func + ' {0})'
+
+        result = _expand(_BULK_SEP.join(map(template.format, names)))
+        parts = result.split(_BULK_SEP)
+
+        stride = len(funcs) + 1
+        values = parts[0::stride]
+        if _BULK_ESC in result:
+            values = [ v.replace(_BULK_ESC, '\x1e') for v in values ]
+
+        fields = [values] + [ parts[i::stride] for i in range(1, stride) ]
+        if self._cache is not None and expand_value:
+            flavors = fields[1 + funcs.index('flavor')]
+            if any(flavor not in ('simple', 'undefined') for flavor in flavors):
+                self.invalidate()
+        return fields[:count]
+
     def set(self, name, value, flavor='recursive'):
         """
         Set a variable
@@ -480,13 +2347,32 @@ class Variables:
 
         value = escape_string(object_to_string(value))
 
-        evaluate('define {} {}\n{}\nendef'.format(name, equals, value))
+        self._invalidate_for_write(name, value, flavor == 'simple')
+        _evaluate('define {} {}\n{}\nendef'.format(name, equals, value))
+
+    def update(self, mapping, flavor='recursive'):
+        """
+        Set several variables at once, with a single call to make.
+
+        Args:
+            mapping:    A dict (or iterable of name, value pairs) of variables
+                        to set. Values are escaped as for :py:meth:`set`.
+            flavor:     The flavor of all of the variables, as for
+                        :py:meth:`set`.
+        """
+        if isinstance(mapping, dict):
+            mapping = mapping.items()
+
+        with batch():
+            for name, value in mapping:
+                self.set(name, value, flavor)
 
     def undefine(self, name):
         """Undefine a variable"""
         if not is_legal_name(name):
             raise ValueError("Illegal name")
-        evaluate('undefine {}'.format(name))
+        self.invalidate(name)
+        _evaluate('undefine {}'.format(name))
 
     def append(self, name, value):
         """
@@ -498,7 +2384,9 @@ class Variables:
             raise ValueError("Illegal name")
 
         value = escape_string(object_to_string(value))
-        evaluate('define {} +=\n{}\nendef'.format(name, value))
+        # Appending to a simple variable expands the value
+        self._invalidate_for_write(name, value, True)
+        _evaluate('define {} +=\n{}\nendef'.format(name, value))
 
 
     def origin(self, name):
@@ -508,7 +2396,7 @@ class Variables:
         """
         if not is_legal_name(name):
             raise ValueError("Illegal name")
-        return expand('$(origin {})'.format(name))
+        return _expand('$(origin {})'.format(name))
 
     def flavor(self, name):
         """
@@ -517,7 +2405,7 @@ class Variables:
         """
         if not is_legal_name(name):
             raise ValueError("Illegal name")
-        return expand('$(flavor {})'.format(name))
+        return _expand('$(flavor {})'.format(name))
 
     def defined(self, name):
         """Returns True if a variable has been defined, or False otherwise"""
@@ -547,3 +2435,15 @@ variables = Variables()
 var = variables
 
 
+
+# Submodules that export make functions. These are kept light so that importing
+# them doesn't slow down startup.
+import gnumake.depfiles
+import gnumake.depscan
+import gnumake.fs
+import gnumake.hashing
+import gnumake.parallel
+import gnumake.rules
+import gnumake.wordlist
+
+from gnumake.parallel import pmap
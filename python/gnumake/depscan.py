@@ -0,0 +1,293 @@
+"""
+Scanning C and C++ sources for included headers
+
+Header dependencies usually come from running the compiler with -M, either in
+$(shell ...) at parse time, which is slow, or into .d files, which don't exist
+until the first build. This module finds them directly instead, by reading the
+#include directives of each source and the headers it includes.
+
+``$(py-deps <sources>,<include-dirs>)`` returns every header that any of the
+sources includes, directly or indirectly. The include directories may be given
+with or without a leading -I. Quoted includes are looked for next to the file
+that includes them and then in the include directories, and angle bracket
+includes only in the include directories, as the compiler does. Includes that
+aren't found, such as system headers, are left out.
+
+``$(py-deps <sources>,<include-dirs>,<target-pattern>)`` instead adds a rule
+for each source, making the target named by the pattern depend on the
+headers. A ``%`` in the pattern stands for the source without its suffix, so
+``$(py-deps src/a.c,include,build/%.o)`` adds a rule for build/src/a.o. All of
+the rules are added with a single evaluate.
+
+The scan is approximate, in the same way as makedepend: directives are found
+in conditional blocks and comments as well, and macros are not expanded. This
+errs on the side of extra prerequisites, except for #include of a macro, which
+is ignored.
+
+The includes of each file are cached under its status, in memory and in the
+:py:class:`gnumake.PersistentCache` if .PYTHON_CACHE_DIR is set, so that
+unchanged files are only read once. The set of headers reached from each file
+is worked out once per make process, and shared by all the sources that
+include it. File status comes from :py:mod:`gnumake.fs`, and everything is
+worked out again after anything there is invalidated.
+"""
+
+import os
+import gnumake
+import gnumake.fs
+
+
+# Compiled when first needed, since the re module is slow to import
+_include_re = None
+
+def scan_includes(data):
+    """
+    Find the #include directives in the text of a source file.
+
+    Args:
+        data (bytes):   The contents of the file
+
+    Returns:
+        list: A (quoted, name) tuple for each include, in order, where quoted
+        is True for "name" and False for <name>
+    """
+    global _include_re
+
+    if _include_re is None:
+        import re
+        _include_re = re.compile(
+                rb'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"\r\n]+)[>"]',
+                re.MULTILINE)
+
+    return [ (kind == b'"', name.decode(errors='surrogateescape'))
+             for kind, name in _include_re.findall(data) ]
+
+class DependencyScanner:
+    """
+    Finds the headers included by C and C++ files, caching what it learns.
+    The module functions all use the instance available as
+    ``gnumake.depscan.scanner``.
+
+    Attributes:
+        files_read (int):   Number of files that have been read and scanned
+    """
+
+    def __init__(self):
+        # The includes of each file, by path, with the status they came from
+        self._includes = {}
+        # The headers that each file includes, by (path, include dirs)
+        self._resolved = {}
+        # All headers reached from each file, by (path, include dirs)
+        self._closures = {}
+        self._generation = None
+        self.files_read = 0
+
+    def _check_generation(self):
+        """Forget derived results if the stat cache has been invalidated"""
+        generation = gnumake.fs.cache.generation
+        if generation != self._generation:
+            self._generation = generation
+            self._resolved.clear()
+            self._closures.clear()
+
+    def includes(self, path):
+        """
+        Return the includes of a file, reading it only if it has changed.
+
+        Args:
+            path (string):  The file
+
+        Returns:
+            list: As :py:func:`scan_includes`
+        """
+        st = gnumake.fs.stat(path)
+        stamp = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        cached = self._includes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        import hashlib
+        persistent = gnumake.persistent_cache
+        key = hashlib.sha256(repr(('includes',) + stamp).encode()).digest()
+        includes = persistent.get(key)
+        if includes is None:
+            with open(path, 'rb') as f:
+                includes = scan_includes(f.read())
+            self.files_read += 1
+            persistent.put('includes', key, includes)
+
+        self._includes[path] = (stamp, includes)
+        return includes
+
+    def resolve(self, path, include_dirs):
+        """
+        Return the files that a file includes directly.
+
+        Args:
+            path (string):      The file
+            include_dirs (tuple): Directories to search for included files
+
+        Returns:
+            list: The included files that were found
+        """
+        self._check_generation()
+        key = (path, include_dirs)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        isfile = gnumake.fs.isfile
+        here = os.path.dirname(path)
+        found = []
+        for quoted, name in self.includes(path):
+            if os.path.isabs(name):
+                candidates = [ name ]
+            elif quoted:
+                candidates = [ os.path.join(here, name) ]
+                candidates.extend(os.path.join(d, name) for d in include_dirs)
+            else:
+                candidates = [ os.path.join(d, name) for d in include_dirs ]
+
+            for candidate in candidates:
+                if isfile(candidate):
+                    found.append(os.path.normpath(candidate))
+                    break
+
+        self._resolved[key] = found
+        return found
+
+    def dependencies(self, path, include_dirs):
+        """
+        Return every file that a file includes, directly or indirectly.
+
+        Args:
+            path (string):      The file
+            include_dirs (tuple): Directories to search for included files
+
+        Returns:
+            frozenset: The included files, not including path itself unless
+            it includes itself
+        """
+        self._check_generation()
+        include_dirs = tuple(include_dirs)
+        key = (path, include_dirs)
+        try:
+            return self._closures[key]
+        except KeyError:
+            pass
+
+        self._close(path, include_dirs)
+        return self._closures[key]
+
+    def _close(self, root, include_dirs):
+        """
+        Work out the closure of root and of every file reached from it that
+        doesn't have one yet. Headers that include each other form cycles,
+        so this finds the strongly connected components of the include graph
+        (with Tarjan's algorithm), which all share a closure.
+        """
+        closures = self._closures
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+
+        # An explicit stack of (file, iterator over its includes), rather than
+        # recursion, since include chains can be long.
+        index[root] = lowlink[root] = 0
+        stack.append(root)
+        on_stack.add(root)
+        work = [ (root, iter(self.resolve(root, include_dirs))) ]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if (child, include_dirs) in closures:
+                    continue
+                elif child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self.resolve(child,
+                                                          include_dirs))))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    # node is the root of a component. Everything above it on
+                    # the stack is in the component.
+                    members = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        members.add(member)
+                        if member == node:
+                            break
+
+                    closure = set()
+                    for member in members:
+                        for child in self.resolve(member, include_dirs):
+                            closure.add(child)
+                            if child not in members:
+                                closure.update(closures[child, include_dirs])
+                    closure = frozenset(closure)
+                    for member in members:
+                        closures[member, include_dirs] = closure
+
+    def invalidate(self):
+        """Forget everything, except what is stored persistently"""
+        self._includes.clear()
+        self._resolved.clear()
+        self._closures.clear()
+
+# The process-wide scanner
+scanner = DependencyScanner()
+
+def dependencies(sources, include_dirs=()):
+    """
+    Return every header included by any of the sources.
+
+    Args:
+        sources (list):         The source files
+        include_dirs (list):    Directories to search for included files
+
+    Returns:
+        list: The headers, sorted
+    """
+    include_dirs = tuple(include_dirs)
+    headers = set()
+    for source in sources:
+        headers.update(scanner.dependencies(source, include_dirs))
+    return sorted(headers)
+
+def _include_dirs(words):
+    """Include directories from make words, which may have a -I prefix"""
+    return tuple(word[2:] if word.startswith('-I') else word
+                 for word in gnumake._split_words(words) if word != '-I')
+
+@gnumake.export(name='py-deps')
+def py_deps(sources, include_dirs, target_pattern=None):
+    """Implements $(py-deps ...)"""
+    sources = gnumake._split_words(sources)
+    include_dirs = _include_dirs(include_dirs)
+    if target_pattern is None or not target_pattern.strip():
+        return ' '.join(dependencies(sources, include_dirs))
+
+    target_pattern = target_pattern.strip()
+    rules = []
+    for source in sources:
+        headers = scanner.dependencies(source, include_dirs)
+        if not headers:
+            continue
+        target = target_pattern.replace('%', os.path.splitext(source)[0], 1)
+        rules.append('{}: {}'.format(gnumake.escape_path(target),
+                                     ' '.join(map(gnumake.escape_path,
+                                                  sorted(headers)))))
+    if rules:
+        gnumake.evaluate('\n'.join(rules))
@@ -2,13 +2,492 @@
 #include <assert.h>
 #include <Python.h>
 #include <limits.h>
+#include <string.h>
+#include <time.h>
 
 int _gnumake_gmk_setup(void);
 PyMODINIT_FUNC PyInit__gnumake(void);
 
-/* From the Python perspective, this is just a dummy module: there's
- * actually nothing here. It exists as a Python module so that we can
- * get its __file__ attribute easily. 
+/* (name, callable) of each function exported to make, keyed by function
+ * name (str). The name is kept as a str so that it can be passed to the
+ * dispatcher without creating a new object for each call. */
+static PyObject* function_registry = NULL;
+
+/* Every name passed to gmk_add_function. Make keeps the pointer rather than
+ * a copy, so these must live as long as the process. */
+static PyObject* function_names = NULL;
+
+/* Python-side hooks installed by the gnumake package. The dispatcher is
+ * called as dispatcher(name, func, args) and returns the result as str or
+ * bytes, or None on error. The error hook is called with an exception
+ * instance if the arguments could not be converted before reaching the
+ * dispatcher. */
+static PyObject* function_dispatcher = NULL;
+static PyObject* function_error_hook = NULL;
+
+/** @brief Copy a Python str or bytes object into a gmk_alloc buffer
+ *
+ * @param obj The object to copy
+ * @return A buffer allocated with gmk_alloc, or NULL if obj is None or on
+ *         error, in which case a Python exception is set.
+ */
+static char* object_to_gmk_buffer(PyObject* obj)
+{
+    char* data = NULL;
+    Py_ssize_t size = 0;
+    char* ret;
+
+    if (obj == Py_None)
+    {
+        return NULL;
+    }
+    else if (PyUnicode_Check(obj))
+    {
+        data = (char*)PyUnicode_AsUTF8AndSize(obj, &size);
+        if (!data)
+        {
+            return NULL;
+        }
+    }
+    else if (PyBytes_Check(obj))
+    {
+        if (PyBytes_AsStringAndSize(obj, &data, &size) < 0)
+        {
+            return NULL;
+        }
+    }
+    else
+    {
+        PyErr_SetString(PyExc_TypeError, "result must be str or bytes");
+        return NULL;
+    }
+
+    if ((size_t)size >= UINT_MAX)
+    {
+        PyErr_SetString(PyExc_OverflowError, "result too large for make");
+        return NULL;
+    }
+
+    ret = gmk_api.alloc((unsigned int)size + 1);
+    memcpy(ret, data, size);
+    ret[size] = '\0';
+    return ret;
+}
+
+/** @brief Pass the current Python exception to the error hook
+ *
+ * Used for errors that happen before the dispatcher gets a chance to run.
+ */
+static void report_error(void)
+{
+    PyObject* type;
+    PyObject* value;
+    PyObject* tb;
+    PyObject* result;
+
+    if (!function_error_hook)
+    {
+        return;
+    }
+
+    PyErr_Fetch(&type, &value, &tb);
+    PyErr_NormalizeException(&type, &value, &tb);
+    if (tb)
+    {
+        PyException_SetTraceback(value, tb);
+    }
+
+    result = PyObject_CallFunctionObjArgs(function_error_hook, value, NULL);
+
+    Py_XDECREF(result);
+    Py_XDECREF(type);
+    Py_XDECREF(value);
+    Py_XDECREF(tb);
+}
+
+/** @brief Native entry point for functions exported to make
+ *
+ * Registered with gmk_add_function for every function exported through
+ * _gnumake.add_function. Looks up the Python callable by name, builds the
+ * argument tuple and hands them to the Python dispatcher, along with the name
+ * make called, since one callable may be exported under several names. The
+ * result is copied directly into a buffer owned by make.
+ */
+static char* pygnumake_trampoline(const char* name, unsigned int argc,
+                                  char** argv)
+{
+    PyGILState_STATE gil;
+    PyObject* entry;
+    PyObject* args = NULL;
+    PyObject* result = NULL;
+    char* ret = NULL;
+    unsigned int i;
+
+    gil = PyGILState_Ensure();
+
+    if (!function_registry || !function_dispatcher)
+    {
+        goto done;
+    }
+
+    entry = PyDict_GetItemString(function_registry, name);
+    if (!entry)
+    {
+        goto done;
+    }
+
+    args = PyTuple_New(argc);
+    if (!args)
+    {
+        goto done;
+    }
+
+    for (i = 0; i < argc; i++)
+    {
+        PyObject* arg = PyUnicode_FromString(argv[i]);
+        if (!arg)
+        {
+            // Most likely invalid UTF-8. This is the user's problem.
+            report_error();
+            goto done;
+        }
+        PyTuple_SET_ITEM(args, i, arg);
+    }
+
+    result = PyObject_CallFunctionObjArgs(function_dispatcher,
+                                          PyTuple_GET_ITEM(entry, 0),
+                                          PyTuple_GET_ITEM(entry, 1),
+                                          args, NULL);
+    if (result)
+    {
+        ret = object_to_gmk_buffer(result);
+    }
+
+done:
+    if (PyErr_Occurred())
+    {
+        // The dispatcher handles errors raised by user code, so this is a
+        // problem with gnumake itself. The user will want to know.
+        PyErr_Print();
+    }
+
+    Py_XDECREF(args);
+    Py_XDECREF(result);
+    PyGILState_Release(gil);
+    return ret;
+}
+
+/** @brief Implements _gnumake.add_function()
+ */
+static PyObject* pygnumake_add_function(PyObject* self, PyObject* args)
+{
+    const char* name;
+    PyObject* func;
+    PyObject* entry;
+    PyObject* name_bytes;
+    unsigned int min_args;
+    unsigned int max_args;
+    unsigned int flags;
+
+    if (!PyArg_ParseTuple(args, "sOIII:add_function", &name, &func,
+                          &min_args, &max_args, &flags))
+    {
+        return NULL;
+    }
+
+    if (!gmk_api_loaded())
+    {
+        PyErr_SetString(PyExc_ImportError, "GNU make not detected");
+        return NULL;
+    }
+
+    if (!PyCallable_Check(func))
+    {
+        PyErr_SetString(PyExc_TypeError, "func must be callable");
+        return NULL;
+    }
+
+    if (!function_registry)
+    {
+        function_registry = PyDict_New();
+        function_names = PyList_New(0);
+        if (!function_registry || !function_names)
+        {
+            Py_CLEAR(function_registry);
+            Py_CLEAR(function_names);
+            return NULL;
+        }
+    }
+
+    entry = Py_BuildValue("(sO)", name, func);
+    if (!entry)
+    {
+        return NULL;
+    }
+
+    if (PyDict_SetItemString(function_registry, name, entry) < 0)
+    {
+        Py_DECREF(entry);
+        return NULL;
+    }
+    Py_DECREF(entry);
+
+    name_bytes = PyBytes_FromString(name);
+    if (!name_bytes)
+    {
+        return NULL;
+    }
+
+    if (PyList_Append(function_names, name_bytes) < 0)
+    {
+        Py_DECREF(name_bytes);
+        return NULL;
+    }
+    Py_DECREF(name_bytes);
+
+    gmk_api.add_function(PyBytes_AS_STRING(name_bytes), pygnumake_trampoline,
+                         min_args, max_args, flags);
+    Py_RETURN_NONE;
+}
+
+/** @brief Implements _gnumake.set_dispatcher()
+ */
+static PyObject* pygnumake_set_dispatcher(PyObject* self, PyObject* args)
+{
+    PyObject* dispatcher;
+    PyObject* error_hook;
+
+    if (!PyArg_ParseTuple(args, "OO:set_dispatcher", &dispatcher,
+                          &error_hook))
+    {
+        return NULL;
+    }
+
+    Py_INCREF(dispatcher);
+    Py_XSETREF(function_dispatcher, dispatcher);
+    Py_INCREF(error_hook);
+    Py_XSETREF(function_error_hook, error_hook);
+    Py_RETURN_NONE;
+}
+
+/** @brief Implements _gnumake.expand(s)
+ *
+ * Expands s with gmk_expand and decodes the result straight from make's
+ * buffer, without an intermediate copy.
+ */
+static PyObject* pygnumake_expand(PyObject* self, PyObject* args)
+{
+    const char* s;
+    char* value;
+    PyObject* ret;
+
+    if (!PyArg_ParseTuple(args, "s:expand", &s))
+    {
+        return NULL;
+    }
+
+    if (!gmk_api_loaded())
+    {
+        PyErr_SetString(PyExc_ImportError, "GNU make not detected");
+        return NULL;
+    }
+
+    // Make may call back into Python, possibly from other threads' code
+    Py_BEGIN_ALLOW_THREADS
+    value = gmk_api.expand(s);
+    Py_END_ALLOW_THREADS
+
+    if (!value)
+    {
+        return PyUnicode_FromStringAndSize("", 0);
+    }
+
+    ret = PyUnicode_DecodeUTF8(value, strlen(value), NULL);
+    gmk_api.free(value);
+    return ret;
+}
+
+/* Iterates over the words of a buffer returned by gmk_expand, decoding one
+ * word at a time, so that the words of a long value never all exist as
+ * Python objects at once. The buffer is freed as soon as the iterator is
+ * exhausted or destroyed. */
+typedef struct
+{
+    PyObject_HEAD
+    char* buffer;
+    const char* pos;
+} WordIterator;
+
+/** @brief Return true for the characters make separates words with
+ *
+ * Make treats every character for which isspace() is true in the C locale as
+ * a word separator.
+ */
+static int is_word_space(char c)
+{
+    return c == ' ' || c == '\t' || c == '\n' || c == '\v' || c == '\f' ||
+           c == '\r';
+}
+
+static void word_iterator_release(WordIterator* self)
+{
+    if (self->buffer)
+    {
+        gmk_api.free(self->buffer);
+        self->buffer = NULL;
+    }
+    self->pos = NULL;
+}
+
+static void word_iterator_dealloc(WordIterator* self)
+{
+    word_iterator_release(self);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static PyObject* word_iterator_next(WordIterator* self)
+{
+    const char* p = self->pos;
+    const char* start;
+
+    if (!p)
+    {
+        return NULL;
+    }
+
+    while (is_word_space(*p))
+    {
+        ++p;
+    }
+
+    if (!*p)
+    {
+        word_iterator_release(self);
+        return NULL;
+    }
+
+    start = p;
+    while (*p && !is_word_space(*p))
+    {
+        ++p;
+    }
+    self->pos = p;
+
+    return PyUnicode_DecodeUTF8(start, p - start, NULL);
+}
+
+static PyTypeObject WordIteratorType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "gnumake._gnumake.WordIterator",
+    .tp_doc = "Iterator over the words of an expanded string",
+    .tp_basicsize = sizeof(WordIterator),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_dealloc = (destructor)word_iterator_dealloc,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)word_iterator_next,
+};
+
+/** @brief Implements _gnumake.expand_words(s)
+ *
+ * Expands s with gmk_expand and returns an iterator over the words of the
+ * result, which decodes them from make's buffer as they are needed.
+ */
+static PyObject* pygnumake_expand_words(PyObject* self, PyObject* args)
+{
+    const char* s;
+    char* value;
+    WordIterator* ret;
+
+    if (!PyArg_ParseTuple(args, "s:expand_words", &s))
+    {
+        return NULL;
+    }
+
+    if (!gmk_api_loaded())
+    {
+        PyErr_SetString(PyExc_ImportError, "GNU make not detected");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    value = gmk_api.expand(s);
+    Py_END_ALLOW_THREADS
+
+    ret = PyObject_New(WordIterator, &WordIteratorType);
+    if (!ret)
+    {
+        if (value)
+        {
+            gmk_api.free(value);
+        }
+        return NULL;
+    }
+
+    ret->buffer = value;
+    ret->pos = value;
+    return (PyObject*)ret;
+}
+
+/** @brief Implements _gnumake.eval(s)
+ *
+ * Evaluates s with gmk_eval, passing the UTF-8 representation of the str
+ * directly.
+ */
+static PyObject* pygnumake_eval(PyObject* self, PyObject* args)
+{
+    const char* s;
+
+    if (!PyArg_ParseTuple(args, "s:eval", &s))
+    {
+        return NULL;
+    }
+
+    if (!gmk_api_loaded())
+    {
+        PyErr_SetString(PyExc_ImportError, "GNU make not detected");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    gmk_api.eval(s, NULL);
+    Py_END_ALLOW_THREADS
+
+    Py_RETURN_NONE;
+}
+
+/** @brief Implements _gnumake.api_loaded()
+ */
+static PyObject* pygnumake_api_loaded(PyObject* self, PyObject* unused)
+{
+    return PyBool_FromLong(gmk_api_loaded());
+}
+
+static PyMethodDef pygnumake_methods[] = {
+    { "add_function", pygnumake_add_function, METH_VARARGS,
+        "add_function(name, func, min_args, max_args, flags)\n\n"
+        "Export func to make as name, using the native trampoline." },
+    { "set_dispatcher", pygnumake_set_dispatcher, METH_VARARGS,
+        "set_dispatcher(dispatcher, error_hook)\n\n"
+        "Install the Python hooks called by the native trampoline." },
+    { "expand", pygnumake_expand, METH_VARARGS,
+        "expand(s)\n\n"
+        "Expand s with gmk_expand and return the result as a str." },
+    { "expand_words", pygnumake_expand_words, METH_VARARGS,
+        "expand_words(s)\n\n"
+        "Expand s with gmk_expand and return an iterator over its words." },
+    { "eval", pygnumake_eval, METH_VARARGS,
+        "eval(s)\n\n"
+        "Evaluate s with gmk_eval." },
+    { "api_loaded", pygnumake_api_loaded, METH_NOARGS,
+        "api_loaded()\n\n"
+        "Return True if the GNU make API is available." },
+    { NULL, NULL, 0, NULL }
+};
+
+/* From the Python perspective, this module only holds the native half of
+ * the function dispatch used by the gnumake package. It is also a Python
+ * module so that we can get its __file__ attribute easily.
  *
  * Its real purpose is to be loaded into GNU make, where it will start up
  * the Python interpreter and load the real gnumake module.
@@ -18,8 +497,9 @@ static struct PyModuleDef pygnumake_module = {
     "gnumake._gnumake",
     "Internal extension module for gnumake.\n\n"
         "Load this module into make with the load directive.\n"
-        "It has no user-accessible functions."
+        "It has no user-accessible functions.",
     -1,
+    pygnumake_methods,
 };
 
 
@@ -32,6 +512,18 @@ PyInit__gnumake(void)
 {
     PyObject* mod = NULL;
 
+    // If Python found us under a different path than the one make loaded,
+    // we are a separate copy of the library with our own API table.
+    if (!gmk_api_loaded())
+    {
+        load_gmk_api();
+    }
+
+    if (PyType_Ready(&WordIteratorType) < 0)
+    {
+        return NULL;
+    }
+
     mod = PyModule_Create(&pygnumake_module);
 
     return mod;
@@ -42,7 +534,11 @@ int plugin_is_GPL_compatible;
 
 /** @brief Clean up Python on exit
  *
- * GNU make provides no other way to clean up except an atexit handler
+ * GNU make provides no other way to clean up except an atexit handler.
+ * Py_Finalize runs Python's own atexit handlers, which is where the gnumake
+ * package writes its call statistics and returns any jobserver tokens that
+ * are still held, so that make doesn't lose job slots when it exits with an
+ * error.
  */
 static void pygnumake_gmk_cleanup(void)
 {
@@ -160,6 +656,7 @@ static void set_python_env(void)
 	export_var("PYTHONOPTIMIZE",          ".PYTHONOPTIMIZE");
 	export_var("PYTHONDEBUG",             ".PYTYONDEBUG");
 	export_var("PYTHONDONTWRITEBYTECODE", ".PYTHONDONTWRITEBYTECODE");
+	export_var("PYTHONPYCACHEPREFIX",     ".PYTHONPYCACHEPREFIX");
 	export_var("PYTHONINSPECT",           ".PYTHONINSPECT"); // does this work?
 	export_var("PYTHONIOENCODING",        ".PYTHONIOENCODING");
 	export_var("PYTHONUSERSITE",          ".PYTHONUSERSITE");
@@ -170,28 +667,143 @@ static void set_python_env(void)
 }
 
 
+/** @brief Test whether a GNU make variable is set to a non-empty value
+ *
+ *  @param make_name Name of the make variable
+ *  @return 1 if the variable expands to a non-blank string, 0 otherwise
+ */
+static int get_flag(const char* make_name)
+{
+	char* value;
+	char buffer[256];
+	int ret;
+	int flag = 0;
+
+	ret = snprintf(buffer, sizeof(buffer), "$(strip $(%s))", make_name);
+	if (ret < 0 || (size_t)ret >= sizeof(buffer))
+	{
+		return 0;
+	}
+
+	value = gmk_api.expand(buffer);
+	if (value)
+	{
+		flag = value[0] != '\0';
+		gmk_api.free(value);
+	}
+
+	return flag;
+}
+
+/** @brief Start the Python interpreter
+ *
+ * In fast startup mode the site module is not imported, which skips
+ * processing site-packages, .pth files and the user site directory. Anything
+ * the makefile needs must then be reachable through .PYTHONPATH.
+ *
+ * As with PySys_SetArgv, sys.argv is [''] and the current directory is the
+ * first entry on sys.path.
+ *
+ * @param fast Nonzero to use fast startup mode
+ * @return 0 on success, -1 on error
+ */
+static int start_python(int fast)
+{
+#if PY_VERSION_HEX >= 0x03080000
+	PyStatus status;
+	PyConfig config;
+	PyObject* path;
+	PyObject* cwd;
+	int ret;
+
+	PyConfig_InitPythonConfig(&config);
+	config.parse_argv = 0;
+	if (fast)
+	{
+		config.site_import = 0;
+		config.user_site_directory = 0;
+	}
+
+	status = Py_InitializeFromConfig(&config);
+	PyConfig_Clear(&config);
+	if (PyStatus_Exception(status))
+	{
+		fprintf(stderr, "python: %s\n",
+				status.err_msg ? status.err_msg : "initialization failed");
+		return -1;
+	}
+
+	path = PySys_GetObject("path"); // borrowed
+	cwd = PyUnicode_FromString("");
+	if (!path || !cwd)
+	{
+		Py_XDECREF(cwd);
+		return -1;
+	}
+
+	ret = PyList_Insert(path, 0, cwd);
+	Py_DECREF(cwd);
+	return ret;
+#else
+	wchar_t* argv[1] = { NULL };
+
+	if (fast)
+	{
+		Py_NoSiteFlag = 1;
+		Py_NoUserSiteDirectory = 1;
+	}
+
+	Py_Initialize();
+	PySys_SetArgv(0, argv);
+	return 0;
+#endif
+}
+
+/** @brief Seconds elapsed since start, using the monotonic clock
+ */
+static double seconds_since(const struct timespec* start)
+{
+	struct timespec now;
+
+	clock_gettime(CLOCK_MONOTONIC, &now);
+	return (double)(now.tv_sec - start->tv_sec) +
+		   (double)(now.tv_nsec - start->tv_nsec) / 1e9;
+}
+
 /** @brief Initialize Python for GNU make
  *
  * Called when this .so is loaded into GNU make with the load directive. This
  * will cause PyInit__gnumake() to be called as well when we load the
  * appropriate module
  *
+ * The time taken to start Python and import gnumake is stored in
+ * .PYTHON_INIT_SECONDS.
+ *
  * @return 1 on success, -1 on error
  */
 int _gnumake_gmk_setup(void)
 {
 	int ret = 0;
     PyObject* gnumake = NULL;
-	wchar_t* argv[1] = { NULL };
+	struct timespec start;
+	char buffer[64];
 
     if (load_gmk_api() < 0)
     {
         return 0;
     }
 
+	clock_gettime(CLOCK_MONOTONIC, &start);
+
 	set_python_env();
-    Py_Initialize();
-	PySys_SetArgv(0, argv);
+	if (start_python(get_flag(".PYTHON_FAST_STARTUP")) < 0)
+	{
+		if (!Py_IsInitialized())
+		{
+			return 0;
+		}
+		goto done;
+	}
 
     if (atexit(pygnumake_gmk_cleanup) != 0)
     {
@@ -205,6 +817,10 @@ int _gnumake_gmk_setup(void)
         goto done;
     }
 
+	snprintf(buffer, sizeof(buffer), ".PYTHON_INIT_SECONDS := %.6f",
+			 seconds_since(&start));
+	gmk_api.eval(buffer, NULL);
+
 	ret = 1;
 
 done:
@@ -220,4 +836,3 @@ done:
 	PyEval_SaveThread();
 	return ret;
 }
-
@@ -0,0 +1,8 @@
+# Run by test-depfiles.mk as a separate make process
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+$(py-load-deps $(PROBE_FILES))
+$(info $(python-eval gnumake.depfiles.cache.files_parsed))
+
+all:
+	@:
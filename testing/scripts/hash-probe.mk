@@ -0,0 +1,7 @@
+# Run by test-hash.mk as a separate make process
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+$(info $(py-hash sha256,$(PROBE_FILES)) $(python-eval gnumake.hashing.index.misses))
+
+all:
+	@:
@@ -0,0 +1,7 @@
+# Run by test-pmap.mk as a separate make process
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+$(info $(python-eval gnumake.parallel.job_slots()))
+
+all:
+	@:
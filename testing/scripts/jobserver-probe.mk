@@ -0,0 +1,63 @@
+# Run by test-jobserver.mk as a separate make process, with -j
+THIS_PROBE := $(lastword $(MAKEFILE_LIST))
+include $(dir $(THIS_PROBE))../../load-python.mk
+
+define probe_code
+import os
+import threading
+import time
+import gnumake.jobserver
+
+running = 0
+most_running = 0
+lock = threading.Lock()
+
+def slow(word):
+	global running, most_running
+	with lock:
+		running += 1
+		most_running = max(most_running, running)
+	time.sleep(0.02)
+	with lock:
+		running -= 1
+	return word
+
+def slow_pid(word):
+	time.sleep(0.02)
+	return os.getpid()
+
+def count_processes():
+	return len(set(gnumake.pmap(slow_pid, range(24), processes=True)))
+
+def count_processes_without_tokens():
+	server = gnumake.jobserver.client()
+	server.acquire()
+	try:
+		return count_processes()
+	finally:
+		server.release()
+endef
+$(python-exec $(probe_code))
+
+# There is no jobserver until make has read the makefiles
+PARSE_TIME := $(python-eval gnumake.jobserver.client() is not None)
+
+client:
+	@echo $(PARSE_TIME) $(python-eval gnumake.jobserver.client() is not None)
+
+pmap:
+	@echo $(python-exec gnumake.pmap(slow, range(24)); print(most_running))
+
+# Process pools have one process per token, plus one
+processes:
+	@echo $(python-eval count_processes())
+
+processes-without-tokens:
+	@echo $(python-eval count_processes_without_tokens())
+
+# A sub-make that exits holding a token
+leak:
+	@echo $(python-eval gnumake.jobserver.client().acquire(block=False))
+
+sub-make:
+	+@$(MAKE) -s --no-print-directory -f $(THIS_PROBE) leak
@@ -0,0 +1,9 @@
+# Run by test-mod.mk as a separate make process
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+LOADED := $(python-eval gnumake.module_cache.loads)
+OUTPUT := $(python-mod mod_7)
+$(info $(LOADED) $(python-eval gnumake.module_cache.loads) $(OUTPUT))
+
+all:
+	@:
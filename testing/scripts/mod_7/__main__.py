@@ -0,0 +1,7 @@
+import gnumake
+
+print("ran")
+
+@gnumake.export
+def mod_7_func(arg):
+    return "called " + arg
@@ -0,0 +1,8 @@
+# Run by test-persistent-cache.mk as a separate make process
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+$(python-mod persistent_probe)
+$(info $(persistent_probe $(PROBE_ARG)))
+
+all:
+	@:
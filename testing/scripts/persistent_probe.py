@@ -0,0 +1,9 @@
+import os
+import gnumake
+
+@gnumake.export(cache=gnumake.FunctionCache(persistent=True))
+def persistent_probe(arg):
+    # Record each real call, so the test can count them across processes
+    with open(os.environ['PROBE_LOG'], 'a') as fp:
+        fp.write(arg + '\n')
+    return arg.upper()
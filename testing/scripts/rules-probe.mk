@@ -0,0 +1,22 @@
+# Run by test-rules.mk as a separate make process, from a scratch directory
+include $(dir $(lastword $(MAKEFILE_LIST)))../../load-python.mk
+
+FLAGS := -g
+
+define make_rules
+from gnumake.rules import Rule, PatternRule, RuleSet
+
+rules = RuleSet()
+rules.rule('all', ['out dir/a#b:c.o', '100%.txt', 'x.gen', 'twice'])
+rules.rule(['out dir/a#b:c.o'], ['x$$y.c'], order_only=['out dir'],
+		   variables={'MSG': 'hello # there', 'FLAGS': ('+=', '-O2')},
+		   recipe="@echo '$$@' '$$(MSG)' $$(FLAGS)\n@echo '$$<'")
+rules.rule(['x$$y.c', 'out dir'], recipe='@:')
+rules.rule('100%.txt', recipe='@echo percent $$@')
+rules.pattern_rule('%.gen', '%.src', recipe='@echo gen $$* from $$<')
+rules.rule('x.src', recipe='@:')
+rules.rule('twice', recipe='@echo first', double_colon=True)
+rules.rule('twice', recipe='@echo second', double_colon=True)
+rules.evaluate()
+endef
+$(python-exec $(make_rules))
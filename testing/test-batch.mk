@@ -0,0 +1,121 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := batched evaluate
+
+include $(THIS_PATH)/common.mk
+
+# Count the calls made to gmk_eval
+define python_code
+eval_calls = 0
+real_eval_string = gnumake._api.eval_string
+def counting_eval_string(*args):
+	global eval_calls
+	eval_calls += 1
+	real_eval_string(*args)
+gnumake._api.eval_string = counting_eval_string
+endef
+$(python-exec $(python_code))
+
+define python_code
+eval_calls = 0
+with gnumake.batch():
+	gnumake.evaluate('B1 := one')
+	gnumake.var['B2'] = 'two'
+	gnumake.var.set('B3', 'three', 'simple')
+	gnumake.var.append('B3', 'four')
+	assert eval_calls == 0
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,1,$(python-eval eval_calls))
+$(call assert-equal,one,$(B1))
+$(call assert-equal,two,$(B2))
+$(call assert-equal,three four,$(B3))
+
+# Reads flush first, so they see earlier writes
+define python_code
+eval_calls = 0
+with gnumake.batch():
+	gnumake.var['B4'] = 'four'
+	gnumake.var['B5'] = gnumake.var['B4'] + '!'
+	gnumake.var['B6'] = 'six'
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,2,$(python-eval eval_calls))
+$(call assert-equal,four!,$(B5))
+$(call assert-equal,six,$(B6))
+
+# Nested batches flush only at the end of the outermost one
+define python_code
+eval_calls = 0
+with gnumake.batch():
+	with gnumake.batch():
+		gnumake.evaluate('B7 := seven')
+	assert eval_calls == 0
+	gnumake.evaluate('B8 := eight')
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,1,$(python-eval eval_calls))
+$(call assert-equal,seven eight,$(B7) $(B8))
+
+# Automatic flush by size
+define python_code
+eval_calls = 0
+with gnumake.batch(flush_size=20):
+	for i in range(10):
+		gnumake.evaluate('B9 += {}'.format(i))
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,4,$(python-eval eval_calls))
+$(call assert-equal,0 1 2 3 4 5 6 7 8 9,$(B9))
+
+# Statements are still applied when the block raises
+define python_code
+with gnumake.batch():
+	gnumake.evaluate('B10 := ten')
+	raise RuntimeError('oops')
+endef
+$(python-exec $(python_code))
+$(call assert-match,^RuntimeError: oops,$(.PYTHON_LAST_ERROR))
+$(call assert-equal,ten,$(B10))
+
+# Make code run by a flush can write variables from Python
+define python_code
+with gnumake.batch():
+	gnumake.evaluate('B11 := $$(python-exec gnumake.var["B12"] = "twelve")')
+	gnumake.evaluate('B13 := $$(B12)')
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,twelve,$(B13))
+
+define python_code
+eval_calls = 0
+gnumake.var.update({'U1' : 'a', 'U2' : 'b$$(U1)'})
+gnumake.var.update([('U3', 'c$$(U1)')], flavor='simple')
+endef
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,2,$(python-eval eval_calls))
+$(call assert-equal,a ba ca,$(U1) $(U2) $(U3))
+$(call assert-equal,recursive simple,$(flavor U2) $(flavor U3))
+
+# Functions that make calls while expanding a string inside a batch write
+# variables immediately, so the rest of the expansion sees them
+XWORDS = $(batch_setx three) $(XVAL)
+define python_code
+@gnumake.export
+def batch_setx(value):
+	gnumake.evaluate('XVAL := ' + value)
+	return ''
+
+with gnumake.batch():
+	gnumake.evaluate('XVAL := one')
+	print(gnumake.expand('$$(batch_setx two)$$(XVAL)'),
+		  ' '.join(gnumake.var.words('XWORDS')))
+endef
+$(call assert-equal,two three,$(python-exec $(python_code)))
+$(call assert-empty,.PYTHON_LAST_ERROR)
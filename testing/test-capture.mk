@@ -0,0 +1,62 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := stdout capture
+
+include $(THIS_PATH)/common.mk
+
+define expected
+foo
+bar
+endef
+
+# Default mode captures the file descriptor, including subprocesses
+RESULT := $(python-exec import subprocess; subprocess.call(['echo', 'hi']))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,hi,$(RESULT))
+
+RESULT := $(python-exec print('foo'); os.system('echo bar'))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,$(expected),$(RESULT))
+
+# Large output must not block
+RESULT := $(python-exec print('x' * 1000000))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,1000000,$(python-eval len('$(RESULT)')))
+
+# Calls must not leak file descriptors
+FD_COUNT := $(python-eval len(os.listdir('/proc/self/fd')))
+RESULT := $(python-exec print(1))
+RESULT := $(python-file $(THIS_PATH)/scripts/2.py)
+RESULT := $(python-mod mod_2)
+$(call assert-equal,$(FD_COUNT),$(python-eval len(os.listdir('/proc/self/fd'))))
+
+.PYTHON_CAPTURE := memory
+
+RESULT := $(python-exec print('foo'); print('bar'))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,$(expected),$(RESULT))
+
+RESULT := $(python-file $(THIS_PATH)/scripts/2.py)
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,Hello,$(RESULT))
+
+RESULT := $(python-mod mod_6)
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,foo bar baz,$(strip $(RESULT)))
+
+# Nested calls each capture their own output
+RESULT := $(python-exec print(gnumake.expand('$$(python-exec print(1))') + '2'))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,12,$(RESULT))
+
+# sys.stdout is restored after an error
+RESULT := $(python-exec print('lost'); 1/0)
+$(call assert-empty,RESULT)
+$(call assert-match,^ZeroDivisionError,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval sys.stdout is sys.__stdout__)
+$(call assert-not-empty,RESULT)
+
+.PYTHON_CAPTURE := bogus
+RESULT := $(python-exec print(1))
+$(call assert-empty,RESULT)
+$(call assert-match,^ValueError: Capture mode,$(.PYTHON_LAST_ERROR))
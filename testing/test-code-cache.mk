@@ -0,0 +1,60 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := code cache
+
+include $(THIS_PATH)/common.mk
+
+$(python-exec gnumake.code_cache.clear())
+
+RESULT := $(python-eval 40+2)
+$(call assert-equal,42,$(RESULT))
+RESULT := $(python-eval 40+2)
+$(call assert-equal,42,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# The lookup of hits is itself a miss
+RESULT := $(python-eval gnumake.code_cache.hits)
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval gnumake.code_cache.misses)
+$(call assert-equal,3,$(RESULT))
+
+# Exec and eval of the same text are cached separately
+$(python-exec gnumake.code_cache.clear())
+RESULT := $(python-exec print(7))
+$(call assert-equal,7,$(RESULT))
+RESULT := $(python-eval print(7))
+$(call assert-equal,,$(RESULT))
+RESULT := $(python-eval gnumake.code_cache.hits)
+$(call assert-equal,0,$(RESULT))
+
+# Syntax errors are reported every time and never cached
+$(python-exec gnumake.code_cache.clear())
+RESULT := $(python-eval a b c)
+$(call assert-match,^SyntaxError: invalid syntax,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval a b c)
+$(call assert-match,^SyntaxError: invalid syntax,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval len(gnumake.code_cache))
+$(call assert-equal,1,$(RESULT))
+
+.PYTHON_CODE_CACHE_SIZE := 2
+$(python-exec gnumake.code_cache.clear())
+RESULT := $(python-eval 1)
+RESULT := $(python-eval 2)
+RESULT := $(python-eval 3)
+RESULT := $(python-eval gnumake.code_cache.evictions)
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval len(gnumake.code_cache))
+$(call assert-equal,2,$(RESULT))
+
+.PYTHON_CODE_CACHE_SIZE := 0
+$(python-exec gnumake.code_cache.clear())
+RESULT := $(python-eval 1)
+RESULT := $(python-eval 1)
+RESULT := $(python-eval gnumake.code_cache.hits)
+$(call assert-equal,0,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+.PYTHON_CODE_CACHE_SIZE := -1
+RESULT := $(python-eval 1)
+$(call assert-empty,RESULT)
+$(call assert-match,^ValueError: .PYTHON_CODE_CACHE_SIZE,$(.PYTHON_LAST_ERROR))
@@ -0,0 +1,66 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := dependency files
+
+include $(THIS_PATH)/common.mk
+
+D := $(shell mktemp -d)
+
+define make_files
+def write(path, text):
+	with open('$(D)/' + path, 'w') as f:
+		f.write(text)
+
+write('a.d', 'a.o: a.c a.h \\\n  my\\ file.h cost$$$$.h\n\na.h:\n\nmy\\ file.h:\n')
+write('b.d', 'b.o b.s: b.c \\\n a.h\na.h:\n')
+write('bad.txt', 'not a rule\n')
+endef
+$(python-exec $(make_files))
+
+define capture_code
+evaluated = []
+_evaluate = gnumake.evaluate
+def capture(s):
+	evaluated.append(s)
+	_evaluate(s)
+gnumake.evaluate = capture
+endef
+$(python-exec $(capture_code))
+
+# Rules from every file are added with one evaluate, and missing files are
+# ignored. Rules without prerequisites are merged, naming each target once.
+$(py-load-deps $(D)/*.d $(D)/missing.d)
+RESULT := $(python-eval len(evaluated))
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval evaluated[-1].replace('\n', ' | '))
+$(call assert-equal,a.o: a.c a.h my\ file.h cost$$$$.h | b.o b.s: b.c a.h | a.h my\ file.h:,$(RESULT))
+
+$(python-exec gnumake.evaluate = _evaluate)
+
+# Unchanged files are not parsed again
+RESULT := $(python-eval gnumake.depfiles.cache.files_parsed)
+$(call assert-equal,2,$(RESULT))
+$(shell echo 'b.o: b.c' > $(D)/b.d)
+$(py-fs-invalidate $(D)/b.d)
+RESULT := $(python-eval gnumake.depfiles.rules(['$(D)/a.d'$(comma) '$(D)/b.d'])[-2])
+$(call assert-equal,(('b.o'$(comma))$(comma) ('b.c'$(comma))),$(RESULT))
+RESULT := $(python-eval gnumake.depfiles.cache.files_parsed)
+$(call assert-equal,3,$(RESULT))
+
+# Errors name the file
+RESULT := $(py-load-deps $(D)/bad.txt)
+$(call assert-match,ValueError: $(D)/bad.txt: Not a rule,$(.PYTHON_LAST_ERROR))
+
+# Parsed rules are kept between runs of make
+probe = $(shell cd $(D) && $(MAKE) -s --no-print-directory \
+				-f $(abspath $(THIS_PATH))/scripts/depfiles-probe.mk \
+				.PYTHON_CACHE_DIR=$(D)/cache PROBE_FILES='$(1)')
+RESULT := $(call probe,*.d)
+$(call assert-equal,2,$(RESULT))
+RESULT := $(call probe,*.d)
+$(call assert-equal,0,$(RESULT))
+$(shell echo 'c.o: c.c' > $(D)/c.d)
+RESULT := $(call probe,*.d)
+$(call assert-equal,1,$(RESULT))
+
+$(shell rm -rf $(D))
@@ -0,0 +1,78 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := dependency scanner
+
+include $(THIS_PATH)/common.mk
+
+D := $(shell mktemp -d)
+
+define make_tree
+import os
+def write(path, text):
+	path = os.path.join('$(D)', path)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'w') as f:
+		f.write(text)
+
+write('src/main.c', '#include "a.h"\n#include <lib.h>\n#include <stdio.h>\n'
+					'  #  include "missing.h"\n#include CONFIG_H\n')
+write('src/other.c', '#include "sub/c.h"\n')
+write('src/plain.c', 'int main() { return 0; }\n')
+write('src/a.h', '#ifndef A_H\n#include "b.h"\n#endif\n')
+write('src/b.h', '#include "a.h"\n#include "sub/c.h"\n')
+write('src/sub/c.h', '')
+write('inc/lib.h', '#include "lib_impl.h"\n')
+write('inc/lib_impl.h', '')
+endef
+$(python-exec $(make_tree))
+
+MAIN_DEPS := $(D)/inc/lib.h $(D)/inc/lib_impl.h $(D)/src/a.h $(D)/src/b.h \
+			 $(D)/src/sub/c.h
+
+# All headers reached from the sources, including through cycles
+RESULT := $(py-deps $(D)/src/main.c,$(D)/inc)
+$(call assert-equal,$(MAIN_DEPS),$(RESULT))
+RESULT := $(py-deps $(D)/src/main.c $(D)/src/other.c,-I$(D)/inc)
+$(call assert-equal,$(MAIN_DEPS),$(RESULT))
+RESULT := $(py-deps $(D)/src/other.c,)
+$(call assert-equal,$(D)/src/sub/c.h,$(RESULT))
+
+# Angle bracket includes are only looked for in the include directories
+RESULT := $(py-deps $(D)/src/main.c,)
+$(call assert-equal,$(D)/src/a.h $(D)/src/b.h $(D)/src/sub/c.h,$(RESULT))
+
+# Each file is read only once
+RESULT := $(python-eval gnumake.depscan.scanner.files_read)
+$(call assert-equal,7,$(RESULT))
+
+# Rules for every source are added with one evaluate
+define capture_code
+evaluated = []
+_evaluate = gnumake.evaluate
+def capture(s):
+	evaluated.append(s)
+	_evaluate(s)
+gnumake.evaluate = capture
+endef
+$(python-exec $(capture_code))
+$(py-deps $(D)/src/main.c $(D)/src/other.c $(D)/src/plain.c,-I $(D)/inc,%.o)
+$(python-exec gnumake.evaluate = _evaluate)
+
+RESULT := $(python-eval len(evaluated))
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval evaluated[0].replace('\n', ' | '))
+$(call assert-equal,$(D)/src/main.o: $(MAIN_DEPS) | $(D)/src/other.o: $(D)/src/sub/c.h,$(RESULT))
+
+# Changes are picked up once the files are invalidated
+$(shell echo '#include "../../inc/lib.h"' > $(D)/src/sub/c.h)
+RESULT := $(py-deps $(D)/src/other.c,)
+$(call assert-equal,$(D)/src/sub/c.h,$(RESULT))
+$(py-fs-invalidate $(D)/src/sub/c.h)
+RESULT := $(py-deps $(D)/src/other.c,)
+$(call assert-equal,$(D)/inc/lib.h $(D)/inc/lib_impl.h $(D)/src/sub/c.h,$(RESULT))
+
+# Missing sources are errors
+RESULT := $(py-deps $(D)/src/missing.c,)
+$(call assert-match,FileNotFoundError,$(.PYTHON_LAST_ERROR))
+
+$(shell rm -rf $(D))
@@ -18,6 +18,10 @@ gnumake.export(product, name='product_two')
 def product_square(*args):
 	return reduce(mul, (int(a)**2 for a in args))
 
+@gnumake.export
+def concat(*args):
+	return ''.join(args)
+
 endef
 
 $(python-exec $(python_code))
@@ -42,5 +46,13 @@ $(call assert-empty,.PYTHON_LAST_ERROR)
 RESULT := $(product-square 1,2,3,4,5)
 $(call assert-empty,RESULT)
 
+RESULT := $(concat ä,b,ç)
+$(call assert-equal,äbç,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# Functions should go through the native trampoline, not ctypes
+RESULT := $(python-eval gnumake._api.native_detected)
+$(call assert-not-empty,RESULT)
+
 # Can't test argument count without crashing the makefile. Probably need to
 # call something from the shell.
@@ -0,0 +1,72 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := filesystem functions
+
+include $(THIS_PATH)/common.mk
+
+FS_DIR := $(shell mktemp -d)
+$(shell mkdir $(FS_DIR)/sub && touch -d '2020-01-01' $(FS_DIR)/old.c \
+	&& touch -d '2021-01-01' $(FS_DIR)/target.o \
+	&& touch -d '2022-01-01' $(FS_DIR)/new.c)
+
+# Whole word lists are answered in one call
+RESULT := $(py-isfile $(FS_DIR)/old.c $(FS_DIR)/sub $(FS_DIR)/missing \
+					  $(FS_DIR)/new.c)
+$(call assert-equal,$(FS_DIR)/old.c $(FS_DIR)/new.c,$(RESULT))
+RESULT := $(py-isdir $(FS_DIR)/old.c $(FS_DIR)/sub $(FS_DIR)/sub/ \
+					 $(FS_DIR)/old.c/)
+$(call assert-equal,$(FS_DIR)/sub $(FS_DIR)/sub/,$(RESULT))
+RESULT := $(py-isfile $(FS_DIR)/old.c/)
+$(call assert-empty,RESULT)
+
+RESULT := $(py-mtime $(FS_DIR)/missing $(FS_DIR)/target.o)
+$(call assert-equal,0 $(shell stat -c %Y $(FS_DIR)/target.o).0,$(RESULT))
+
+RESULT := $(py-newer $(FS_DIR)/target.o,$(FS_DIR)/old.c $(FS_DIR)/new.c \
+					 $(FS_DIR)/missing.c)
+$(call assert-equal,$(FS_DIR)/new.c $(FS_DIR)/missing.c,$(RESULT))
+RESULT := $(py-newer $(FS_DIR)/target.o $(FS_DIR)/missing.o,$(FS_DIR)/old.c)
+$(call assert-equal,$(FS_DIR)/old.c,$(RESULT))
+
+# Lookups in the same directory are answered from one listing
+define count_code
+cache = gnumake.fs.cache
+misses = cache.misses
+gnumake.fs.isfile('$(FS_DIR)/old.c')
+gnumake.fs.exists('$(FS_DIR)/nothing')
+print(cache.misses - misses)
+endef
+RESULT := $(python-exec $(count_code))
+$(call assert-equal,0,$(RESULT))
+
+# Files created during parse are not seen until invalidated
+$(shell touch $(FS_DIR)/created.c)
+RESULT := $(py-isfile $(FS_DIR)/created.c)
+$(call assert-empty,RESULT)
+$(py-fs-invalidate $(FS_DIR)/created.c)
+RESULT := $(py-isfile $(FS_DIR)/created.c)
+$(call assert-equal,$(FS_DIR)/created.c,$(RESULT))
+
+RESULT := $(py-isfile $(FS_DIR)/sub/inner.c)
+$(call assert-empty,RESULT)
+$(shell touch $(FS_DIR)/sub/inner.c)
+RESULT := $(py-isfile $(FS_DIR)/sub/inner.c)
+$(call assert-empty,RESULT)
+$(py-fs-invalidate )
+RESULT := $(py-isfile $(FS_DIR)/sub/inner.c)
+$(call assert-equal,$(FS_DIR)/sub/inner.c,$(RESULT))
+
+# Python API
+define api_code
+fs = gnumake.fs
+print(fs.isdir('/'), fs.exists('$(FS_DIR)/sub/'), fs.exists('$(FS_DIR)/old.c/'),
+	  fs.stat('$(FS_DIR)/old.c').st_size)
+try:
+	fs.getmtime('$(FS_DIR)/missing')
+except FileNotFoundError:
+	print('missing')
+endef
+RESULT := $(strip $(python-exec $(api_code)))
+$(call assert-equal,True True False 0 missing,$(RESULT))
+
+$(shell rm -rf $(FS_DIR))
@@ -0,0 +1,66 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := content hashes
+
+include $(THIS_PATH)/common.mk
+
+HASH_DIR := $(shell mktemp -d)
+$(shell echo hello > $(HASH_DIR)/a && echo world > $(HASH_DIR)/b \
+	&& head -c 3000000 /dev/zero > $(HASH_DIR)/big \
+	&& touch -d '2020-01-01' $(HASH_DIR)/a $(HASH_DIR)/b $(HASH_DIR)/big)
+
+sha256 = $(firstword $(shell sha256sum $(1)))
+md5 = $(firstword $(shell md5sum $(1)))
+
+# One digest per file, in order. Large files are hashed through mmap.
+RESULT := $(py-hash sha256,$(HASH_DIR)/b $(HASH_DIR)/a $(HASH_DIR)/big)
+$(call assert-equal,$(call sha256,$(HASH_DIR)/b) $(call sha256,$(HASH_DIR)/a) \
+	$(call sha256,$(HASH_DIR)/big),$(RESULT))
+RESULT := $(py-hash md5,$(HASH_DIR)/a)
+$(call assert-equal,$(call md5,$(HASH_DIR)/a),$(RESULT))
+
+# Unchanged files are not read again
+misses = $(python-eval gnumake.hashing.index.misses)
+RESULT := $(misses)
+$(call assert-equal,4,$(RESULT))
+RESULT := $(py-hash sha256,$(HASH_DIR)/a $(HASH_DIR)/a $(HASH_DIR)/b)
+RESULT := $(misses)
+$(call assert-equal,4,$(RESULT))
+
+# Touching a file means it is read again, but its digest is the same
+$(shell touch -d '2021-01-01' $(HASH_DIR)/a)
+$(py-fs-invalidate $(HASH_DIR)/a)
+RESULT := $(py-hash sha256,$(HASH_DIR)/a)
+$(call assert-equal,$(call sha256,$(HASH_DIR)/a),$(RESULT))
+RESULT := $(misses)
+$(call assert-equal,5,$(RESULT))
+
+# Many files are hashed in parallel
+RESULT := $(python-eval gnumake.hashing.file_digests( \
+	['$(HASH_DIR)/a'$(comma) '$(HASH_DIR)/b'], workers=2) \
+	== [gnumake.hashing.file_digest(f) for f in ['$(HASH_DIR)/a'$(comma) '$(HASH_DIR)/b']])
+$(call assert-equal,1,$(RESULT))
+
+# Errors
+RESULT := $(py-hash sha256,$(HASH_DIR)/missing)
+$(call assert-match,FileNotFoundError,$(.PYTHON_LAST_ERROR))
+RESULT := $(py-hash nosuchhash,$(HASH_DIR)/a)
+$(call assert-match,ValueError,$(.PYTHON_LAST_ERROR))
+
+# Digests are kept between runs of make
+probe = $(shell $(MAKE) -s --no-print-directory \
+				-f $(THIS_PATH)/scripts/hash-probe.mk \
+				.PYTHON_CACHE_DIR=$(HASH_DIR)/cache PROBE_FILES='$(1)')
+RESULT := $(call probe,$(HASH_DIR)/a $(HASH_DIR)/b)
+$(call assert-equal,$(call sha256,$(HASH_DIR)/a) $(call sha256,$(HASH_DIR)/b) 2,$(RESULT))
+RESULT := $(call probe,$(HASH_DIR)/a $(HASH_DIR)/b)
+$(call assert-equal,$(call sha256,$(HASH_DIR)/a) $(call sha256,$(HASH_DIR)/b) 0,$(RESULT))
+
+# ...except for files modified too recently to trust their timestamp
+$(shell echo new > $(HASH_DIR)/new)
+RESULT := $(lastword $(call probe,$(HASH_DIR)/new))
+$(call assert-equal,1,$(RESULT))
+RESULT := $(lastword $(call probe,$(HASH_DIR)/new))
+$(call assert-equal,1,$(RESULT))
+
+$(shell rm -rf $(HASH_DIR))
@@ -0,0 +1,132 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := jobserver
+
+include $(THIS_PATH)/common.mk
+
+$(python-exec import gnumake.jobserver)
+parse = $(python-eval gnumake.jobserver.parse_auth('$(1)'))
+
+$(call assert-equal,('fds'$(comma) 3$(comma) 4),$(call parse,-j3 --jobserver-auth=3$(comma)4))
+$(call assert-equal,('fds'$(comma) 5$(comma) 6),$(call parse,k --jobserver-fds=3$(comma)4 --jobserver-auth=5$(comma)6))
+$(call assert-equal,('fifo'$(comma) '/tmp/GMfifo1'),$(call parse,-j3 --jobserver-auth=fifo:/tmp/GMfifo1))
+RESULT := $(call parse,-j3 --jobserver-auth=-2$(comma)-2)
+$(call assert-empty,RESULT)
+RESULT := $(call parse,-j3 --jobserver-auth=gmk_sem_1)
+$(call assert-empty,RESULT)
+RESULT := $(call parse,-- --jobserver-auth=3$(comma)4)
+$(call assert-empty,RESULT)
+RESULT := $(call parse,k)
+$(call assert-empty,RESULT)
+
+# A jobserver of our own, with two tokens
+define setup_code
+import os
+import threading
+import time
+
+read_fd, write_fd = os.pipe()
+os.write(write_fd, b'ab')
+server = gnumake.jobserver.JobServer(read_fd, write_fd)
+
+def tokens_in_pipe():
+	os.set_blocking(read_fd, False)
+	tokens = os.read(read_fd, 100)
+	os.set_blocking(read_fd, True)
+	os.write(write_fd, tokens)
+	return tokens.decode()
+endef
+$(python-exec $(setup_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+RESULT := $(python-eval gnumake.jobserver.JobServer.from_auth(('fds', 1000, 1001)))
+$(call assert-empty,RESULT)
+
+RESULT := $(python-eval [server.acquire(block=False) for _ in range(3)])
+$(call assert-equal,[True$(comma) True$(comma) False],$(RESULT))
+$(call assert-equal,2,$(python-eval server.held))
+$(call assert-equal,False,$(python-eval str(server.acquire(timeout=0.01))))
+$(python-exec server.release(); server.release())
+$(call assert-equal,0,$(python-eval server.held))
+# The same bytes are written back
+$(call assert-equal,ba,$(python-eval tokens_in_pipe()))
+
+define release_error
+try:
+	server.release()
+except RuntimeError as e:
+	print(e)
+endef
+$(call assert-equal,No job token is held,$(python-exec $(release_error)))
+
+# Tokens are returned if the work raises an exception
+define token_code
+try:
+	with server.token():
+		print(server.held, end=' ')
+		raise ValueError
+except ValueError:
+	print(server.held, tokens_in_pipe())
+endef
+$(call assert-equal,1 0 ab,$(python-exec $(token_code)))
+
+# The executor runs one thread without a token, and one more per token
+define executor_code
+running = 0
+most_running = 0
+lock = threading.Lock()
+
+def work(n):
+	global running, most_running
+	with lock:
+		running += 1
+		most_running = max(most_running, running)
+	time.sleep(0.01)
+	with lock:
+		running -= 1
+	if n == 5:
+		raise ValueError(n)
+	return n * n
+
+with gnumake.jobserver.Executor(8, server) as pool:
+	futures = [pool.submit(work, n) for n in range(20)]
+	results = [f.exception() or f.result() for f in futures]
+print(most_running, repr(results[5]), results[19], server.held,
+	  ''.join(sorted(tokens_in_pipe())))
+endef
+$(call assert-equal,3 ValueError(5) 361 0 ab,$(python-exec $(executor_code)))
+
+# Without a jobserver, max_workers is the only limit
+define unbounded_code
+most_running = 0
+with gnumake.jobserver.Executor(4, None) as pool:
+	list(pool.map(work, range(6, 14)))
+print(most_running)
+endef
+$(call assert-equal,4,$(python-exec $(unbounded_code)))
+
+define shutdown_code
+pool = gnumake.jobserver.Executor(1, server)
+pool.shutdown()
+try:
+	pool.submit(work, 1)
+except RuntimeError as e:
+	print(e)
+endef
+$(call assert-equal,cannot schedule new futures after shutdown,$(python-exec $(shutdown_code)))
+$(python-exec server.close(); os.close(read_fd); os.close(write_fd))
+
+# make's own jobserver, which only exists while recipes run. pmap uses it.
+probe = $(shell $(MAKE) -s --no-print-directory $(1) \
+				-f $(THIS_PATH)/scripts/jobserver-probe.mk $(2) 2>&1)
+$(call assert-equal,1,$(call probe,-j3,client))
+RESULT := $(call probe,,client)
+$(call assert-empty,RESULT)
+$(call assert-equal,3,$(call probe,-j3,pmap))
+$(call assert-equal,1,$(call probe,,pmap))
+$(call assert-equal,3,$(call probe,-j3,processes))
+$(call assert-equal,1,$(call probe,-j2,processes-without-tokens))
+
+# A sub-make that exits holding a token gives it back (otherwise, make
+# complains that it is missing)
+$(call assert-equal,1,$(call probe,-j2,sub-make))
@@ -0,0 +1,96 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := memoized functions
+
+include $(THIS_PATH)/common.mk
+
+define python_code
+memo_calls = []
+
+@gnumake.export(cache=True)
+def memo_upper(a):
+	memo_calls.append(a)
+	return a.upper()
+
+@gnumake.export(cache=2)
+def memo_small(a):
+	memo_calls.append(a)
+	return a
+
+@gnumake.export(cache=gnumake.FunctionCache(track_variables=True))
+def memo_prefix(a):
+	memo_calls.append(a)
+	return gnumake.var['MEMO_PREFIX'] + a
+
+@gnumake.export(cache=gnumake.FunctionCache(file_args=[0]))
+def memo_cat(files):
+	memo_calls.append(files)
+	return ' '.join(open(f).read().strip() for f in files.split())
+
+@gnumake.export(cache=True)
+def memo_fail(a):
+	memo_calls.append(a)
+	raise ValueError(a)
+endef
+
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# Repeated calls with the same arguments only run the function once
+RESULT := $(memo_upper abc) $(memo_upper abc) $(memo_upper def)
+$(call assert-equal,ABC ABC DEF,$(RESULT))
+RESULT := $(python-eval len(memo_calls))
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval tuple(gnumake.cache_info('memo_upper')))
+$(call assert-equal,(1$(comma) 2$(comma) 128$(comma) 2),$(RESULT))
+
+# cache_clear() forgets the results
+$(python-exec gnumake.cache_clear('memo_upper'); memo_calls.clear())
+RESULT := $(memo_upper abc)
+$(call assert-equal,ABC,$(RESULT))
+RESULT := $(python-eval len(memo_calls))
+$(call assert-equal,1,$(RESULT))
+
+RESULT := $(python-eval gnumake.cache_clear('product'))
+$(call assert-match,^ValueError: product is not a cached function,$(.PYTHON_LAST_ERROR))
+
+# The least recently used result is dropped
+$(python-exec memo_calls.clear())
+RESULT := $(memo_small a)$(memo_small b)$(memo_small a)$(memo_small c)$(memo_small a)$(memo_small b)
+$(call assert-equal,abacab,$(RESULT))
+RESULT := $(python-eval ''.join(memo_calls))
+$(call assert-equal,abcb,$(RESULT))
+
+# Results are revalidated against the variables that were read
+$(python-exec memo_calls.clear())
+MEMO_PREFIX := x-
+RESULT := $(memo_prefix a) $(memo_prefix a)
+$(call assert-equal,x-a x-a,$(RESULT))
+MEMO_PREFIX := y-
+RESULT := $(memo_prefix a) $(memo_prefix a)
+$(call assert-equal,y-a y-a,$(RESULT))
+RESULT := $(python-eval len(memo_calls))
+$(call assert-equal,2,$(RESULT))
+
+# File arguments are keyed on their modification time and size
+MEMO_DIR := $(shell mktemp -d)
+$(file >$(MEMO_DIR)/a.txt,one)
+$(file >$(MEMO_DIR)/b.txt,two)
+$(python-exec memo_calls.clear())
+RESULT := $(memo_cat $(MEMO_DIR)/a.txt $(MEMO_DIR)/b.txt)
+$(call assert-equal,one two,$(RESULT))
+RESULT := $(memo_cat $(MEMO_DIR)/a.txt $(MEMO_DIR)/b.txt)
+$(call assert-equal,one two,$(RESULT))
+$(file >$(MEMO_DIR)/b.txt,three)
+RESULT := $(memo_cat $(MEMO_DIR)/a.txt $(MEMO_DIR)/b.txt)
+$(call assert-equal,one three,$(RESULT))
+RESULT := $(python-eval len(memo_calls))
+$(call assert-equal,2,$(RESULT))
+$(shell rm -rf $(MEMO_DIR))
+
+# Exceptions are not cached
+$(python-exec memo_calls.clear())
+RESULT := $(memo_fail a)$(memo_fail a)
+$(call assert-match,^ValueError: a,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval len(memo_calls))
+$(call assert-equal,2,$(RESULT))
@@ -41,3 +41,45 @@ RESULT := $(python-mod mod_6)
 $(call assert-equal,$(expected),$(RESULT))
 $(call assert-empty,.PYTHON_LAST_ERROR)
 
+
+# With .PYTHON_MOD_ONCE, modules are only run again if they change
+.PYTHON_MOD_ONCE := 1
+$(python-exec gnumake.module_cache.skipped = 0)
+RESULT := $(python-mod mod_7)
+$(call assert-equal,ran,$(RESULT))
+RESULT := $(python-mod mod_7)$(python-mod mod_7)
+$(call assert-empty,RESULT)
+RESULT := $(mod_7_func x)
+$(call assert-equal,called x,$(RESULT))
+RESULT := $(python-eval gnumake.module_cache.skipped)
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval sorted(gnumake.module_cache.namespace('mod_7')))
+$(call assert-contains,'mod_7_func'$(comma),$(RESULT))
+
+# Modules that have already run aren't run again either
+RESULT := $(python-mod mod_2)
+$(call assert-empty,RESULT)
+
+D := $(shell mktemp -d)
+$(shell mkdir $(D)/mod_8 && touch $(D)/mod_8/__init__.py && echo 'print(1)' > $(D)/mod_8/__main__.py)
+$(python-exec sys.path.insert(0$(comma) '$(D)'))
+RESULT := $(python-mod mod_8)$(python-mod mod_8)
+$(call assert-equal,1,$(RESULT))
+$(shell echo 'print(22)' > $(D)/mod_8/__main__.py)
+RESULT := $(python-mod mod_8)$(python-mod mod_8)
+$(call assert-equal,22,$(RESULT))
+$(python-exec sys.path.remove('$(D)'))
+$(shell rm -rf $(D))
+
+# By default, modules are run every time
+.PYTHON_MOD_ONCE :=
+RESULT := $(python-mod mod_7)
+$(call assert-equal,ran,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# Modules in .PYTHON_MOD_PRECOMPILE are loaded at startup
+RESULT := $(shell $(MAKE) -s --no-print-directory -f $(THIS_PATH)/scripts/mod-probe.mk)
+$(call assert-equal,0 1 ran,$(RESULT))
+RESULT := $(shell $(MAKE) -s --no-print-directory -f $(THIS_PATH)/scripts/mod-probe.mk \
+	.PYTHON_MOD_PRECOMPILE='mod_7 no_such_module')
+$(call assert-equal,1 1 ran,$(RESULT))
@@ -0,0 +1,61 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := persistent cache
+
+include $(THIS_PATH)/common.mk
+
+PROBE_DIR := $(shell mktemp -d)
+PROBE_LOG := $(PROBE_DIR)/calls.log
+
+# Runs a separate make process that calls $(persistent_probe $(1))
+probe = $(shell PROBE_LOG=$(PROBE_LOG) $(MAKE) -s --no-print-directory \
+				-f $(THIS_PATH)/scripts/persistent-probe.mk \
+				.PYTHON_CACHE_DIR=$(PROBE_DIR)/cache PROBE_ARG=$(1))
+
+# Later runs of make reuse the result
+RESULT := $(call probe,abc)
+$(call assert-equal,ABC,$(RESULT))
+RESULT := $(call probe,abc)
+$(call assert-equal,ABC,$(RESULT))
+RESULT := $(call probe,def)
+$(call assert-equal,DEF,$(RESULT))
+RESULT := $(shell cat $(PROBE_LOG))
+$(call assert-equal,abc def,$(RESULT))
+
+# Concurrent makes share the cache safely, and each result is only
+# computed once
+RESULT := $(shell for i in 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16; do \
+	PROBE_LOG=$(PROBE_LOG) $(MAKE) -s --no-print-directory \
+		-f $(THIS_PATH)/scripts/persistent-probe.mk \
+		.PYTHON_CACHE_DIR=$(PROBE_DIR)/cache PROBE_ARG=x$$i \
+		>/dev/null || echo FAILED & \
+	done; wait)
+$(call assert-empty,RESULT)
+$(call assert-equal,18,$(words $(shell cat $(PROBE_LOG))))
+RESULT := $(shell for i in 1 2 3 4 5 6 7 8; do \
+	PROBE_LOG=$(PROBE_LOG) $(MAKE) -s --no-print-directory \
+		-f $(THIS_PATH)/scripts/persistent-probe.mk \
+		.PYTHON_CACHE_DIR=$(PROBE_DIR)/cache PROBE_ARG=x$$i \
+		>/dev/null || echo FAILED & \
+	done; wait)
+$(call assert-empty,RESULT)
+$(call assert-equal,18,$(words $(shell cat $(PROBE_LOG))))
+
+# The least recently used results are evicted past the size limit
+.PYTHON_CACHE_DIR := $(PROBE_DIR)/cache2
+.PYTHON_CACHE_MAX_SIZE := 10000
+
+define evict_code
+cache = gnumake.persistent_cache
+cache.TOUCH_INTERVAL = 0
+for i in range(100):
+	cache.put('test', b'%d' % i, 'x' * 1000)
+	cache.get(b'0')
+print(cache.size() <= cache.max_size, cache.get(b'0') is not None,
+	  cache.get(b'1') is None)
+endef
+RESULT := $(python-exec $(evict_code))
+$(call assert-equal,True True True,$(RESULT))
+
+$(python-exec gnumake.persistent_cache.close())
+$(shell rm -rf $(PROBE_DIR))
@@ -0,0 +1,102 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := parallel map
+
+include $(THIS_PATH)/common.mk
+
+define python_code
+import threading
+
+@gnumake.export
+def pmap_upper(word):
+	return word.upper()
+
+@gnumake.export
+def pmap_thread(word):
+	return threading.current_thread() is threading.main_thread()
+
+@gnumake.export
+def pmap_fail(word):
+	if word == 'bad':
+		raise ValueError(word)
+	return word
+
+def pmap_expand(word):
+	return gnumake.expand(word)
+
+def pmap_square(n):
+	return n * n
+endef
+
+$(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# Results come back in order
+RESULT := $(py-pmap pmap_upper,a b c d e f g h)
+$(call assert-equal,A B C D E F G H,$(RESULT))
+RESULT := $(py-pmap pmap_upper,)
+$(call assert-empty,RESULT)
+
+RESULT := $(python-eval ' '.join(gnumake.pmap(pmap_upper, 'a b c', workers=2)))
+$(call assert-equal,A B C,$(RESULT))
+RESULT := $(python-eval gnumake.pmap(pmap_square, range(1000), workers=4) \
+						== [n * n for n in range(1000)])
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval sum(gnumake.pmap(pmap_square, [1, 2, 3], workers=2, \
+										 processes=True)))
+$(call assert-equal,14,$(RESULT))
+
+# Work happens outside the main thread when there is more than one worker
+RESULT := $(python-eval set(gnumake.pmap(pmap_thread, 'a b c d', workers=4)))
+$(call assert-equal,{False},$(RESULT))
+
+# Workers may not use the make API
+define api_code
+try:
+	gnumake.pmap(pmap_expand, 'a b', workers=2)
+except RuntimeError as e:
+	print(e)
+endef
+RESULT := $(python-exec $(api_code))
+$(call assert-equal,The make API can only be used from make's main thread,$(RESULT))
+
+# Errors are reported as from any exported function
+RESULT := $(py-pmap pmap_fail,ok bad)
+$(call assert-empty,RESULT)
+$(call assert-equal,ValueError: bad,$(.PYTHON_LAST_ERROR))
+
+# Every call runs, even after one in the same chunk raises, and the first
+# exception in order of the words is raised
+define pmap_errors_code
+called = set()
+def pmap_record(n):
+	called.add(n)
+	if n in (3, 50):
+		raise ValueError(n)
+	return n
+
+outcomes = []
+for workers in (1, 2):
+	called.clear()
+	try:
+		gnumake.pmap(pmap_record, range(100), workers=workers)
+	except ValueError as e:
+		outcomes.append('{} {}'.format(e, len(called)))
+print(*outcomes)
+endef
+RESULT := $(python-exec $(pmap_errors_code))
+$(call assert-equal,3 100 3 100,$(RESULT))
+
+RESULT := $(py-pmap no_such_function,a)
+$(call assert-equal,ValueError: no_such_function is not an exported function,$(.PYTHON_LAST_ERROR))
+
+# The default pool size comes from make's -j option
+jobs = $(shell MAKEFLAGS='$(1)' $(MAKE) -s --no-print-directory $(2) \
+			   -f $(THIS_PATH)/scripts/jobs-probe.mk)
+$(call assert-equal,1,$(call jobs,,))
+$(call assert-equal,3,$(call jobs,,-j3))
+$(call assert-equal,3,$(call jobs,,-kj 3))
+$(call assert-equal,2,$(call jobs,,--jobs=2))
+$(call assert-equal,5,$(call jobs,k -j5,))
+$(call assert-equal,2,$(call jobs,-j5,-j2))
+$(call assert-equal,$(python-eval os.cpu_count()),$(call jobs,,-j))
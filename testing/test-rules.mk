@@ -0,0 +1,57 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := generated rules
+
+include $(THIS_PATH)/common.mk
+
+$(python-exec from gnumake.rules import Rule$(comma) PatternRule$(comma) RuleSet)
+
+# Names are escaped, except for the % of pattern rules
+RESULT := $(python-eval str(Rule(['a b$$c#d:e%f']$(comma) 'x.c y.h'$(comma) 'dir')))
+$(call assert-equal,a\ b$$$$c\#d\:e\%f: x.c y.h | dir,$(RESULT))
+RESULT := $(python-eval str(PatternRule('%.o'$(comma) '%.c'$(comma) double_colon=True)))
+$(call assert-equal,%.o:: %.c,$(RESULT))
+
+# Variables come before the rule, and recipe lines are tab-prefixed
+RESULT := $(python-eval str(Rule('t'$(comma) variables={'V': 'a#b\\'$(comma) 'W': ('+='$(comma) 'c')}$(comma) \
+		  recipe=['echo $$@'$(comma) 'one\ntwo'])).replace('\t'$(comma) '<tab>').replace('\n'$(comma) '|'))
+$(call assert-equal,t: V = a\#b\$$()|t: W += c|t:|<tab>echo $$@|<tab>one|<tab>two,$(RESULT))
+
+# Errors
+RESULT := $(python-eval Rule(''))
+$(call assert-match,ValueError,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval PatternRule('a.o'))
+$(call assert-match,ValueError,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval str(Rule('t'$(comma) variables={'V': 'a\nb'})))
+$(call assert-match,newlines,$(.PYTHON_LAST_ERROR))
+RESULT := $(python-eval str(Rule('t'$(comma) variables={'V': ('=='$(comma) 'b')})))
+$(call assert-match,operator,$(.PYTHON_LAST_ERROR))
+
+# A set of rules is added with one evaluate, and emptied
+define capture_code
+evaluated = []
+_evaluate = gnumake.evaluate
+def capture(s):
+	evaluated.append(s)
+	_evaluate(s)
+gnumake.evaluate = capture
+rules = RuleSet()
+for i in range(100):
+	rules.rule('gen%d.o' % i, 'gen%d.c' % i)
+rules.pattern_rule('gen%.c', recipe='@touch $$@')
+rules.evaluate()
+rules.evaluate()
+gnumake.evaluate = _evaluate
+endef
+$(python-exec $(capture_code))
+RESULT := $(python-eval len(evaluated))
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval len(rules))
+$(call assert-equal,0,$(RESULT))
+
+# The rules work as intended when make runs them
+D := $(shell mktemp -d)
+RESULT := $(shell cd $(D) && $(MAKE) -s --no-print-directory \
+	-f $(abspath $(THIS_PATH))/scripts/rules-probe.mk)
+$(call assert-equal,out dir/a#b:c.o hello # there -g -O2 x$$y.c percent 100%.txt gen x from x.src first second,$(RESULT))
+$(shell rm -rf $(D))
@@ -35,3 +35,55 @@ RESULT := $(python-file $(THIS_PATH)/scripts/6.py)
 $(call assert-equal,$(expected),$(RESULT))
 $(call assert-empty,.PYTHON_LAST_ERROR)
 
+# Compiled scripts are reused in-process, and only recompiled on change
+$(python-exec gnumake.script_cache.clear())
+RESULT := $(python-file $(THIS_PATH)/scripts/2.py)
+RESULT := $(python-file $(THIS_PATH)/scripts/2.py)
+$(call assert-equal,Hello,$(RESULT))
+RESULT := $(python-eval gnumake.script_cache.hits)
+$(call assert-equal,1,$(RESULT))
+
+define python_code
+import tempfile
+script_dir = tempfile.mkdtemp()
+script = os.path.join(script_dir, 'script.py')
+with open(script, 'w') as fp:
+	fp.write('print("one")\n')
+endef
+$(python-exec $(python_code))
+SCRIPT := $(python-eval script)
+SCRIPT_DIR := $(python-eval script_dir)
+
+# No bytecode is written when asked not to
+.PYTHONDONTWRITEBYTECODE := 1
+$(python-exec gnumake.script_cache.clear())
+RESULT := $(python-file $(SCRIPT))
+$(call assert-equal,one,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+RESULT := $(wildcard $(SCRIPT_DIR)/__pycache__)
+$(call assert-empty,RESULT)
+undefine .PYTHONDONTWRITEBYTECODE
+
+# Bytecode is saved and loaded by a fresh cache. PYTHONDONTWRITEBYTECODE may
+# be set in the environment running the tests.
+$(python-exec sys.dont_write_bytecode = False)
+$(python-exec gnumake.script_cache.clear())
+RESULT := $(python-file $(SCRIPT))
+RESULT := $(wildcard $(SCRIPT_DIR)/__pycache__/script.*.pyc)
+$(call assert-not-empty,RESULT)
+$(python-exec gnumake.script_cache.clear())
+RESULT := $(python-file $(SCRIPT))
+$(call assert-equal,one,$(RESULT))
+RESULT := $(python-eval gnumake.script_cache.loads)
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval gnumake.script_cache.compiles)
+$(call assert-equal,0,$(RESULT))
+
+# Changing the script invalidates both caches
+$(python-exec open(script, 'w').write('print("three")\n'))
+RESULT := $(python-file $(SCRIPT))
+$(call assert-equal,three,$(RESULT))
+RESULT := $(python-eval gnumake.script_cache.compiles)
+$(call assert-equal,1,$(RESULT))
+
+$(python-exec import shutil; shutil.rmtree(script_dir))
@@ -0,0 +1,38 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := fast startup
+
+# Must be set before the plugin is loaded
+.PYTHON_FAST_STARTUP := 1
+
+include $(THIS_PATH)/common.mk
+
+# Startup time is always reported
+$(call assert-not-empty,.PYTHON_INIT_SECONDS)
+RESULT := $(python-eval float('$(.PYTHON_INIT_SECONDS)') >= 0)
+$(call assert-equal,1,$(RESULT))
+
+# The site module is skipped
+RESULT := $(python-eval sys.flags.no_site)
+$(call assert-equal,1,$(RESULT))
+
+RESULT := $(python-eval 'site' in sys.modules)
+$(call assert-empty,RESULT)
+
+# Heavy modules aren't imported until needed
+RESULT := $(python-eval [m for m in ('inspect', 'traceback', 'ctypes', 'runpy', 'tempfile') if m in sys.modules])
+$(call assert-equal,[],$(RESULT))
+
+# Same as PySys_SetArgv
+RESULT := $(python-eval repr(sys.argv))
+$(call assert-equal,[''],$(RESULT))
+RESULT := $(python-eval repr(sys.path[0]))
+$(call assert-equal,'',$(RESULT))
+
+# Parameter guessing without inspect
+RESULT := $(python-eval gnumake.guess_function_parameters(lambda a, b=1, *c: 0))
+$(call assert-equal,(1, -1),$(RESULT))
+RESULT := $(python-eval gnumake.guess_function_parameters(lambda a, /, b, *, c: 0))
+$(call assert-equal,(2, 2),$(RESULT))
+RESULT := $(python-eval gnumake.guess_function_parameters(os.path.join))
+$(call assert-equal,(1, -1),$(RESULT))
@@ -0,0 +1,79 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := call statistics
+
+# Must be set before the plugin is loaded
+STATS_DIR := $(shell mktemp -d)
+.PYTHON_STATS := $(STATS_DIR)/stats-%p.json
+.PYTHON_PROFILE := $(STATS_DIR)/profile-%p.prof
+
+include $(THIS_PATH)/common.mk
+
+define stats_code
+@gnumake.export
+def stats_concat(a, b):
+	return a + b
+
+@gnumake.export
+def stats_fail(a):
+	raise ValueError(a)
+
+@gnumake.export(name='stats_alias')
+@gnumake.export
+def stats_twice(a):
+	return a
+endef
+
+$(python-exec $(stats_code))
+$(python-exec import json, pstats)
+
+RESULT := $(python-eval gnumake.call_stats.enabled)
+$(call assert-equal,1,$(RESULT))
+
+# %p is replaced with the process ID
+RESULT := $(python-eval gnumake.call_stats.path == '$(STATS_DIR)/stats-%d.json' % os.getpid())
+$(call assert-equal,1,$(RESULT))
+
+$(python-exec gnumake.call_stats.clear())
+
+RESULT := $(stats_concat ab,cdé)
+$(call assert-equal,abcdé,$(RESULT))
+RESULT := $(stats_concat x,y)
+RESULT := $(stats_fail x)
+$(call assert-not-empty,.PYTHON_LAST_ERROR)
+
+RESULT := $(python-eval gnumake.call_stats.functions['stats_concat'].calls)
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval gnumake.call_stats.functions['stats_concat'].bytes_in)
+$(call assert-equal,8,$(RESULT))
+RESULT := $(python-eval gnumake.call_stats.functions['stats_concat'].bytes_out)
+$(call assert-equal,8,$(RESULT))
+RESULT := $(python-eval gnumake.call_stats.functions['stats_concat'].errors)
+$(call assert-equal,0,$(RESULT))
+RESULT := $(python-eval gnumake.call_stats.functions['stats_fail'].errors)
+$(call assert-equal,1,$(RESULT))
+
+# A function exported under two names is counted under each name
+RESULT := $(stats_twice a)$(stats_alias b)$(stats_alias c)
+RESULT := $(python-eval gnumake.call_stats.functions['stats_twice'].calls)
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval gnumake.call_stats.functions['stats_alias'].calls)
+$(call assert-equal,2,$(RESULT))
+
+# Built-in functions are included too, and times are measured
+RESULT := $(python-eval gnumake.call_stats.functions['python-eval'].calls > 0)
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval 0 < gnumake.call_stats.functions['python-eval'].max_time <= gnumake.call_stats.functions['python-eval'].total_time)
+$(call assert-equal,1,$(RESULT))
+
+# Results are written on exit, or on request
+$(python-exec gnumake.call_stats.write())
+
+RESULT := $(python-eval json.load(open(gnumake.call_stats.path))['functions']['stats_concat']['calls'])
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval pstats.Stats(gnumake.call_stats.profile_path).total_calls > 0)
+$(call assert-equal,1,$(RESULT))
+
+# Don't leave files behind
+$(python-exec gnumake.call_stats.path = gnumake.call_stats.profile_path = None)
+$(shell rm -rf $(STATS_DIR))
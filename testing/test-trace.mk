@@ -0,0 +1,78 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := tracer
+
+# Must be set before the plugin is loaded
+TRACE_DIR := $(shell mktemp -d)
+.PYTHON_TRACE := $(TRACE_DIR)/trace-%p.json
+
+include $(THIS_PATH)/common.mk
+
+define trace_code
+import json
+
+@gnumake.export
+def trace_nested(a):
+	gnumake.evaluate('TRACE_VAR := ' + a)
+	return gnumake.expand('$$(TRACE_VAR)')
+
+gnumake.export(trace_nested, name='trace_alias')
+
+def trace_spans(name):
+	return [e for e in gnumake.tracer.as_dict()['traceEvents']
+			if e['name'] == name]
+endef
+
+$(python-exec $(trace_code))
+
+RESULT := $(python-eval gnumake.tracer.enabled)
+$(call assert-equal,1,$(RESULT))
+
+$(python-exec gnumake.tracer.clear())
+RESULT := $(trace_nested hello)
+$(call assert-equal,hello,$(RESULT))
+
+# The function span contains the evaluate and expand spans
+RESULT := $(python-eval len(trace_spans('trace_nested')))
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval trace_spans('trace_nested')[0]['args']['detail'])
+$(call assert-equal,hello,$(RESULT))
+RESULT := $(python-eval trace_spans('evaluate')[0]['args']['detail'])
+$(call assert-equal,TRACE_VAR := hello,$(RESULT))
+
+define check_nesting
+outer = trace_spans('trace_nested')[0]
+inner = trace_spans('expand')[0]
+print(outer['ts'] <= inner['ts'] and
+	  inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'])
+endef
+RESULT := $(python-exec $(check_nesting))
+$(call assert-equal,True,$(RESULT))
+
+# Spans use the name make called the function by
+RESULT := $(trace_alias there)
+RESULT := $(python-eval len(trace_spans('trace_nested')) $(comma) len(trace_spans('trace_alias')))
+$(call assert-equal,(1$(comma) 1),$(RESULT))
+
+# Spans are tagged with the makefile and MAKELEVEL
+RESULT := $(python-eval trace_spans('trace_nested')[0]['args']['makefile'])
+$(call assert-equal,$(lastword $(MAKEFILE_LIST)),$(RESULT))
+RESULT := $(python-eval trace_spans('trace_nested')[0]['args']['makelevel'])
+$(call assert-equal,$(MAKELEVEL),$(RESULT))
+
+# The ring buffer keeps the most recent spans
+$(python-exec gnumake.tracer.clear(); gnumake.tracer.enable(max_events=2))
+RESULT := $(trace_nested a)$(trace_nested b)
+RESULT := $(python-eval gnumake.tracer.max_events)
+$(call assert-equal,2,$(RESULT))
+RESULT := $(python-eval len(gnumake.tracer.as_dict()['traceEvents']) - 1)
+$(call assert-equal,2,$(RESULT))
+
+# The trace is written on exit, or on request
+$(python-exec gnumake.tracer.write())
+RESULT := $(python-eval json.load(open(gnumake.tracer.path))['otherData']['dropped_events'] > 0)
+$(call assert-equal,1,$(RESULT))
+
+# Don't leave files behind
+$(python-exec gnumake.tracer.path = None)
+$(shell rm -rf $(TRACE_DIR))
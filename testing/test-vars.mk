@@ -133,3 +133,154 @@ $(call assert-empty,.PYTHON_LAST_ERROR)
 $(call assert-equal,bar baz,$(FOO))
 $(call assert-equal,simple,$(flavor FOO))
 
+
+# Bulk reads
+FOO := abc
+BAR = x$(FOO)y
+EMPTY :=
+SEP := $(python-eval '\x1e\x1e\x1f\x1e')
+undefine NOTHERE
+RESULT := $(python-eval sorted(gnumake.var.get_many(['FOO', 'BAR', 'EMPTY', 'NOTHERE']).items()))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,[('BAR'$(comma) 'xabcy')$(comma) ('EMPTY'$(comma) '')$(comma) ('FOO'$(comma) 'abc')$(comma) ('NOTHERE'$(comma) '')],$(RESULT))
+
+RESULT := $(python-eval gnumake.var.get_many(['EMPTY', 'NOTHERE'], 'def'))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,{'EMPTY': ''$(comma) 'NOTHERE': 'def'},$(RESULT))
+
+RESULT := $(python-eval gnumake.var.get_many(['BAR'], expand_value=False)['BAR'])
+$(call assert-equal,x$$(FOO)y,$(RESULT))
+
+# Values containing the separator characters survive intact
+RESULT := $(python-eval gnumake.var.get_many(['SEP', 'FOO']) == {'SEP': gnumake.var['SEP'], 'FOO': 'abc'})
+$(call assert-not-empty,RESULT)
+RESULT := $(python-eval len(gnumake.var.get_many(['SEP'])['SEP']))
+$(call assert-equal,4,$(RESULT))
+
+RESULT := $(python-eval tuple(gnumake.var.snapshot(['BAR'])['BAR']))
+$(call assert-equal,('xabcy'$(comma) 'file'$(comma) 'recursive'),$(RESULT))
+
+RESULT := $(python-eval tuple(gnumake.var.snapshot(['NOTHERE'], with_flavor=False)['NOTHERE']))
+$(call assert-equal,(''$(comma) 'undefined'$(comma) None),$(RESULT))
+
+RESULT := $(python-eval gnumake.var.snapshot([]))
+$(call assert-equal,{},$(RESULT))
+
+RESULT := $(python-eval gnumake.var.get_many(['A B']))
+$(call assert-empty,RESULT)
+$(call assert-equal,ValueError: Illegal name,$(.PYTHON_LAST_ERROR))
+
+# Variable cache
+CACHED := abc
+CACHED_REC = abc
+define python_code
+gnumake.var.enable_cache()
+a = [gnumake.var['CACHED'] for _ in range(3)]
+b = [gnumake.var['CACHED_REC'] for _ in range(3)]
+print(a == ['abc'] * 3, b == ['abc'] * 3,
+      gnumake.var.cache_hits, gnumake.var.cache_misses)
+endef
+RESULT := $(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,True True 2 4,$(RESULT))
+
+# Writes through Python invalidate the cached value
+define python_code
+gnumake.var['CACHED']
+gnumake.var.set('CACHED', 'def', 'simple')
+print(gnumake.var['CACHED'])
+gnumake.var.append('CACHED', 'ghi')
+print(gnumake.var['CACHED'])
+gnumake.evaluate('CACHED := jkl')
+print(gnumake.var['CACHED'])
+gnumake.expand('$$(eval CACHED := mno)')
+print(gnumake.var['CACHED'])
+gnumake.var.set('OTHER', '$$(eval CACHED := pqr)', 'simple')
+print(gnumake.var['CACHED'])
+del gnumake.var['CACHED']
+print(gnumake.var.get('CACHED', 'undefined'))
+endef
+RESULT := $(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,def def ghi jkl mno pqr undefined,$(strip $(RESULT)))
+
+# Reads that expand a recursive variable can change any variable too
+SIDE_A := 1
+SIDE_R = $(eval SIDE_A := $(SIDE_A)1)r
+define python_code
+a = gnumake.var['SIDE_A']
+gnumake.var['SIDE_R']
+b = gnumake.var['SIDE_A']
+gnumake.var.get_many(['SIDE_R', 'CACHED'])
+c = gnumake.var['SIDE_A']
+gnumake.var.snapshot(['SIDE_R'])
+print(a, b, c, gnumake.var['SIDE_A'], gnumake.expand('$$(SIDE_A)'))
+endef
+RESULT := $(python-exec $(python_code))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+$(call assert-equal,1 11 111 1111 1111,$(strip $(RESULT)))
+
+# By default, writes by the makefile are seen on the next call
+$(python-exec gnumake.var.cache_hits = 0)
+CACHED := abc
+RESULT := $(python-eval gnumake.var['CACHED'])
+CACHED := def
+RESULT := $(python-eval gnumake.var['CACHED'])
+$(call assert-equal,def,$(RESULT))
+
+# ...unless the cache is kept across calls
+$(python-exec gnumake.var.enable_cache(across_calls=True))
+RESULT := $(python-eval gnumake.var['CACHED'])
+CACHED := ghi
+RESULT := $(python-eval gnumake.var['CACHED'])
+$(call assert-equal,def,$(RESULT))
+$(python-exec gnumake.var.invalidate('CACHED'))
+RESULT := $(python-eval gnumake.var['CACHED'])
+$(call assert-equal,ghi,$(RESULT))
+
+$(python-exec gnumake.var.disable_cache())
+CACHED := jkl
+RESULT := $(python-eval gnumake.var['CACHED'])
+$(call assert-equal,jkl,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
+
+# Words are read lazily, split as make splits them
+WORDY := $(tab) a  b$(tab)c$(space)
+define NEWLINES
+d
+	e
+endef
+WORDY_REC = $(WORDY) $(NEWLINES) ü
+RESULT := $(python-eval list(gnumake.var.words('WORDY_REC')))
+$(call assert-equal,['a'$(comma) 'b'$(comma) 'c'$(comma) 'd'$(comma) 'e'$(comma) 'ü'],$(RESULT))
+RESULT := $(python-eval list(gnumake.var.words('WORDY_REC'$(comma) expand_value=False)))
+$(call assert-equal,['$$(WORDY)'$(comma) '$$(NEWLINES)'$(comma) 'ü'],$(RESULT))
+RESULT := $(python-eval list(gnumake.var.words('UNDEFINED_WORDS')))
+$(call assert-equal,[],$(RESULT))
+RESULT := $(python-eval gnumake.var.word_count('WORDY_REC'))
+$(call assert-equal,6,$(RESULT))
+RESULT := $(python-eval gnumake.var.word_count('UNDEFINED_WORDS'))
+$(call assert-equal,0,$(RESULT))
+
+# The same words come from the cache
+ODD_WORDS := $(python-eval 'x\x1ey\xa0w z')
+define python_code
+gnumake.var.enable_cache()
+gnumake.var['ODD_WORDS']
+hits = gnumake.var.cache_hits
+cached = list(gnumake.var.words('ODD_WORDS'))
+hits = gnumake.var.cache_hits - hits
+gnumake.var.disable_cache()
+uncached = list(gnumake.var.words('ODD_WORDS'))
+print(cached == uncached, len(cached), hits)
+endef
+RESULT := $(python-exec $(python_code))
+$(call assert-equal,True $(words $(ODD_WORDS)) 1,$(RESULT))
+
+# Stopping early
+MANY_WORDS := $(python-eval ' '.join(map(str$(comma) range(100000))))
+RESULT := $(python-eval next(w for w in gnumake.var.words('MANY_WORDS') if w.endswith('7')))
+$(call assert-equal,7,$(RESULT))
+RESULT := $(python-eval sum(1 for w in gnumake.var.words('MANY_WORDS')))
+$(call assert-equal,100000,$(RESULT))
+$(call assert-empty,.PYTHON_LAST_ERROR)
@@ -0,0 +1,51 @@
+THIS_MAKEFILE := $(lastword $(MAKEFILE_LIST))
+THIS_PATH := $(dir $(THIS_MAKEFILE))
+TEST_NAME := word list functions
+
+include $(THIS_PATH)/common.mk
+
+WORDS := a.c b.o a.c x%y.h lib/c.o d.c.o .o o % a.c\%b a\b.c a\\b.c
+PATTERN_LISTS := %.o %.c a.c %c.o b.o,%.o a.c %.c.o,o% lib/% %.c,x\%%.h \
+				 \%,%.c\%b a\b% %\\b.c,a.c b.o z,%,
+
+# The same results as make's own functions
+define check
+$(call assert-equal,$(filter $(1),$(WORDS)),$(py-filter $(1),$(WORDS)))
+$(call assert-equal,$(filter-out $(1),$(WORDS)),$(py-filter-out $(1),$(WORDS)))
+endef
+$(foreach p,$(subst $(comma), ,$(subst $(space),:,$(PATTERN_LISTS))), \
+	$(eval $(call check,$(subst :, ,$(p)))))
+
+define check_patsubst
+$(call assert-equal,$(patsubst $(1),$(2),$(WORDS)),$(py-patsubst $(1),$(2),$(WORDS)))
+endef
+# Words are split where make splits them, which isn't always where Python
+# would
+ODD_WORDS := $(python-eval 'a\xa0b c x\x1ey a\x0bz\x0cq\rr')
+$(call assert-equal,$(filter c a% x%,$(ODD_WORDS)),$(py-filter c a% x%,$(ODD_WORDS)))
+$(call assert-equal,$(filter-out a%,$(ODD_WORDS)),$(py-filter-out a%,$(ODD_WORDS)))
+$(call assert-equal,$(patsubst %y,%,$(ODD_WORDS)),$(py-patsubst %y,%,$(ODD_WORDS)))
+$(call assert-equal,$(words $(ODD_WORDS)),$(python-eval len(gnumake._split_words(gnumake.var['ODD_WORDS']))))
+
+$(call check_patsubst,%.c,%.o)
+$(call check_patsubst,%.o,obj/%.o)
+$(call check_patsubst,lib/%,%)
+$(call check_patsubst,%,[%])
+$(call check_patsubst,%.c,fixed)
+$(call check_patsubst,a.c,z%)
+$(call check_patsubst,x\%%.h,%)
+$(call check_patsubst,a.c\%b,matched)
+
+RESULT := $(py-uniq b a b c a d)
+$(call assert-equal,b a c d,$(RESULT))
+RESULT := $(py-intersect d a b a c,c x a)
+$(call assert-equal,a c,$(RESULT))
+RESULT := $(py-filter %.o,)
+$(call assert-empty,RESULT)
+
+# Python API
+RESULT := $(python-eval gnumake.wordlist.filter_words(['%.o'$(comma) 'a.c']$(comma) 'a.c b.o c.c') \
+		  == ['a.c'$(comma) 'b.o'])
+$(call assert-equal,1,$(RESULT))
+RESULT := $(python-eval gnumake.wordlist.split_pattern(r'a\\\%b\\%c%d'))
+$(call assert-equal,('a\\%b\\'$(comma) 'c%d'),$(RESULT))